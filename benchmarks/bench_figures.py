@@ -0,0 +1,83 @@
+"""Benchmark plotting pipeline files: plotly validated go.Figure vs lean figure dicts.
+
+Writes synthetic 16S pipeline QC files of N samples, then times rendering
+their plot divs both ways.
+
+    python benchmarks/bench_figures.py [--samples 5000] [--repeat 3]
+"""
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from runqc import pipe_qc_plots
+
+
+def write_read_counts(path, samples, seed=0):
+    """write 16S pipeline QC csv of samples' read counts after each step"""
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(5000, 50000, samples)
+    counts = [raw]
+    for keep in (0.98, 0.90, 0.85, 0.97):
+        counts.append((counts[-1] * rng.uniform(keep - 0.05, keep, samples)).astype(int))
+    with path.open('w') as fh:
+        fh.write('Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost\n')
+        for i in range(samples):
+            fh.write(f'Sample{i:06d},' + ','.join(str(c[i]) for c in counts) + '\n')
+
+
+def write_spike_pcts(path, samples, seed=0):
+    """write 16S pipeline spike pcts tsv of two spikes per sample"""
+    rng = np.random.default_rng(seed)
+    with path.open('w') as fh:
+        for i in range(samples):
+            total = int(rng.integers(5000, 50000))
+            for spike in ('OTU_Allobacillus', 'OTU_Imtechella'):
+                reads = int(rng.integers(0, total // 50))
+                fh.write(f'Sample{i:06d}\t{spike}\t{100 * reads / total:.20f}%\t{reads}\t{total}\n')
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """return (seconds of fastest of repeat calls, output of last)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        read_counts = Path(tmp) / 'pipe_16S_QC-18-microbe-999-BENCH.csv'
+        spike_pcts = Path(tmp) / 'pipe_16S_spike_pcts-18-microbe-999-BENCH.tsv'
+        write_read_counts(read_counts, args.samples)
+        write_spike_pcts(spike_pcts, args.samples)
+
+        print(f'{args.samples} samples, best of {args.repeat}')
+        print(f'{"plot":<16} {"validated":>10} {"lean":>10} {"speedup":>8} {"div size":>10}')
+        def plot_read_counts_file(fp, validate=False):
+            df = pipe_qc_plots.read_counts_frame(fp)
+            return pipe_qc_plots.plot_bar_chart(fp, df, validate=validate)
+
+        for name, plot, fp in [('read counts', plot_read_counts_file, read_counts),
+                               ('spike pcts', pipe_qc_plots.plot_spike_pcts_file, spike_pcts)]:
+            slow, _ = best_of(args.repeat, plot, fp, validate=True)
+            fast, output = best_of(args.repeat, plot, fp)
+            size = len(output) if isinstance(output, str) else sum(map(len, output))
+            print(f'{name:<16} {slow:>9.3f}s {fast:>9.3f}s {slow / fast:>7.1f}x {size:>10,}')
+
+
+if __name__ == '__main__':
+    main()
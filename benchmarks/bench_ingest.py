@@ -0,0 +1,71 @@
+"""Benchmark parsing 16S pipeline QC logs: regex replace + astype vs typed loader.
+
+    python benchmarks/bench_ingest.py [--samples 200000] [--repeat 3]
+"""
+import sys
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from runqc import pipe_qc_plots
+from bench_figures import write_read_counts, best_of
+
+
+def legacy_load(fp):
+    """step counts as parsed before the typed loader, for comparison"""
+    df_read = pd.read_csv(fp, header=0, names=pipe_qc_plots.READ_COUNT_COLUMNS, index_col=0)
+    df = df_read.replace(regex=r'^.*[^\d].*$', value='0')
+    df = df.loc[df.index.notna()]
+    return df.astype({col: int for col in df.columns})
+
+
+def peak_memory(func, *args, **kwargs):
+    """return peak bytes allocated by python while calling func"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = Path(tmp) / 'pipe_16S_QC-18-microbe-999-BENCH.csv'
+        write_read_counts(fp, args.samples)
+        # a few samples not run through all steps
+        lines = fp.read_text().splitlines()
+        for i in range(1, len(lines), 97):
+            lines[i] = ','.join(lines[i].split(',')[:3] + ['Missing'] * 3)
+        fp.write_text('\n'.join(lines) + '\n')
+
+        loaders = [('regex + astype', legacy_load),
+                   ('typed, c', lambda fp: pipe_qc_plots.load_read_counts(fp, engine='c'))]
+        try:
+            import pyarrow
+            loaders.append(('typed, pyarrow',
+                            lambda fp: pipe_qc_plots.load_read_counts(fp, engine='pyarrow')))
+        except ImportError:
+            print('pyarrow not installed, its engine not timed')
+
+        print(f'{args.samples} samples, best of {args.repeat}')
+        for name, load in loaders:
+            seconds, df = best_of(args.repeat, load, fp)
+            peak = peak_memory(load, fp)
+            print(f'{name:<16} {seconds:>7.3f}s  peak {peak / 2**20:>7.1f} MiB'
+                  f'  frame {df.memory_usage(index=False).sum() / 2**20:>6.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark plot profiles: payload of full vs lite plots, as divs and as json.
+
+Writes synthetic 16S pipeline QC files of N samples, then sizes their plots
+in each PlotProfile (raw, and gzipped as served).
+
+    python benchmarks/bench_profiles.py [--samples 5000] [--repeat 3]
+"""
+import sys
+import gzip
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from runqc import pipe_qc_plots
+from runqc.pipe_qc_plots import PLOT_PROFILES
+from bench_figures import write_read_counts, write_spike_pcts, best_of
+
+
+def sizes(output):
+    """return (bytes, gzipped bytes) of plot output(s)"""
+    text = output if isinstance(output, str) else ''.join(output)
+    data = text.encode('utf-8')
+    return len(data), len(gzip.compress(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        read_counts = Path(tmp) / 'pipe_16S_QC-18-microbe-999-BENCH.csv'
+        spike_pcts = Path(tmp) / 'pipe_16S_spike_pcts-18-microbe-999-BENCH.tsv'
+        write_read_counts(read_counts, args.samples)
+        write_spike_pcts(spike_pcts, args.samples)
+        df = pipe_qc_plots.read_counts_frame(read_counts)
+
+        plots = [
+            ('read counts div', lambda p: pipe_qc_plots.plot_bar_chart(
+                read_counts, df.copy(), profile=p)),
+            ('read counts json', lambda p: pipe_qc_plots.read_counts_json(
+                read_counts, profile=p)),
+            ('spike pcts divs', lambda p: pipe_qc_plots.plot_spike_pcts_file(
+                spike_pcts, profile=p)),
+            ('spike pcts json', lambda p: pipe_qc_plots.spike_pcts_json(
+                spike_pcts, profile=p)),
+        ]
+        print(f'{args.samples} samples, best of {args.repeat}')
+        print(f'{"plot":<18} {"profile":<8} {"time":>8} {"bytes":>11} {"gzipped":>10}')
+        for name, plot in plots:
+            full = None
+            for profile in PLOT_PROFILES.values():
+                seconds, output = best_of(args.repeat, plot, profile)
+                size, zipped = sizes(output)
+                ratio = f'  ({size / full[0]:.0%}, {zipped / full[1]:.0%})' if full else ''
+                full = full or (size, zipped)
+                print(f'{name:<18} {profile.name:<8} {seconds:>7.3f}s '
+                      f'{size:>11,} {zipped:>10,}{ratio}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark reads removed in each 16S pipeline step: per-file pandas eval vs batched numpy.
+
+    python benchmarks/bench_read_losses.py [--samples 10000] [--files 4] [--repeat 5]
+"""
+import sys
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from runqc import pipe_qc_plots
+from bench_figures import write_read_counts, best_of
+
+
+def legacy_read_counts_frame(fp, sort_by='nonhost'):
+    """read counts dataframe as computed before the numpy engine, for comparison"""
+    colnames = ['Sample_Name'] + pipe_qc_plots.READ_COUNT_STEPS
+    df_read = pd.read_csv(fp, header=0, names=colnames, index_col=0)
+    df = df_read.replace(regex=r'^.*[^\d].*$', value='0')
+    df = df.loc[df.index.notna()]
+    df = df.astype({col: int for col in df.columns[1:]})
+    df.sort_values(by=sort_by, ascending=True, inplace=True)
+
+    diff_df = pd.DataFrame(columns=pipe_qc_plots.READ_LOSS_COLUMNS, dtype='int64')
+    diff_df.total      = df.raw
+    diff_df.final      = df.nonhost
+    diff_df.host       = df.eval('nonchimera - nonhost')
+    diff_df.chimera    = df.eval('combined - nonchimera')
+    diff_df.uncombined = df.eval('trimmed - combined')
+    diff_df.trimmed    = df.eval('raw - trimmed')
+    return diff_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10000, help='samples per file')
+    parser.add_argument('--files', type=int, default=4, help='QC files of run')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fpaths = [Path(tmp) / f'pipe_16S_QC-18-microbe-{n:03d}-BENCH.csv'
+                  for n in range(args.files)]
+        for n, fp in enumerate(fpaths):
+            write_read_counts(fp, args.samples, seed=n)
+
+        slow, legacy = best_of(args.repeat, lambda: [legacy_read_counts_frame(fp) for fp in fpaths])
+        fast, frames = best_of(args.repeat, pipe_qc_plots.read_counts_frames, fpaths)
+        for old, new in zip(legacy, frames.values()):
+            # same losses, samples of equal counts may be in other order
+            assert (old.loc[new.index].to_numpy() == new.to_numpy()).all()
+
+        memory = sum(df.memory_usage(index=False).sum() for df in frames.values())
+        legacy_memory = sum(df.memory_usage(index=False).sum() for df in legacy)
+        print(f'{args.files} files of {args.samples} samples, best of {args.repeat}')
+        print(f'per-file pandas: {slow:.3f}s  {legacy_memory:>10,} bytes of counts')
+        print(f'batched numpy:   {fast:.3f}s  {memory:>10,} bytes of counts'
+              f'  ({slow / fast:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ from flask_sqlalchemy import SQLAlchemy
 #~~~~ runqc app pkgs ~~~~~
 from runqc.config import config
 from runqc import views
+from runqc.cache import prune_artifacts_command
 
 from runqc import version
 __version__ = version.get_version()
@@ -96,6 +97,7 @@ def create_app(test_config:dict={}):
         pass
 
     app.register_blueprint(views.run_info)
+    app.cli.add_command(prune_artifacts_command)
 
     # configure_extensions(app)
 
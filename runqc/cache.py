@@ -0,0 +1,342 @@
+"""Caches of derived run artifacts, e.g. rendered plots or parsed data frames.
+
+Entries are keyed on the fingerprint of their source file(s), so that a
+re-uploaded or modified file is never served from a stale entry.
+Two levels: an in-process LRUCache, then an ArtifactStore directory
+shared by all worker processes. Artifacts are stored as json, data frames
+in a columnar binary format: Feather if pyarrow is installed, else NPZ.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import PosixPath as Path
+
+import numpy as np
+import pandas as pd
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+
+try: # Feather files of data frames, if installed
+    import pyarrow
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+import logging
+log = logging.getLogger('cache')
+
+
+def file_fingerprint(path):
+    """return (path, size, mtime_ns) of file, or None if it is not there"""
+    try:
+        st = os.stat(str(path))
+    except OSError:
+        return None
+    return (str(path), st.st_size, st.st_mtime_ns)
+
+
+class LRUCache(object):
+    """Bounded mapping, evicting the least recently used entry when full.
+    Safe to share between the threads of a worker process.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        """return value of key and mark it recently used, else default"""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value):
+        """store value of key, evicting the oldest entries beyond maxsize"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                old_key, _ = self._data.popitem(last=False)
+                log.debug('cache evicted: %s', old_key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def atomic_write(dest, write, mode=0o644):
+    """call write(temp path) next to dest, then rename it to dest; return dest.
+    Readers of dest see either its previous or its complete new contents.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(dest.parent), prefix='.tmp-')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.chmod(tmp, mode)
+        os.replace(tmp, str(dest))
+    except Exception:
+        os.unlink(tmp)
+        raise
+    return dest
+
+
+def write_npz_frame(df, path):
+    """write data frame of str labels into numpy NPZ file"""
+    def array(values):
+        arr = np.asarray(values)
+        return arr.astype(str) if arr.dtype == object else arr
+    meta = dict(columns=[str(col) for col in df.columns],
+                columns_name=df.columns.name, index_name=df.index.name)
+    columns = {f'column_{i}': array(df.iloc[:, i]) for i in range(df.shape[1])}
+    with open(str(path), 'wb') as fh:
+        np.savez(fh, meta=np.array(json.dumps(meta)), index=array(df.index), **columns)
+
+
+def read_npz_frame(path):
+    """return data frame read from NPZ file written by write_npz_frame"""
+    with np.load(str(path), allow_pickle=False) as npz:
+        meta = json.loads(str(npz['meta']))
+        index = pd.Index(npz['index'], name=meta['index_name'])
+        df = pd.DataFrame({col: npz[f'column_{i}'] for i, col in enumerate(meta['columns'])},
+                          index=index)
+    df.columns.name = meta['columns_name']
+    return df
+
+
+if feather is not None:
+    FRAME_SUFFIX = '.feather'
+
+    def write_frame(df, path):
+        feather.write_feather(pyarrow.Table.from_pandas(df), str(path))
+
+    def read_frame(path):
+        return feather.read_table(str(path)).to_pandas()
+else:
+    FRAME_SUFFIX = '.npz'
+    write_frame = write_npz_frame
+    read_frame = read_npz_frame
+
+
+class ArtifactStore(object):
+    """Directory of derived artifacts, addressed by a digest of their sources.
+    Writes are atomic (temp file then rename), so any worker process may
+    read what another one wrote.
+    """
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(namespace, fingerprints, params=()):
+        """return hex digest of namespace, source fingerprints and params"""
+        blob = json.dumps([namespace, list(fingerprints), list(params)],
+                          sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+    def path(self, namespace, key, suffix='.json'):
+        return self.root / namespace / key[:2] / (key + suffix)
+
+    def get(self, namespace, key, default=None):
+        """return stored artifact, or default if not (validly) stored"""
+        try:
+            with self.path(namespace, key).open('r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return default
+
+    def put(self, namespace, key, value):
+        """store artifact atomically, return its path"""
+        def write(tmp):
+            with open(tmp, 'w') as fp:
+                json.dump(value, fp)
+        return atomic_write(self.path(namespace, key), write)
+
+    def get_frame(self, namespace, key, default=None):
+        """return stored data frame, or default if not (validly) stored"""
+        try:
+            return read_frame(self.path(namespace, key, FRAME_SUFFIX))
+        except Exception: # missing, or partial file of another format
+            return default
+
+    def put_frame(self, namespace, key, df):
+        """store data frame atomically, return its path"""
+        return atomic_write(self.path(namespace, key, FRAME_SUFFIX),
+                            lambda tmp: write_frame(df, tmp))
+
+    def prune(self, max_age=None, max_bytes=None, now=None):
+        """remove artifacts not used in max_age seconds, then the least recently used
+           beyond max_bytes in all; return (files, bytes) removed.
+        Last use is a file's atime (if the filesystem keeps it), else when written.
+        Files beside the namespaces, e.g. the run catalog, are left alone.
+        """
+        entries = []
+        for path in self.root.glob('*/*/*'):
+            try:
+                st = path.stat()
+            except OSError: # removed meanwhile
+                continue
+            if path.is_file():
+                entries.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+        entries.sort()
+
+        now = time.time() if now is None else now
+        total = sum(size for _, size, _ in entries)
+        files = removed = 0
+        for used, size, path in entries:
+            if not ((max_age and used < now - max_age) or (max_bytes and total > max_bytes)):
+                continue
+            try:
+                path.unlink()
+            except OSError as ose:
+                log.warning('artifact %s not pruned: %s', path, ose)
+                continue
+            files, removed, total = files + 1, removed + size, total - size
+            try: # of its key prefix, if now empty
+                path.parent.rmdir()
+            except OSError:
+                pass
+        return files, removed
+
+
+# derived artifacts, shared by all threads of this worker
+ARTIFACT_CACHE_SIZE = 256
+artifact_cache = LRUCache(maxsize=ARTIFACT_CACHE_SIZE)
+
+# parsed data frames, shared by all threads of this worker
+FRAME_CACHE_SIZE = 32
+frame_cache = LRUCache(maxsize=FRAME_CACHE_SIZE)
+
+_stores = {}
+
+def get_artifact_store():
+    """return the app's ArtifactStore, or None if not configured"""
+    if not has_app_context():
+        return None
+    root = current_app.config.get('RUN_ARTIFACTS')
+    if not root:
+        return None
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = ArtifactStore(root)
+    return store
+
+
+@click.command('prune-artifacts')
+@click.option('--days', type=float, default=None,
+              help='remove artifacts not used in days, default RUN_ARTIFACTS_MAX_AGE_DAYS')
+@click.option('--max-mb', type=float, default=None,
+              help='then the least recently used beyond MB, default RUN_ARTIFACTS_MAX_MB')
+@with_appcontext
+def prune_artifacts_command(days, max_mb):
+    """Prune the app's ArtifactStore (RUN_ARTIFACTS), e.g. daily by cron."""
+    store = get_artifact_store()
+    if store is None:
+        click.echo('No RUN_ARTIFACTS store configured.')
+        return
+    config = current_app.config
+    days = config.get('RUN_ARTIFACTS_MAX_AGE_DAYS', 0) if days is None else days
+    max_mb = config.get('RUN_ARTIFACTS_MAX_MB', 0) if max_mb is None else max_mb
+    files, removed = store.prune(max_age=days * 86400, max_bytes=max_mb * 2**20)
+    click.echo(f'Pruned {files} artifacts ({removed / 2**20:.1f} MB) from {store.root}')
+
+
+_missing = object()
+
+def artifact_key(namespace, sources, params=(), fingerprint=file_fingerprint):
+    """return key of artifact derived from the sources files"""
+    fingerprints = [fingerprint(src) for src in sources]
+    return ArtifactStore.key(namespace, fingerprints, params)
+
+
+def get_artifact(namespace, key, default=None, memory=None):
+    """return artifact from memory (LRUCache), else the app's ArtifactStore"""
+    if memory is None:
+        memory = artifact_cache
+    value = memory.get(key, _missing)
+    if value is not _missing:
+        return value
+
+    store = get_artifact_store()
+    if store is not None:
+        value = store.get(namespace, key, _missing)
+        if value is not _missing:
+            log.debug('artifact %s/%s found in store', namespace, key)
+            memory.set(key, value)
+            return value
+    return default
+
+
+def put_artifact(namespace, key, value, memory=None):
+    """save artifact into memory (LRUCache) and the app's ArtifactStore"""
+    if memory is None:
+        memory = artifact_cache
+    memory.set(key, value)
+    store = get_artifact_store()
+    if store is not None:
+        try:
+            store.put(namespace, key, value)
+        except (OSError, TypeError, ValueError):
+            log.exception('artifact %s/%s not stored', namespace, key)
+
+
+def cached_artifact(namespace, sources, compute, params=(), memory=None,
+                    fingerprint=file_fingerprint):
+    """return compute() memoized on fingerprints of the sources files.
+    Looks in memory (LRUCache), then the app's ArtifactStore, then computes
+    and saves into both. The result must be json serializable.
+    fingerprint: callable(path), e.g. RunInventory.fingerprint to reuse its stats
+    """
+    key = artifact_key(namespace, sources, params, fingerprint)
+    value = get_artifact(namespace, key, _missing, memory)
+    if value is _missing:
+        value = compute()
+        put_artifact(namespace, key, value, memory)
+    return value
+
+
+def cached_frame(namespace, sources, compute, params=(), memory=None,
+                 fingerprint=file_fingerprint):
+    """return copy of data frame compute() memoized on fingerprints of the sources files.
+    As cached_artifact, the frame stored in the app's ArtifactStore as FRAME_SUFFIX file.
+    """
+    if memory is None:
+        memory = frame_cache
+    key = artifact_key(namespace, sources, params, fingerprint)
+    df = memory.get(key)
+    if df is None:
+        store = get_artifact_store()
+        if store is not None:
+            df = store.get_frame(namespace, key)
+            if df is not None:
+                log.debug('frame %s/%s found in store', namespace, key)
+        if df is None:
+            df = compute()
+            if store is not None:
+                try:
+                    store.put_frame(namespace, key, df)
+                except Exception:
+                    log.exception('frame %s/%s not stored', namespace, key)
+        memory.set(key, df)
+    # callers may modify their frame
+    return df.copy()
@@ -0,0 +1,209 @@
+"""Catalog of run folders, for the run list page.
+
+Kept in a local SQLite index and refreshed incrementally: the datasets
+folder is only re-scanned when its mtime changes (or the index is older
+than RUN_CATALOG_MAX_AGE seconds), and a run's summary is only re-read
+when that run folder's mtime, or the fingerprint of its info json, changes.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+
+from runqc.utils import parse_run_name_qc
+
+import logging
+log = logging.getLogger('catalog')
+
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    folder           TEXT PRIMARY KEY,
+    name             TEXT NOT NULL,
+    mtime_ns         INTEGER NOT NULL,
+    info_fingerprint TEXT,
+    gt_project       TEXT,
+    flowcell         TEXT,
+    run_date         TEXT,
+    sample_count     INTEGER
+);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# run_info.json keys, as written by get_run_info or the seq core
+RUN_INFO_SUMMARY_KEYS = {
+    'gt_project':   ('GT Project', 'LIMSProjectID'),
+    'flowcell':     ('FlowCell ID', 'FlowCellID'),
+    'run_date':     ('Run Date', 'RunDate', 'Date Report'),
+    'sample_count': ('Sample Size',),
+}
+
+RUN_FOLDER_DATE = re.compile(r'^(\d{4})(\d{2})(\d{2})$')
+
+
+def run_folder_summary(folder):
+    """return summary of run from its folder name, e.g. '20180101_18-microbe-999_TESTY_qc'"""
+    name = parse_run_name_qc(folder)
+    summary = dict(name=name, gt_project=None, flowcell=None,
+                   run_date=None, sample_count=None)
+    parts = name.split('_')
+    if len(parts) > 1:
+        date = RUN_FOLDER_DATE.match(parts[0])
+        if date:
+            summary['run_date'] = '-'.join(date.groups())
+        summary['gt_project'] = parts[1]
+        if len(parts) > 2:
+            summary['flowcell'] = parts[2]
+    return summary
+
+
+def run_info_summary(run_dir, json_filename='run_info.json'):
+    """return summary values found in the run's info json"""
+    summary = {}
+    try:
+        with open(os.path.join(run_dir, json_filename)) as fp:
+            info = json.load(fp)
+    except (OSError, ValueError):
+        return summary
+    if not isinstance(info, dict):
+        return summary
+    for field, keys in RUN_INFO_SUMMARY_KEYS.items():
+        for key in keys:
+            if info.get(key):
+                summary[field] = info[key]
+                break
+    try:
+        summary['sample_count'] = int(summary['sample_count'])
+    except (KeyError, TypeError, ValueError):
+        summary.pop('sample_count', None)
+    return summary
+
+
+class RunCatalog(object):
+    """SQLite index of the run folders in datasets"""
+    def __init__(self, db_path, datasets, max_age=300):
+        self.db_path = db_path
+        self.datasets = datasets
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(CATALOG_SCHEMA)
+            columns = [r['name'] for r in conn.execute('PRAGMA table_info(runs)')]
+            if 'info_fingerprint' not in columns: # index of an earlier version
+                conn.execute('ALTER TABLE runs ADD COLUMN info_fingerprint TEXT')
+
+    @contextmanager
+    def connect(self):
+        """yield connection to the index, committing on success"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute('SELECT value FROM catalog_meta WHERE key=?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def refresh(self, force=False):
+        """update index from datasets folder if changed, return True if re-scanned.
+        If the datasets folder can not be scanned, the last index is kept.
+        """
+        try:
+            datasets_mtime = os.stat(self.datasets).st_mtime_ns
+        except OSError as ose:
+            log.error('run catalog: datasets not readable: %s', ose)
+            datasets_mtime = None
+
+        with self._lock, self.connect() as conn:
+            last_mtime = self._meta(conn, 'datasets_mtime_ns')
+            last_scan = float(self._meta(conn, 'refreshed_at', 0))
+            if not force \
+            and str(datasets_mtime) == last_mtime \
+            and time.time() - last_scan < self.max_age:
+                return False
+
+            known = {r['folder']: (r['mtime_ns'], r['info_fingerprint']) for r in
+                     conn.execute('SELECT folder, mtime_ns, info_fingerprint FROM runs')}
+            found = set()
+            if datasets_mtime is not None:
+                try:
+                    runs = self._scan()
+                except OSError as ose:
+                    log.error('run catalog: datasets not scanned, last index kept: %s', ose)
+                    return False
+                for folder, path, mtime_ns, info_fingerprint in runs:
+                    found.add(folder)
+                    if known.get(folder) == (mtime_ns, info_fingerprint):
+                        continue
+                    summary = run_folder_summary(folder)
+                    summary.update(run_info_summary(path))
+                    log.debug('run catalog: indexing %s', folder)
+                    conn.execute(
+                        'INSERT OR REPLACE INTO runs (folder, name, mtime_ns,'
+                        ' info_fingerprint, gt_project, flowcell, run_date, sample_count)'
+                        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (folder, summary['name'], mtime_ns, info_fingerprint,
+                         summary['gt_project'], summary['flowcell'],
+                         summary['run_date'], summary['sample_count']))
+
+            removed = [(f,) for f in known if f not in found]
+            conn.executemany('DELETE FROM runs WHERE folder=?', removed)
+            conn.executemany(
+                'INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)',
+                [('datasets_mtime_ns', str(datasets_mtime)),
+                 ('refreshed_at', str(time.time()))])
+        return True
+
+    def _scan(self, json_filename='run_info.json'):
+        """return list of (folder, path, mtime_ns, info json fingerprint) of run folders"""
+        runs = []
+        with os.scandir(self.datasets) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    mtime_ns = entry.stat().st_mtime_ns
+                except OSError: # removed meanwhile
+                    continue
+                try:
+                    st = os.stat(os.path.join(entry.path, json_filename))
+                    info_fingerprint = f'{st.st_size}:{st.st_mtime_ns}'
+                except OSError:
+                    info_fingerprint = None
+                runs.append((entry.name, entry.path, mtime_ns, info_fingerprint))
+        return runs
+
+    def runs(self):
+        """return list of run summary dicts, newest run folder names first"""
+        with self.connect() as conn:
+            rows = conn.execute('SELECT * FROM runs ORDER BY name DESC').fetchall()
+        return [dict(r) for r in rows]
+
+
+_catalogs = {}
+
+def get_run_catalog():
+    """return the app's RunCatalog, refreshed if its datasets changed"""
+    config = current_app.config
+    # N.B. not inside RUN_DATASETS, whose mtime the catalog watches
+    db_path = config.get('RUN_CATALOG') \
+              or os.path.join(current_app.instance_path, 'run_catalog.sqlite')
+    catalog = _catalogs.get(db_path)
+    if catalog is None:
+        catalog = _catalogs[db_path] = RunCatalog(
+            db_path, config['RUN_DATASETS'],
+            max_age=int(config.get('RUN_CATALOG_MAX_AGE', 300)))
+    catalog.refresh()
+    return catalog
@@ -37,6 +37,63 @@ class Config(object):
     if not os.path.isabs(RUN_DATASETS):
         RUN_DATASETS = pjoin(dirname(root_path), RUN_DATASETS)
 
+    # derived artifacts (plots, parsed reports) shared by all workers; '' to disable
+    RUN_ARTIFACTS = get_env("FLASK_APP_RUN_ARTIFACTS", RUN_DATASETS.rstrip('/') + '_artifacts')
+    # ... pruned of those not used in days, then the least recently used beyond MB
+    # (0 for no limit) by 'flask prune-artifacts', e.g. in a daily cron job:
+    #   0 3 * * * cd /path/to/app && FLASK_APP=runqc FLASK_ENV=production flask prune-artifacts
+    RUN_ARTIFACTS_MAX_AGE_DAYS = float(get_env("FLASK_APP_RUN_ARTIFACTS_MAX_AGE_DAYS", 30))
+    RUN_ARTIFACTS_MAX_MB = float(get_env("FLASK_APP_RUN_ARTIFACTS_MAX_MB", 0))
+
+    # index of run folders for the run list; re-scanned when older than max age (seconds)
+    RUN_CATALOG = get_env("FLASK_APP_RUN_CATALOG",
+        pjoin(RUN_ARTIFACTS, 'run_catalog.sqlite') if RUN_ARTIFACTS else None)
+    RUN_CATALOG_MAX_AGE = int(get_env("FLASK_APP_RUN_CATALOG_MAX_AGE", 300))
+
+    # threads building the sections of a run details page; 0 to build them in turn
+    RUN_DETAILS_WORKERS = int(get_env("FLASK_APP_RUN_DETAILS_WORKERS", 0))
+
+    # processes rendering plots of runs with several pipeline files; 0 to render in turn
+    RUN_PLOT_PROCESSES = int(get_env("FLASK_APP_RUN_PLOT_PROCESSES", 0))
+
+    # most samples in a read counts plot: those of least final reads, plus the others'
+    # mean; 0 for all samples. N.B. see all, by page, with '?page=1&page_size=...'
+    RUN_PLOT_MAX_SAMPLES = int(get_env("FLASK_APP_RUN_PLOT_MAX_SAMPLES", 200))
+
+    # pandas csv parser of 16S pipeline QC logs: 'c', or 'pyarrow' (faster, if installed
+    # with pandas >= 1.4); N.B. plots rendered in RUN_PLOT_PROCESSES parse with 'c'
+    RUN_READ_COUNTS_CSV_ENGINE = get_env("FLASK_APP_RUN_READ_COUNTS_CSV_ENGINE", "c")
+
+    # spike pcts scatter plots of more samples than this drawn with WebGL
+    RUN_PLOT_GL_POINTS = int(get_env("FLASK_APP_RUN_PLOT_GL_POINTS", 1000))
+    # ... or of more than this, binned into a heatmap of BINS x BINS; 0 to never bin
+    RUN_PLOT_DENSITY_POINTS = int(get_env("FLASK_APP_RUN_PLOT_DENSITY_POINTS", 0))
+    RUN_PLOT_DENSITY_BINS = int(get_env("FLASK_APP_RUN_PLOT_DENSITY_BINS", 50))
+
+    # all pipeline files of a run plotted in one figure (of a row per file), else each apart
+    # N.B. override per page with '?combined=1' or '?combined=0'
+    RUN_PLOTS_COMBINED = get_env("FLASK_APP_RUN_PLOTS_COMBINED", "False") == "True"
+
+    # plots in full, or 'lite': no values printed in bars, rounded floats, plain hover
+    # N.B. override per page with '?profile=lite' or '?profile=full'
+    RUN_PLOT_PROFILE = get_env("FLASK_APP_RUN_PLOT_PROFILE", "full")
+
+    # seconds browsers keep plots json (then revalidated by ETag); 0 to always revalidate
+    RUN_PLOTS_MAX_AGE = int(get_env("FLASK_APP_RUN_PLOTS_MAX_AGE", 60))
+    # ... and run files downloaded, e.g. csv, png, fastqc html and zip files
+    RUN_FILES_MAX_AGE = int(get_env("FLASK_APP_RUN_FILES_MAX_AGE", 3600))
+
+    # run files delivered by the front web server, not by python: '' (python),
+    # 'x-sendfile' (apache mod_xsendfile) or 'x-accel-redirect' (nginx) ...
+    RUN_FILES_OFFLOAD = get_env("FLASK_APP_RUN_FILES_OFFLOAD", "")
+    # ... of nginx's internal location aliasing RUN_DATASETS, e.g.
+    #   location /_run_files/ { internal; alias /path/to/runs/; }
+    RUN_FILES_ACCEL_PREFIX = get_env("FLASK_APP_RUN_FILES_ACCEL_PREFIX", "/_run_files/")
+
+    # plots fetched as json by the browser after the page, else rendered within it
+    # N.B. override per page with '?plots=inline' or '?plots=deferred'
+    RUN_PLOTS_DEFERRED = get_env("FLASK_APP_RUN_PLOTS_DEFERRED", "True") == "True"
+
 
 class ProductionConfig(Config):
     ENV = 'production'
@@ -75,6 +132,9 @@ class TestingConfig(Config):
     SQLALCHEMY_ECHO = "True"
     APPLICATION_ROOT = get_env("FLASK_APP_ROOT", "/run_qc_testing")
     RUN_DATASETS = get_env("FLASK_APP_RUN_DATASETS", '/tmp/run_qc_testing')
+    # N.B. per test in a temporary folder, see tests/conftest.py
+    RUN_ARTIFACTS = get_env("FLASK_APP_RUN_ARTIFACTS", '')
+    RUN_CATALOG = get_env("FLASK_APP_RUN_CATALOG", None)
 
 
 config = {
@@ -0,0 +1,236 @@
+"""Lean plotly figures: plain dicts of lists, serialized without validation.
+
+Building go.Figure objects validates every property of every trace and
+annotation, and plotly.offline.plot validates the whole figure again before
+encoding it; for runs of thousands of samples that dominates plotting time.
+Figures here are plain {'data': [...], 'layout': {...}} dicts, with array
+values converted once from numpy, then dumped by orjson if installed (else json).
+Output is equivalent to plotly's for the same figure specs, see tests.
+
+Figures may refer to a registered plotly template by name, layout.template
+= 'name', instead of each carrying all of it: the page defines the templates
+once, and qcLayout(layout) resolves the name before Plotly.newPlot, see
+templates_js.
+"""
+import json
+import uuid
+
+import numpy as np
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+try:
+    import orjson
+except ImportError: # optional, json is used instead
+    orjson = None
+
+import logging
+log = logging.getLogger('lean_figures')
+
+
+def to_list(values):
+    """return list of array-like values, NaN as None (json null, as plotly does)"""
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'f' and np.isnan(arr).any():
+        return [None if v != v else v for v in arr.tolist()]
+    return arr.tolist()
+
+
+def _default(obj):
+    """serialize what json does not: numpy values, plotly objects"""
+    if isinstance(obj, np.ndarray):
+        return to_list(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, 'to_plotly_json'):
+        return obj.to_plotly_json()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    _orjson_opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+
+    def dumps(obj):
+        """return json string of obj"""
+        return orjson.dumps(obj, default=_default, option=_orjson_opts).decode('utf-8')
+else:
+    _encoder = json.JSONEncoder(default=_default, sort_keys=True,
+                                separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj):
+        """return json string of obj"""
+        return _encoder.encode(obj)
+
+
+_templates = {}
+
+def template_dict(name=None):
+    """return plain dict of plotly template (default: pio.templates.default)"""
+    name = name or pio.templates.default
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = json.loads(
+            json.dumps(pio.templates[name].to_plotly_json(), cls=PlotlyJSONEncoder))
+    return template
+
+
+def figure_dict(data, layout, template=True):
+    """return figure dict of trace dicts and layout dict.
+    template: apply plotly's default template, as go.Figure does,
+        unless layout has its own (or names one shared by the page)
+    """
+    layout = dict(layout)
+    if template and 'template' not in layout:
+        layout['template'] = template_dict()
+    return {'data': list(data), 'layout': layout}
+
+
+def _significant(values, digits):
+    """return list of (nested lists of) values, floats rounded to significant digits,
+       NaN as None
+    """
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return [(float(f'{v:.{digits}g}') if v == v else None) if isinstance(v, float)
+            else _significant(v, digits) if isinstance(v, (list, tuple))
+            else v
+            for v in values]
+
+
+def _axis_key(ref):
+    """return layout key of axis reference, e.g. 'y2' -> 'yaxis2'"""
+    return ref[0] + 'axis' + ref[1:]
+
+
+def _axis_keys(layout, letter):
+    """return keys of layout's axes of letter, e.g. ['xaxis', 'xaxis2']"""
+    return [key for key in layout if key.startswith(letter + 'axis')] or [letter + 'axis']
+
+
+def lite_figure(figure, digits=None, text=True, indexed_rows=False, interactive=True):
+    """return copy of figure dict lighter to send and to draw
+    params:
+        digits: float arrays rounded to significant digits, if set
+        text: keep text labels in bars, else dropped
+        indexed_rows: rows of horizontal bars (and texts next to them) by number,
+            y0 and dy, their names only in the axis tick texts, not in every trace
+        interactive: keep spike lines and hover formatting, else
+            hover of the closest point only, of default labels
+    """
+    layout = dict(figure.get('layout', {}))
+    if not interactive:
+        layout['hovermode'] = 'closest'
+        for key in _axis_keys(layout, 'x') + _axis_keys(layout, 'y'):
+            layout[key] = dict(layout.get(key, {}), showspikes=False)
+
+    data, indexed = [], set()
+    for trace in figure.get('data', []):
+        trace = dict(trace)
+        if not text and trace.get('type') == 'bar':
+            for key in ('text', 'textposition', 'textfont'):
+                trace.pop(key, None)
+        if not interactive:
+            trace.pop('hoverlabel', None)
+        yaxis = _axis_key(trace.get('yaxis', 'y'))
+        if indexed_rows and isinstance(trace.get('y'), list) \
+                and trace['y'] == layout.get(yaxis, {}).get('tickvals'):
+            del trace['y']
+            trace['y0'], trace['dy'] = 0, 1
+            indexed.add(yaxis)
+        if digits:
+            for key in ('x', 'y', 'z'):
+                if isinstance(trace.get(key), (list, tuple, np.ndarray)):
+                    trace[key] = _significant(trace[key], digits)
+        data.append(trace)
+
+    for yaxis in indexed:
+        layout[yaxis] = dict(layout[yaxis], type='linear', rangemode='normal',
+                             tickvals=list(range(len(layout[yaxis]['tickvals']))))
+    return {'data': data, 'layout': layout}
+
+
+def lite_config(config):
+    """return copy of plotly.js config without editing, tips and axis drag handles"""
+    config = dict(config, editable=False, showTips=False,
+                  showAxisDragHandles=False, showAxisRangeEntryBoxes=False)
+    config.pop('edits', None)
+    return config
+
+
+# page's templates, of figures naming theirs: qcLayout(layout) of Plotly.newPlot
+# resolves the name (plotly.js itself takes template objects only)
+TEMPLATES_JS = (
+    'window.PLOTLYTEMPLATES={templates};'
+    'function qcLayout(layout) {{'
+    'if (layout && typeof layout.template === "string") {{'
+    'layout.template=window.PLOTLYTEMPLATES[layout.template]'
+    '}};'
+    'return layout'
+    '}}'
+)
+
+_templates_js = {}
+
+def templates_js(names):
+    """return js defining plotly templates of names, once per page, and qcLayout
+    for figures naming their template
+    """
+    names = tuple(names)
+    js = _templates_js.get(names)
+    if js is None:
+        js = _templates_js[names] = TEMPLATES_JS.format(
+            templates=dumps({name: template_dict(name) for name in names}))
+    return js
+
+
+def div_config(config):
+    """return copy of plotly.js config as plotly's html output sets it"""
+    config = dict(config)
+    config.setdefault('responsive', True)
+    if not (config.get('showLink') or config.get('showSendToCloud')):
+        for key in ('plotlyServerURL', 'linkText', 'showLink'):
+            config.pop(key, None)
+    return config
+
+
+def _px(size, default='100%'):
+    """return css size of figure width/height, numbers in pixels"""
+    if size is None:
+        return default
+    try:
+        float(size)
+    except (TypeError, ValueError):
+        return size
+    return f'{size}px'
+
+
+PLOT_DIV = (
+    '<div>'
+    '<div id="{id}" class="plotly-graph-div" style="height:{height}; width:{width};"></div>'
+    '<script type="text/javascript">'
+    'window.PLOTLYENV=window.PLOTLYENV || {{}};'
+    'if (document.getElementById("{id}")) {{'
+    'Plotly.newPlot("{id}", {data}, {layout}, {config})'
+    '}};'
+    '</script>'
+    '</div>'
+)
+
+def plot_div(figure, config, div_id=None):
+    """return html div plotting figure dict, as plotly.offline.plot(output_type='div')"""
+    layout = figure.get('layout', {})
+    template = layout.get('template', {})
+    if isinstance(template, str): # shared by the page, see templates_js
+        layout_arg = 'qcLayout({})'
+        template = template_dict(template)
+    else:
+        layout_arg = '{}'
+    template_layout = template.get('layout', {})
+    return PLOT_DIV.format(
+        id = div_id or str(uuid.uuid4()),
+        width = _px(layout.get('width', template_layout.get('width'))),
+        height = _px(layout.get('height', template_layout.get('height'))),
+        data = dumps(figure.get('data', [])),
+        layout = layout_arg.format(dumps(layout)),
+        config = dumps(div_config(config)),
+    )
@@ -1,11 +1,18 @@
+import os
+import threading
+import multiprocessing
+from types import MappingProxyType
 from pathlib import PosixPath as Path
-from itertools import permutations
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import pandas as pd
 import numpy as np
 import plotly.offline as ply
 import plotly.graph_objs as go
-from plotly.subplots import make_subplots
+import plotly.io as pio
+from flask import current_app, has_app_context
 
 #TODO: "standardize" logging format and setup within the app?
 import logging
@@ -13,26 +20,35 @@ log = logging.getLogger('plots')
 log_format = '%(levelname)s in "%(name)s" on %(lineno)d: %(message)s'
 logging.basicConfig(format=log_format, level=logging.DEBUG)
 
-from runqc.utils import get_file_paths
-from runqc.plotly_config import plotly_config #, orca_config
+from runqc.utils import get_file_paths, get_run_inventory
+from runqc.cache import LRUCache, artifact_key, get_artifact, put_artifact, file_fingerprint
+from runqc.cache import cached_frame, atomic_write
+from runqc.lean_figures import to_list, figure_dict, plot_div, dumps
+from runqc.lean_figures import lite_figure, lite_config
+from runqc.svg_charts import bar_chart_svg, chart_html
+from runqc.plotly_config import plotly_config, thaw #, orca_config
 
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Pipeline Globals ~~~~~
 PIPELINE_FILE_GLOB = 'pipe_16S_QC-*.csv'
 PIPELINE_PCTS_GLOB = 'pipe_16S_spike_pcts-*.tsv'
 
+# rendered plots, keyed on their source file's fingerprint
+PLOT_CACHE_SIZE = 64
+plot_cache = LRUCache(maxsize=PLOT_CACHE_SIZE)
+
 try:
     # set float display to integer only, as no floats included in qc logs (default format = None)
     pd.options.display.float_format = '{:,.0f}'.format
 
-    plot_opts = dict(
+    # options of ply.plot, read-only: its config is passed per figure, see figure_config
+    plot_opts = MappingProxyType(dict(
         auto_open = False,
         # image = 'svg', # only for automatic downloads
         image_width = 1000,
         output_type = 'div',
         include_plotlyjs = False,
-        config = plotly_config,
-    )
+    ))
 
     plot_figure_title_font = {'color':'SteelBlue'}
 
@@ -62,11 +78,11 @@ def parse_project_name(filename):
         return filename
 
 
-def find_pipeline_qc_files(folder_path, fileglob=PIPELINE_FILE_GLOB):
+def find_pipeline_qc_files(folder_path, fileglob=PIPELINE_FILE_GLOB, inventory=None):
     """return list of all existing files from the 16S pipeline's QC logs"""
     try:
         log.info('Finding pipeline QC files')
-        pipe_files = get_file_paths(folder_path, fileglob=fileglob)
+        pipe_files = get_file_paths(folder_path, fileglob=fileglob, inventory=inventory)
     except Exception as e:
         log.exception('Issues finding pipeline files in "%s"', folder_path)
         raise e
@@ -75,10 +91,166 @@ def find_pipeline_qc_files(folder_path, fileglob=PIPELINE_FILE_GLOB):
         return pipe_files
 
 
+# plotting processes started by a server process, not forked from this worker:
+# forking a process of threads (e.g. of gather_sections) copies locks held by
+# other threads (logging, caches, imports), which would never be released
+PLOT_POOL_START_METHOD = 'forkserver' \
+    if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_plot_pool = None
+_plot_pool_pid = None
+_plot_pool_lock = threading.Lock()
+
+def plot_process_pool(processes):
+    """return the worker's pool of plotting processes, made once per process
+       (of processes workers, as first asked)
+    """
+    global _plot_pool, _plot_pool_pid
+    with _plot_pool_lock:
+        if _plot_pool is None or _plot_pool_pid != os.getpid():
+            _plot_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context(PLOT_POOL_START_METHOD))
+            _plot_pool_pid = os.getpid()
+        return _plot_pool
+
+
+def discard_plot_process_pool(pool):
+    """forget broken pool of plotting processes, a new one is made when next asked"""
+    global _plot_pool
+    with _plot_pool_lock:
+        if _plot_pool is pool:
+            _plot_pool = None
+    pool.shutdown(wait=False)
+
+
+def render_pipeline_files(render, fpaths, namespace, params=(), processes=0,
+                          inventory=None, batch=None, render_params=()):
+    """return OrderedDict {fp: render(fp, *params, *render_params)} of files
+       rendered without error.
+    Outputs are cached on each file's fingerprint.
+    Files not cached yet are rendered in a pool of processes, one task per file,
+    if processes > 1 and more than one file needs rendering.
+    batch: callable(fpaths, *params) returning {fp: data} of all files not cached,
+           read together; each file is then rendered as render(fp, data, *render_params)
+    render_params: of render only, not of batch (e.g. PlotProfile)
+    """
+    fingerprint = inventory.fingerprint if inventory else file_fingerprint
+    outputs = OrderedDict()
+    keys = OrderedDict()
+    for fp in fpaths:
+        key = artifact_key(namespace, [fp], tuple(params) + tuple(render_params), fingerprint)
+        output = get_artifact(namespace, key, memory=plot_cache)
+        if output is None:
+            keys[fp] = key
+        else:
+            outputs[fp] = output
+
+    if not keys:
+        return OrderedDict((fp, outputs[fp]) for fp in fpaths if fp in outputs)
+
+    if batch is not None:
+        try:
+            inputs = batch(list(keys), *params)
+        except Exception:
+            log.exception('Issues reading %s files', len(keys))
+            inputs = {}
+        tasks = OrderedDict((fp, (fp, inputs[fp]) + tuple(render_params))
+                            for fp in keys if fp in inputs)
+    else:
+        tasks = OrderedDict((fp, (fp,) + tuple(params) + tuple(render_params))
+                            for fp in keys)
+
+    rendered = {}
+    failed = set(keys) - set(tasks)
+    if processes > 1 and len(tasks) > 1:
+        log.info('Rendering %s files in %s processes', len(tasks), processes)
+        pool = None
+        try:
+            pool = plot_process_pool(processes)
+            futures = {fp: pool.submit(render, *args) for fp, args in tasks.items()}
+            for fp, future in futures.items():
+                try:
+                    rendered[fp] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception:
+                    failed.add(fp)
+                    log.exception('Issues rendering file "%s" in process', fp.name)
+        except BrokenProcessPool:
+            log.exception('Plotting processes failed, rendering in-process')
+            if pool is not None:
+                discard_plot_process_pool(pool)
+
+    for fp, key in keys.items():
+        if fp in failed:
+            continue
+        if fp not in rendered:
+            try:
+                rendered[fp] = render(*tasks[fp])
+            except Exception:
+                log.exception('Issues rendering file "%s"', fp.name)
+                continue
+        put_artifact(namespace, key, rendered[fp], memory=plot_cache)
+
+    outputs.update(rendered)
+    return OrderedDict((fp, outputs[fp]) for fp in fpaths if fp in outputs)
+
+
+def figure_config(image_name, **options):
+    """return new copy of plotly_config for one figure, named for its image downloads.
+    Figures never share (or change) one config, so threads may plot concurrently.
+    """
+    config = thaw(plotly_config)
+    config.update(thaw(options))
+    config['toImageButtonOptions']['filename'] = image_name
+    return config
+
+
+# how much of a figure is sent to the browser:
+#   bar_text: values printed in bars, else only in their hover labels
+#   indexed_rows: bar rows by number (y0, dy), not by sample name in every trace
+#   digits: significant digits of floats, or None for all
+#   interactive: spike lines, hover formatting and editable config, else plain hover
+PlotProfile = namedtuple('PlotProfile', ['name', 'bar_text', 'indexed_rows', 'digits',
+                                         'interactive'])
+PLOT_PROFILES = {
+    'full': PlotProfile('full', bar_text=True, indexed_rows=False, digits=None,
+                        interactive=True),
+    'lite': PlotProfile('lite', bar_text=False, indexed_rows=True, digits=4,
+                        interactive=False),
+}
+
+def profiled(fig, config, profile=None):
+    """return (figure, config) of PlotProfile: as passed if full (or None),
+       else lightened figure dict and config
+    figure: go.Figure or figure dict
+    """
+    if profile is None or profile == PLOT_PROFILES['full']:
+        return fig, config
+    if not isinstance(fig, dict):
+        fig = fig.to_dict()
+    fig = lite_figure(fig, digits=profile.digits, text=profile.bar_text,
+                      indexed_rows=profile.indexed_rows, interactive=profile.interactive)
+    return fig, (config if profile.interactive else lite_config(config))
+
+
+def figures_json(figures, profile=None):
+    """return json of [(figure, config), ...], for Plotly.newPlot in the browser
+    figure: go.Figure or figure dict
+    profile: PlotProfile of figures, default full
+    """
+    figures = [profiled(fig, config, profile) for fig, config in figures]
+    return dumps(
+        {'figures': [{'data': fig['data'], 'layout': fig['layout'], 'config': config}
+                     if isinstance(fig, dict) else
+                     {'data': fig.data, 'layout': fig.layout, 'config': config}
+                     for fig, config in figures]})
+
+
 def layout_axis_defaults(axis_title=''):
     """return dict of default layout settings"""
     axis_defaults = dict(
-        title = axis_title,
         visible = True,
         color = 'Black',
         showgrid = True,
@@ -107,19 +279,27 @@ def layout_axis_defaults(axis_title=''):
 
         hoverformat = '.0f', # don't use exponents
     )
+    if axis_title:
+        axis_defaults['title'] = dict(text=axis_title)
     return axis_defaults
 
 
-def make_layout(title='', bgcolor='aliceblue', fontsize=12):
-    """return plotly Layout object with default settings.
-    The object returned can be modified as needed.
-    """
+# margins of QC figures, whose heights are set from their number of samples
+QC_LAYOUT_MARGIN = MappingProxyType(dict(
+    l = 5,  r = 5,
+    t = 65, b = 5,
+    pad = 0,
+    autoexpand = True
+))
+
+def qc_layout_defaults(bgcolor='aliceblue', fontsize=12):
+    """return dict of plotly layout settings shared by all QC figures"""
     try:
-        log.debug('make_layout: axes')
+        log.debug('qc layout: axes')
         layout_xaxis = layout_axis_defaults()
         layout_yaxis = layout_axis_defaults()
 
-        log.debug('make_layout: legend')
+        log.debug('qc layout: legend')
         layout_legend = dict(
             bgcolor = 'white',
             bordercolor = 'Black',
@@ -132,39 +312,215 @@ def make_layout(title='', bgcolor='aliceblue', fontsize=12):
             traceorder = 'normal',
         )
 
-        log.debug('make_layout: margins')
-        layout_margins = dict(
-            l = 5,  r = 5,
-            t = 65, b = 5,
-            pad = 0,
-            autoexpand = True
-        )
-
-        log.debug('make_layout: object')
-        layout = go.Layout(
+        log.debug('qc layout: object')
+        layout = dict(
             font = dict(size=fontsize),
             plot_bgcolor = bgcolor,
-            title = title,
             autosize = True,
             hidesources = True,
             hovermode = 'y',
             dragmode = 'pan',
             showlegend = True,
             legend = layout_legend,
-            margin = layout_margins,
+            margin = dict(QC_LAYOUT_MARGIN),
             xaxis = layout_xaxis,
             yaxis = layout_yaxis,
         )
-        # log.debug('made layout: %s', str(layout))
     except Exception as e:
-        log.exception('make_layout NOT made!!')
+        log.exception('qc layout NOT made!!')
         raise e
     else:
         return layout
 
 
-def plot_bar_chart(fp, df):
-    """create bar chart from passed dataframe, then save result in fp.parent
+# plotly template of QC figures: plotly's default plus qc_layout_defaults,
+# registered once, and named by each figure's layout: pages define it once,
+# see lean_figures.templates_js
+QC_TEMPLATE = 'runqc'
+
+def register_qc_template(name=QC_TEMPLATE):
+    """register plotly template of QC figures as name, return it"""
+    template = go.layout.Template(pio.templates[pio.templates.default])
+    template.layout.update(qc_layout_defaults())
+    pio.templates[name] = template
+    return template
+
+register_qc_template()
+
+
+def qc_figure(data, layout):
+    """return go.Figure of data and layout dicts, validated by plotly"""
+    return go.Figure(data=data, layout=layout)
+
+
+def layout_dict(title='', bgcolor=None, fontsize=None):
+    """return dict of plotly layout of the QC template, with its own title.
+    bgcolor, fontsize: override the template's.
+    The dict returned can be modified as needed; its template is by name.
+    """
+    layout = dict(
+        template = QC_TEMPLATE,
+        title = title if isinstance(title, dict) else dict(text=title),
+        xaxis = dict(),
+        yaxis = dict(),
+    )
+    if bgcolor:
+        layout['plot_bgcolor'] = bgcolor
+    if fontsize:
+        layout['font'] = dict(size=fontsize)
+    return layout
+
+
+# x axis of totals column at right side of bar charts: its own part of the plot
+# width, right of the bars' axis, fixed at [0, 1] so its texts stay put on pan
+# and zoom, never over the bars
+TOTALS_XAXIS = 'x2'
+TOTALS_COLUMN_WIDTH = 0.1 # of plot width
+TOTALS_XAXIS_LAYOUT = MappingProxyType(dict(
+    domain = (1 - TOTALS_COLUMN_WIDTH, 1),
+    range = (0, 1),
+    autorange = False,
+    fixedrange = True,
+    visible = False,
+))
+# WhiteSmoke background of totals column, behind its texts
+TOTALS_SHAPE = MappingProxyType(dict(
+    type = 'rect',
+    xref = TOTALS_XAXIS, x0 = 0, x1 = 1,
+    yref = 'paper', y0 = 0, y1 = 1,
+    fillcolor = 'WhiteSmoke',
+    line = {'width': 0},
+    layer = 'below',
+))
+
+def totals_trace(y_names, texts, name='total'):
+    """return dict of scatter trace of texts at right side of bar chart, one per sample:
+       one trace drawn at once, rather than an annotation (DOM node) per sample.
+    """
+    return dict(
+        type = 'scatter',
+        mode = 'text',
+        name = name,
+        x = [1] * len(y_names),
+        y = y_names,
+        xaxis = TOTALS_XAXIS,
+        text = texts,
+        textposition = 'middle left',
+        textfont = {'size': 11, 'color': 'Black'},
+        cliponaxis = False,
+        hoverinfo = 'skip',
+        showlegend = False,
+    )
+
+
+def add_totals_column(layout):
+    """add totals column, of totals_trace, at right side of bar chart layout dict:
+       the bars' x axis narrowed to leave room for it, and its background shape
+    """
+    layout['xaxis']['domain'] = (0, TOTALS_XAXIS_LAYOUT['domain'][0])
+    layout['xaxis2'] = dict(TOTALS_XAXIS_LAYOUT)
+    layout.setdefault('shapes', []).append(dict(TOTALS_SHAPE))
+    return layout
+
+
+def _axis_ref(letter, number):
+    """return plotly reference of axis number, e.g. 'x', 'x2'"""
+    return letter if number == 1 else f'{letter}{number}'
+
+def _axis_key(ref):
+    """return layout key of axis reference, e.g. 'x2' -> 'xaxis2'"""
+    return ref[0] + 'axis' + ref[1:]
+
+
+def facet_specs(specs, title='', row_gap=80):
+    """return (traces, layout) dicts of one figure of charts in rows, top to bottom,
+       sharing their x axes and legend.
+    params:
+        specs: [(traces, layout), ...] of charts on axes x, y (and TOTALS_XAXIS),
+               as of bar_chart_spec; each row as high as its chart's plot area
+        title: figure title; each row's title is shown above it
+        row_gap: pixels above each row, for its title and top axis
+    """
+    margins = QC_LAYOUT_MARGIN['t'] + QC_LAYOUT_MARGIN['b']
+    rows = len(specs)
+    row_heights = [max(spec_layout.get('height', 450) - margins, 50)
+                   for _, spec_layout in specs]
+    plot_height = sum(row_heights) + row_gap * rows
+
+    layout = layout_dict(title=dict(text=title, font=plot_figure_title_font))
+    del layout['xaxis'], layout['yaxis'] # per row
+    layout['height'] = plot_height + margins
+    if 'barmode' in specs[0][1]:
+        layout['barmode'] = specs[0][1]['barmode']
+
+    traces, annotations, shapes, legend_names = [], [], [], set()
+    top = 1.0
+    for row, ((spec_traces, spec_layout), row_height) in enumerate(zip(specs, row_heights), 1):
+        top -= row_gap / plot_height
+        bottom = max(top - row_height / plot_height, 0)
+        x, y = _axis_ref('x', row), _axis_ref('y', row)
+        totals_x = _axis_ref('x', rows + row)
+
+        layout[_axis_key(x)] = dict(spec_layout.get('xaxis', {}), anchor=y)
+        if row > 1:
+            layout[_axis_key(x)]['matches'] = 'x'
+        layout[_axis_key(y)] = dict(spec_layout.get('yaxis', {}), anchor=x,
+                                    domain=[bottom, top])
+        if 'xaxis2' in spec_layout: # totals column
+            layout[_axis_key(totals_x)] = dict(spec_layout['xaxis2'], anchor=y)
+
+        for trace in spec_traces:
+            trace = dict(trace, yaxis=y,
+                         xaxis=totals_x if trace.get('xaxis') == TOTALS_XAXIS else x)
+            name = trace.get('name')
+            if trace.get('showlegend', True) and name is not None:
+                # one legend entry toggles the traces of all rows
+                trace['legendgroup'] = name
+                trace['showlegend'] = name not in legend_names
+                legend_names.add(name)
+            traces.append(trace)
+
+        spec_title = spec_layout.get('title', {})
+        if spec_title.get('text'):
+            annotations.append(dict(
+                text = spec_title['text'],
+                font = spec_title.get('font', plot_figure_title_font),
+                showarrow = False,
+                xref = 'paper', x = 0, xanchor = 'left',
+                yref = 'paper', y = top, yanchor = 'bottom',
+                yshift = row_gap // 2 - 10,
+            ))
+        for annot in spec_layout.get('annotations', []):
+            annot = dict(annot)
+            if annot.get('yref') == 'paper':
+                annot['y'] = bottom + annot.get('y', 0.5) * (top - bottom)
+            else:
+                annot['yref'] = y
+            if annot.get('xref') != 'paper':
+                annot['xref'] = x
+            annotations.append(annot)
+        for shape in spec_layout.get('shapes', []):
+            shape = dict(shape)
+            if shape.get('yref') == 'paper':
+                shape['y0'] = bottom + shape.get('y0', 0) * (top - bottom)
+                shape['y1'] = bottom + shape.get('y1', 1) * (top - bottom)
+            else:
+                shape['yref'] = y
+            if shape.get('xref') == TOTALS_XAXIS:
+                shape['xref'] = totals_x
+            elif shape.get('xref') != 'paper':
+                shape['xref'] = x
+            shapes.append(shape)
+        top = bottom
+
+    layout['annotations'] = annotations
+    if shapes:
+        layout['shapes'] = shapes
+    return traces, layout
+
+
+def bar_chart_spec(fp, df):
+    """return (traces, layout) dicts of bar chart of passed dataframe
     params:
         fp: Path of data file
         df: pandas dataframe
@@ -172,7 +528,6 @@ def plot_bar_chart(fp, df):
     try:
         log.info('Creating bar chart for %s', fp.name)
 
-        image_name = fp.stem #+ '.svg'
         try:
             log.debug('bar_chart: gonna make layout')
             layout_title_text = ''.join([
@@ -183,20 +538,27 @@ def plot_bar_chart(fp, df):
                 '[download ', fp.suffix[1:], ' file]',
                 '</a>'
             ])
+            if df.attrs.get('window'): # only some samples shown
+                layout_title_text += ''.join([
+                    '<br><span style="font-size: 0.7em">', df.attrs['window'], ' ',
+                    window_links(df.attrs['page'], df.attrs['page_size'],
+                                 df.attrs['samples'], args=df.attrs['args']),
+                    '</span>'
+                ])
             layout_title = dict(text=layout_title_text, font=plot_figure_title_font)
-            layout = make_layout(title=layout_title)
+            layout = layout_dict(title=layout_title)
 
             log.debug('bar_chart: gonna modify layout specs')
-            layout.barmode = 'stack'
+            layout['barmode'] = 'stack'
 
             # height = number of records plus top and bottom margins
             plot_height = df.index.size * 25 \
-                          + layout.margin['t'] \
-                          + layout.margin['b']
-            layout.height = plot_height
+                          + QC_LAYOUT_MARGIN['t'] \
+                          + QC_LAYOUT_MARGIN['b']
+            layout['height'] = plot_height
 
             log.debug('bar_chart: gonna modify layout spec: xaxis')
-            layout.xaxis.update(dict(
+            layout['xaxis'].update(dict(
                 # title = 'Number of Reads',
                 ticksuffix = ' reads',
                 tickangle = -3,
@@ -205,18 +567,19 @@ def plot_bar_chart(fp, df):
 
             log.debug('bar_chart: gonna modify layout spec: yaxis')
             text_max_len = 40
+            y_names = to_list(df.index)
             y_ticktexts = []
-            for n in df.index:
+            for n in y_names:
                 y_ticktexts.append(
                     n if len(n)<text_max_len
                     else n[0:text_max_len]+u'\u2026' # ellipsis
                 )
-            layout.yaxis.update(dict(
+            layout['yaxis'].update(dict(
                 showspikes = False,
                 mirror = False,
                 tickangle = 0,
                 tickmode = 'array',
-                tickvals = df.index,
+                tickvals = y_names,
                 ticktext = y_ticktexts,
             ))
 
@@ -227,28 +590,13 @@ def plot_bar_chart(fp, df):
             raise e
 
         try:
-            log.debug('bar_chart: gonna create annotations right side column "total" reads')
-            annotations = []
-            annot_defaults = dict(
-                font = {'size': 11, 'color': 'Black'},
-                align = 'right',
-                bgcolor = 'WhiteSmoke',
-                borderwidth = 0,
-                borderpad = 1,
-                showarrow = False,
-                xanchor = 'right',
-                xref = 'paper',
-                x = 1,
-                yref = 'y',
-            )
-            # pop column 'total' values for annotation display
-            for row_num, total in enumerate(df.pop('total')):
-                annotations.append(dict(
-                    **annot_defaults,
-                    text = f'<b>{total}</b>',
-                    y = row_num,
-                ))
+            log.debug('bar_chart: gonna create right side column "total" reads')
+            # pop column 'total' values for text trace display
+            totals = totals_trace(y_names, [f'<b>{total}</b>'
+                                            for total in to_list(df.pop('total'))])
+            add_totals_column(layout)
             log.debug('bar_chart: gonna create total column label annotation')
+            annotations = []
             annotations.append(dict(
                 text = '<b>All Reads</b>',
                 textangle = 0,
@@ -271,7 +619,7 @@ def plot_bar_chart(fp, df):
             log.debug('bar_chart: gonna assign layout annotations')
             layout['annotations'] = annotations
         except Exception as e:
-            log.exception('bar_chart: layout annotations NOT made')
+            log.exception('bar_chart: totals column NOT made')
             raise e
 
         try:
@@ -280,42 +628,82 @@ def plot_bar_chart(fp, df):
             for i in range(df.columns.size):
                 colname = df.columns[i]
                 # log.debug('bar_chart: column: %s', colname)
-                bar = go.Bar(
+                values = to_list(df[colname])
+                bar = dict(
+                    type = 'bar',
                     orientation = 'h',
                     name = colname,
                     hoverinfo = "x+name",
                     hoverlabel = {'namelength':-1},
                     marker = {'color': plot_colors[i],
                               'line': marker_line},
-                    x = df[colname],
-                    y = df.index,
-                    text = df[colname],
+                    x = values,
+                    y = y_names,
+                    text = [str(v) for v in values],
                     textposition = 'inside',
                     textfont = {'size': 14,
                                 'color': 'Black'},
                 )
                 data.append(bar)
+            data.append(totals) # over the bars
             # log.debug('bar_chart: data: %s', str(data))
         except Exception as e:
             log.exception('bar_chart: data traces NOT made')
             raise e
 
-        try:
-            log.debug('bar_chart: gonna make figure')
-            fig = go.Figure(data=data, layout=layout)
-            # log.debug('bar_chart: figure %s', str(fig.__dict__))
-        except Exception as e:
-            log.exception('bar_chart: figure')
-            raise e
+    except Exception as e:
+        log.exception('bar_chart: plotting for file "%s"', fp.name)
+        raise e
+    else:
+       return data, layout
+
+
+def bar_chart_figure(fp, df):
+    """create bar chart Figure from passed dataframe, validated by plotly"""
+    data, layout = bar_chart_spec(fp, df)
+    try:
+        log.debug('bar_chart: gonna make figure')
+        fig = qc_figure(data, layout)
+        # log.debug('bar_chart: figure %s', str(fig.__dict__))
+    except Exception as e:
+        log.exception('bar_chart: figure')
+        raise e
+    else:
+        return fig
+
+
+def bar_chart_dict(fp, df):
+    """create bar chart figure dict from passed dataframe, not validated"""
+    return figure_dict(*bar_chart_spec(fp, df))
+
+
+# mode bar buttons removed from read counts bar charts
+BAR_CHART_BUTTONS_TO_REMOVE = ('toggleSpikelines',
+                               # 'sendDataToCloud',
+                               'lasso')
+
+def plot_bar_chart(fp, df, profile=None, validate=False):
+    """create bar chart from passed dataframe, return plotly div
+    params:
+        fp: Path of data file
+        df: pandas dataframe
+        profile: PlotProfile of figure, default full
+        validate: build go.Figure validated by plotly, else lean figure dict
+    """
+    try:
+        image_name = fp.stem #+ '.svg'
 
         try:
             log.debug('bar_chart: gonna make plot')
-            plotly_config['modeBarButtonsToRemove'] = ['toggleSpikelines',
-                                                       # 'sendDataToCloud',
-                                                       'lasso']
-
-            plot_opts['config']['toImageButtonOptions']['filename'] = image_name
-            plot = ply.plot(fig, **plot_opts)
+            config = figure_config(image_name,
+                                   modeBarButtonsToRemove=BAR_CHART_BUTTONS_TO_REMOVE)
+            if not validate:
+                return plot_div(*profiled(bar_chart_dict(fp, df), config, profile))
+
+            fig, config = profiled(bar_chart_figure(fp, df), config, profile)
+            if isinstance(fig, dict):
+                return plot_div(fig, config)
+            plot = ply.plot(fig, config=config, **plot_opts)
         except Exception as e:
             log.exception('bar_chart: plot not working')
             raise e
@@ -327,76 +715,299 @@ def plot_bar_chart(fp, df):
        return plot
 
 
-def calc_read_diffs(df_orig, columns=[]):
-    """Caclulate differences between steps of pipeline, return new dataframe"""
-    if not columns:
-        # expected columns = ['raw', 'trimmed', 'combined', 'nonchimera', 'nonhost']
-        columns = df.columns
-    diffcols = ['final', 'host', 'chimera', 'uncombined', 'trimmed', 'total']
+# pipe logs have header:
+#       Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost
+# Renamed here for plot display, reads left after each step of pipeline:
+READ_COUNT_STEPS = ['raw', 'trimmed', 'combined', 'nonchimera', 'nonhost']
+# reads removed in each step, plus final and starting (total) counts
+READ_LOSS_COLUMNS = ['final', 'host', 'chimera', 'uncombined', 'trimmed', 'total']
+READ_COUNT_DTYPE = np.int32
+READ_COUNT_COLUMNS = ['Sample_Name'] + READ_COUNT_STEPS
+# declared csv dtypes: floats hold counts of missing values (NaN) until zeroed
+READ_COUNT_CSV_DTYPES = dict({'Sample_Name': str},
+                             **{step: np.float64 for step in READ_COUNT_STEPS})
+# values of counts of steps not run (or failed) on sample, read as zero reads
+# N.B. besides pandas' defaults e.g. '', 'NA', 'N/A', 'nan'
+READ_COUNT_MISSING = ('Missing', 'missing', 'MISSING', '-')
+# csv parser of QC logs, unless the app's RUN_READ_COUNTS_CSV_ENGINE;
+# N.B. plot processes have no app, so parse with this one
+READ_COUNTS_CSV_ENGINE = 'c'
+
+
+def read_losses(counts):
+    """return array of reads removed in each step, from array of step counts.
+    params:
+        counts: int array (samples, READ_COUNT_STEPS), reads left after each step
+    return: array (samples, READ_LOSS_COLUMNS) of same dtype
+    """
+    counts = np.asarray(counts)
+    steps = counts[:, ::-1] # nonhost ... raw
+    losses = np.empty((counts.shape[0], len(READ_LOSS_COLUMNS)), dtype=counts.dtype)
+    losses[:, 0] = steps[:, 0]
+    # each step's count minus that of the step after it, all at once
+    np.subtract(steps[:, 1:], steps[:, :-1], out=losses[:, 1:-1])
+    losses[:, -1] = steps[:, -1]
+    return losses
+
 
+def calc_read_diffs(df_orig, columns=READ_COUNT_STEPS):
+    """Caclulate differences between steps of pipeline, return new dataframe"""
     try:
-        diff_df = pd.DataFrame(columns=diffcols, dtype='int64')
-        diff_df.total      = df_orig.raw
-        diff_df.final      = df_orig.nonhost
-        diff_df.host       = df_orig.eval('nonchimera - nonhost')
-        diff_df.chimera    = df_orig.eval('combined - nonchimera')
-        diff_df.uncombined = df_orig.eval('trimmed - combined')
-        diff_df.trimmed    = df_orig.eval('raw - trimmed')
+        counts = df_orig[list(columns)].to_numpy()
+        diff_df = pd.DataFrame(read_losses(counts), index=df_orig.index,
+                               columns=READ_LOSS_COLUMNS)
     except Exception as e:
-        log.exception('Issues getting diffs from "%s"', )
+        log.exception('Issues getting diffs of columns %s', columns)
         raise e
-    finally:
-        return diff_df
+    return diff_df
+
+
+def read_counts_csv_engine():
+    """return pandas csv parser of QC logs: the app's RUN_READ_COUNTS_CSV_ENGINE,
+       e.g. 'pyarrow' (of pandas >= 1.4), else READ_COUNTS_CSV_ENGINE
+    """
+    if has_app_context():
+        return current_app.config.get('RUN_READ_COUNTS_CSV_ENGINE') or READ_COUNTS_CSV_ENGINE
+    return READ_COUNTS_CSV_ENGINE
 
 
-def plot_16S_read_counts(run_path, flowcell=None, sort_by='nonhost'):
+def load_read_counts(fp, engine=None):
+    """read one 16S pipeline QC log, return dataframe of READ_COUNT_DTYPE step counts,
+       indexed by sample name. Counts of READ_COUNT_MISSING values, e.g. 'Missing',
+       or other non-numeric text, are zero; samples without a name are left out.
+    params:
+        engine: pandas csv parser, default read_counts_csv_engine()
+    """
+    engine = engine or read_counts_csv_engine()
+    read_opts = dict(header=0, names=READ_COUNT_COLUMNS, index_col=0,
+                     na_values=list(READ_COUNT_MISSING), engine=engine)
+    try: # numbers parsed as declared, missing values as NaN
+        df = pd.read_csv(fp, dtype=READ_COUNT_CSV_DTYPES, **read_opts)
+    except ValueError: # unexpected text in counts, as NaN
+        log.warning('Non-numeric read counts in file "%s"', fp.name)
+        read_opts['engine'] = 'c'
+        df = pd.read_csv(fp, dtype={'Sample_Name': str}, **read_opts)
+        df = df.apply(pd.to_numeric, errors='coerce')
+
+    df = df.loc[df.index.notna()]
+    counts = np.nan_to_num(df.to_numpy(dtype=np.float64), copy=False)
+    return pd.DataFrame(counts.astype(READ_COUNT_DTYPE, copy=False),
+                        index=df.index, columns=READ_COUNT_STEPS)
+
+
+def read_step_counts(fp):
+    """read one 16S pipeline QC log, return (sample names, array of step counts).
+       The parsed counts are cached on the file's fingerprint.
+    """
+    df = cached_frame('16S_read_counts.frame', [fp], lambda: load_read_counts(fp))
+    return df.index.to_numpy(), df.to_numpy()
+
+
+# samples of read counts plots, for runs too large to plot every sample:
+#   top:  only the N samples of least final reads
+#   page: only page number (from 1) of page_size samples, in sorted order
+#   others: add a row of the mean of samples not shown
+#   args: other request args of the page, kept in its links to pages, e.g. 'mode=lite'
+PlotWindow = namedtuple('PlotWindow', ['top', 'page', 'page_size', 'others', 'args'])
+PlotWindow.__new__.__defaults__ = (None, None, None, True, '')
+PLOT_PAGE_SIZE = 200
+
+
+def window_read_counts(df, window):
+    """return rows of read losses dataframe within window (a PlotWindow, or None).
+       A windowed frame's attrs hold 'samples' (all of file), 'window' (description),
+       its 'page' (0 if not paged) and 'page_size', and 'args' of links to pages.
+    """
+    samples = len(df.index)
+    if window is None:
+        return df
+    page_size = window.page_size or PLOT_PAGE_SIZE
+    page = window.page
+    if page:
+        page = min(page, max(-(-samples // page_size), 1)) # past the last: the last
+        start = (page - 1) * page_size
+        shown = np.zeros(samples, dtype=bool)
+        shown[start:start + page_size] = True
+        note = f'samples {min(start + 1, samples):,}-{min(start + page_size, samples):,}' \
+               f' of {samples:,}'
+    elif window.top and samples > window.top:
+        shown = np.zeros(samples, dtype=bool)
+        shown[np.argsort(df['final'].to_numpy(), kind='stable')[:window.top]] = True
+        note = f'{window.top:,} samples of least final reads, of {samples:,}'
+    else:
+        return df
+
+    windowed = df[shown]
+    if window.others and not shown.all():
+        rest = df[~shown]
+        others = pd.DataFrame([rest.mean().round().astype(df.dtypes.iloc[0]).to_numpy()],
+                              columns=df.columns,
+                              index=pd.Index([f'{len(rest.index):,} other samples (mean)'],
+                                             name=df.index.name))
+        windowed = pd.concat([windowed, others])
+    windowed.attrs.update(samples=samples, window=note,
+                          page=page or 0, page_size=page_size, args=window.args)
+    return windowed
+
+
+def window_links(page, page_size, samples, args=''):
+    """return html links to pages of samples next to page (0: not paged)
+       args: other request args of links, e.g. 'mode=lite'
+    """
+    args = f'&{args}' if args else ''
+    if not page:
+        return f'<a href="?page=1&page_size={page_size}{args}">[all samples, by page]</a>'
+    pages = -(-samples // page_size)
+    links = []
+    for label, to_page in [('previous', page - 1), ('next', page + 1)]:
+        if 1 <= to_page <= pages:
+            links.append(f'<a href="?page={to_page}&page_size={page_size}{args}">'
+                         f'[{label} {page_size}]</a>')
+    return ' '.join(links)
+
+
+def read_counts_frames(fpaths, sort_by='nonhost', window=None):
+    """read 16S pipeline QC logs, return OrderedDict {fp: dataframe of reads removed
+       in each step}. Losses of all files' samples are computed as one batch.
+       Files that can not be read are logged and left out.
+    params:
+        sort_by: step count samples are sorted by, ascending (or None)
+        window: PlotWindow of samples of each file, or None for all
+    """
+    names, counts = OrderedDict(), []
+    for fp in fpaths:
+        try:
+            names[fp], fp_counts = read_step_counts(fp)
+        except Exception:
+            log.exception('Issues reading read counts: file "%s"', fp.name)
+            continue
+        counts.append(fp_counts)
+    if not names:
+        return OrderedDict()
+
+    counts = np.concatenate(counts)
+    losses = read_losses(counts)
+    sort_col = READ_COUNT_STEPS.index(sort_by) if sort_by else None
+
+    frames = OrderedDict()
+    start = 0
+    for fp, samples in names.items():
+        stop = start + len(samples)
+        fp_losses = losses[start:stop]
+        if sort_col is not None:
+            order = np.argsort(counts[start:stop, sort_col], kind='stable')
+            samples, fp_losses = samples[order], fp_losses[order]
+        frames[fp] = window_read_counts(
+            pd.DataFrame(fp_losses, columns=READ_LOSS_COLUMNS,
+                         index=pd.Index(samples, name='Sample_Name')),
+            window)
+        start = stop
+    return frames
+
+
+def read_counts_frame(fp, sort_by='nonhost', window=None):
+    """read one 16S pipeline QC log, return dataframe of reads removed in each step"""
+    frames = read_counts_frames([fp], sort_by=sort_by, window=window)
+    if fp not in frames:
+        raise ValueError(f'read counts not read from file "{fp.name}"')
+    return frames[fp]
+
+
+def read_counts_json(fp, window=None, profile=None, sort_by='nonhost'):
+    """read one 16S pipeline QC log, return json of its read counts figure"""
+    fig = bar_chart_dict(fp, read_counts_frame(fp, sort_by=sort_by, window=window))
+    config = figure_config(fp.stem, modeBarButtonsToRemove=BAR_CHART_BUTTONS_TO_REMOVE)
+    return figures_json([(fig, config)], profile=profile)
+
+
+# plots of all of a run's pipeline files together: one figure, of a row per file
+COMBINED_STEM = 'combined'
+
+def render_combined(render, fpaths, namespace, params=(), inventory=None):
+    """return render(fpaths, *params) of all files together, or None if it fails.
+    Output is cached on the fingerprints of all files.
+    """
+    fingerprint = inventory.fingerprint if inventory else file_fingerprint
+    key = artifact_key(namespace, fpaths, params, fingerprint)
+    output = get_artifact(namespace, key, memory=plot_cache)
+    if output is None:
+        try:
+            output = render(fpaths, *params)
+        except Exception:
+            log.exception('Issues rendering %s files together', len(fpaths))
+            return None
+        put_artifact(namespace, key, output, memory=plot_cache)
+    return output
+
+
+def read_counts_combined_dict(fpaths, sort_by='nonhost', window=None):
+    """read 16S pipeline QC logs, return figure dict of their read counts in rows"""
+    frames = read_counts_frames(fpaths, sort_by=sort_by, window=window)
+    if not frames:
+        raise ValueError(f'read counts not read from {len(fpaths)} files')
+    return figure_dict(*facet_specs(
+        [bar_chart_spec(fp, df) for fp, df in frames.items()],
+        title=f'Read Counts of {len(frames)} Projects'))
+
+
+def plot_16S_read_counts_combined(fpaths, sort_by='nonhost', window=None, profile=None):
+    """read 16S pipeline QC logs, return plotly div of their read counts in one figure"""
+    config = figure_config(f'pipe_16S_QC-{COMBINED_STEM}',
+                           modeBarButtonsToRemove=BAR_CHART_BUTTONS_TO_REMOVE)
+    fig = read_counts_combined_dict(fpaths, sort_by=sort_by, window=window)
+    return plot_div(*profiled(fig, config, profile))
+
+
+def read_counts_combined_json(fpaths, window=None, profile=None, sort_by='nonhost'):
+    """read 16S pipeline QC logs, return json of their read counts figure"""
+    config = figure_config(f'pipe_16S_QC-{COMBINED_STEM}',
+                           modeBarButtonsToRemove=BAR_CHART_BUTTONS_TO_REMOVE)
+    fig = read_counts_combined_dict(fpaths, sort_by=sort_by, window=window)
+    return figures_json([(fig, config)], profile=profile)
+
+
+def plot_16S_read_counts(run_path, flowcell=None, sort_by='nonhost', inventory=None,
+                         processes=0, window=None, combined=False, profile=None):
     """if 16S pipeline's log of number of reads deleted from each step exists,
        then create plots from the csv data within.
        Return the plotly-specific interactive output, or only the svg data.
+       Plots are cached on each file's fingerprint (in memory and the artifact store),
+       so unchanged files are not re-plotted.
+       processes: number of processes rendering plots of several files
+       window: PlotWindow of samples plotted of each file, or None for all
+       combined: plot several files in one figure, {COMBINED_STEM: plot}
+       profile: PlotProfile of plots, default full
     """
     log.info('Plotting 16S pipeline QC')
     plot_map = {} # e.g. {'file.name': 'path to plotly output html file or svg image'}
     try:
         # check file(s) exist / find files by glob suffix .csv
         try:
-            fpaths = find_pipeline_qc_files(run_path)
+            inventory = inventory or get_run_inventory(run_path)
+            fpaths = find_pipeline_qc_files(run_path, inventory=inventory)
             # log.debug('plot_16S: fpaths: %s', str(fpaths))
         except Exception as e:
             log.exception('Issues finding files in "%s"', run_path)
             raise e
 
+        if combined and len(fpaths) > 1:
+            plot = render_combined(plot_16S_read_counts_combined, fpaths,
+                                   '16S_read_counts.combined',
+                                   params=(sort_by, window, profile),
+                                   inventory=inventory)
+            if plot is not None:
+                plot_map[COMBINED_STEM] = plot
+                return plot_map
+            log.warning('Plotting files of "%s" one by one', run_path)
+
         try:
-            # read contents of each filepath
-            # pipe logs have header:
-            #       Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost
-            # Renamed here for plot display:
-            readcnts = ['raw', 'trimmed', 'combined', 'nonchimera', 'nonhost']
-            colnames = ['Sample_Name'] + readcnts
-            log.debug('plot_16S: colnames=%s', str(colnames))
-            for fp in fpaths:
-                df_read = pd.read_csv(fp, header=0, names=colnames, index_col=0)
-                # replace non-numeric values e.g. 'Missing' with zeros
-                df = df_read.replace(regex='^.*[^\d].*$', value='0')
-                # exclude NaN indexed sample names (missing, empty fields)
-                df = df.loc[df.index.notna()]
-                # re-convert all 'object' dtypes to 'int'
-                astypes = {col: int for col in df.columns[1:]}
-                df = df.astype(astypes)
-
-                # log.debug('plot_16S: df.columns=%s', str(df.columns))
-                if sort_by:
-                    df.sort_values(by=sort_by, ascending=True, inplace=True)
-
-                try: # calc num reads removed in each pipe step
-                    df = calc_read_diffs(df, columns=readcnts)
-                except Exception as e:
-                    log.exception('Issues calcing read diffs: file "%s" in "%s"', fp.name, run_path)
-                try: # create stacked bar plots
-                    fp_bar = plot_bar_chart(fp, df)
-                except Exception as e:
-                    log.exception('Issues plotting bar: file "%s" in "%s"', fp.name, run_path)
-                else:
-                    plot_map[fp.stem] = fp_bar
+            # read counts of all files computed together, then plotted per file
+            plots = render_pipeline_files(plot_bar_chart, fpaths,
+                                          '16S_read_counts', params=(sort_by, window),
+                                          processes=processes, inventory=inventory,
+                                          batch=read_counts_frames, render_params=(profile,))
+            for fp, fp_bar in plots.items():
+                plot_map[fp.stem] = fp_bar
 
         except Exception as e:
             log.exception('Issues plotting qc files in "%s"', run_path)
@@ -410,13 +1021,47 @@ def plot_16S_read_counts(run_path, flowcell=None, sort_by='nonhost'):
         return plot_map
 
 
-def plot_scatter_chart(fp, df, name=''):
+def read_counts_svg(fp, df):
+    """return html of static svg chart of dataframe of reads removed in each step
+       (of read_counts_frame), for pages without plotly
+    """
+    title = ''.join([
+        'Project ', parse_project_name(fp.stem), ' Read Counts ',
+        ' <a style="font-size: 0.7em" href="', fp.name, '" download>',
+        '[download ', fp.suffix[1:], ' file]',
+        '</a>'
+    ])
+    notes = ''
+    if df.attrs.get('window'): # only some samples shown
+        notes = ' '.join([df.attrs['window'],
+                          window_links(df.attrs['page'], df.attrs['page_size'],
+                                       df.attrs['samples'], args=df.attrs['args'])])
+    svg = bar_chart_svg(df.drop(columns='total'), totals=to_list(df['total']),
+                        suffix='', total_suffix='')
+    return chart_html(title, svg, notes)
+
+
+def svg_16S_read_counts(run_path, sort_by='nonhost', inventory=None, window=None):
+    """return OrderedDict {file stem: html of static svg chart} of read counts
+       of 16S pipeline's QC logs, as plot_16S_read_counts but without plotly
+    """
+    log.info('Charting 16S pipeline QC as svg')
+    inventory = inventory or get_run_inventory(run_path)
+    fpaths = find_pipeline_qc_files(run_path, inventory=inventory)
+    charts = render_pipeline_files(read_counts_svg, fpaths, '16S_read_counts.svg',
+                                   params=(sort_by, window), inventory=inventory,
+                                   batch=read_counts_frames)
+    return OrderedDict((fp.stem, chart) for fp, chart in charts.items())
+
+
+def plot_scatter_chart(fp, df, name='', gl=False):
     """create scatter chart from passed dataframe, return list of resulting traces.
     params:
         fp:  Path of data file
         df:  pandas dataframe
             Note: using only x=index and y=first-column
         name: trace name (in legend)
+        gl:  render with WebGL (Scattergl), for many points
     """
     try:
         log.info('Creating scatter chart for %s', fp.name)
@@ -428,7 +1073,8 @@ def plot_scatter_chart(fp, df, name=''):
                        }
             colname = df.columns[0]
             log.debug(f'scatter_chart: y={colname}')
-            scat = go.Scatter(
+            scatter = go.Scattergl if gl else go.Scatter
+            scat = scatter(
                 x = df.index,
                 y = df[colname],
                 mode = 'markers',
@@ -446,12 +1092,334 @@ def plot_scatter_chart(fp, df, name=''):
         raise e
 
 
-def plot_spike_pcts(run_path, bar_chart=True):
+def plot_density_chart(fp, df, name='', bins=50):
+    """create heatmap of counts of points binned in 2D, from passed dataframe.
+       Its size is of the bins, not of the number of points.
+    params:
+        fp:  Path of data file
+        df:  pandas dataframe
+            Note: using only x=index and y=first-column
+        name: trace name (in legend)
+        bins: number of bins of each axis
+    """
+    log.info('Creating density chart for %s', fp.name)
+    x = df.index.to_numpy(dtype=np.float64)
+    y = df[df.columns[0]].to_numpy(dtype=np.float64)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    # empty bins left blank
+    z = np.where(counts.T > 0, counts.T, np.nan)
+    return go.Heatmap(
+        x = (x_edges[:-1] + x_edges[1:]) / 2,
+        y = (y_edges[:-1] + y_edges[1:]) / 2,
+        z = z,
+        colorscale = 'Blues',
+        colorbar = {'title': {'text': 'Samples'}},
+        hovertemplate = 'x: %{x}<br>y: %{y}<br>samples: %{z}<extra></extra>',
+        hoverongaps = False,
+        name = name,
+    )
+
+
+# spike pcts scatter plots of many samples:
+#   gl_points: above this many, drawn with WebGL (Scattergl)
+#   density_points: above this many (if set), binned server-side as a heatmap of bins**2
+ScatterOptions = namedtuple('ScatterOptions', ['gl_points', 'density_points', 'bins'])
+ScatterOptions.__new__.__defaults__ = (1000, 0, 50)
+
+
+# pipe tsv's have no header line e.g. data:
+# AZMA_J00T4S_1_XC...	OTU_Allobacillus	.13651877133105802000%	21	21340
+SPIKE_PCTS_COLUMNS = ['SampleName', 'SpikeName', 'PctReads', 'SpikeReads', 'TotalReads']
+
+
+def spike_pcts_table(fp):
+    """read one 16S pipeline spike pcts file, return dataframe pivoted per sample:
+       TotalReads, pcts of each spike, TotalPct and TotalSpikeReads.
+    """
+    log.debug('Reading spike tsv file.')
+    df = pd.read_csv(fp, names=SPIKE_PCTS_COLUMNS, sep='\t')
+
+    # remove % signs from PctReads column, convert to float
+    pcts = df['PctReads']
+    if not pd.api.types.is_numeric_dtype(pcts):
+        pcts = pcts.str.rstrip('%')
+    df['PctReads'] = pcts.astype(float)
+
+    # one grouping for pcts and reads of each sample's spikes
+    # N.B. mean of any repeated spike rows, as pivot_table did
+    spikes = df.groupby(['SampleName', 'TotalReads', 'SpikeName'])[['PctReads', 'SpikeReads']] \
+               .mean() \
+               .unstack('SpikeName', fill_value=0)
+
+    df_pivot = spikes['PctReads'].copy()
+    df_pivot['TotalPct'] = df_pivot.sum(axis=1) # sum % all spikes
+
+    df_pivot['TotalSpikeReads'] = spikes['SpikeReads'].sum(axis=1) # sum all spikes' reads
+    df_pivot.reset_index(level='TotalReads', inplace=True) # move index to col
+    return df_pivot
+
+
+def spike_pcts_frame(fp):
+    """read one 16S pipeline spike pcts file, return dataframe pivoted per sample
+       (see spike_pcts_table), cached on the file's fingerprint.
+       The pivoted data is written alongside, as csv for download.
+    """
+    df_pivot = cached_frame('16S_spike_pcts.frame', [fp], lambda: spike_pcts_table(fp))
+    write_pivot_csv(fp, df_pivot)
+    return df_pivot
+
+
+def write_pivot_csv(fp, df_pivot):
+    """write pivoted spike pcts as csv alongside its tsv, unless up to date.
+       The csv gets the tsv's mtime, so a replaced tsv (of any mtime) is re-pivoted.
+    """
+    fp_pivot = fp.with_suffix('.pivot.csv')
+    try:
+        mtime_ns = fp.stat().st_mtime_ns
+        if fp_pivot.exists() and fp_pivot.stat().st_mtime_ns == mtime_ns:
+            return
+        log.debug('pipe spikes: gonna write pivoted data file')
+        atomic_write(fp_pivot, lambda tmp: df_pivot.to_csv(tmp, header=True, index=True))
+        os.utime(str(fp_pivot), ns=(mtime_ns, mtime_ns))
+    except OSError:
+        log.exception('pipe spikes: pivoted data file not written: %s', fp_pivot.name)
+
+
+def write_spike_pivot_csv(fp_pivot):
+    """write pivoted spike pcts csv of its tsv, unless up to date: before its download,
+       as plots cached on the tsv alone skip spike_pcts_frame (and so writing it)
+    """
+    fp_pivot = Path(fp_pivot)
+    fp = fp_pivot.with_name(fp_pivot.name[:-len('.pivot.csv')] + '.tsv')
+    if fp_pivot.name.endswith('.pivot.csv') and fp.is_file():
+        spike_pcts_frame(fp)
+
+
+def spike_scatter_figure(fp, df_pivot, scatter=None):
+    """create scatter Figure of samples' total reads vs total pct spike reads
+       scatter: ScatterOptions of how many samples are drawn how
+    """
+    try: # create total reads/pcts scatter charts
+        fig_title = 'Sample Reads vs % Spike Reads'
+        sub_axes_opts = dict(
+            type = 'linear',
+            rangemode = 'tozero',
+            linecolor = 'black',
+            linewidth = 1,
+            zeroline = True,
+            showline = True,
+            mirror = True,
+            showticklabels = True,
+            ticks = 'outside',
+            tickmode = 'auto',
+            tickangle = 45,
+            ticklen = 5,
+            tickwidth = 2,
+            nticks = 11,
+        )
+
+        df_totals = df_pivot.filter(['TotalReads','TotalPct'])
+        df_totals.set_index('TotalPct', inplace=True)
+        scatter = scatter or ScatterOptions()
+        points = len(df_totals.index)
+        if scatter.density_points and points > scatter.density_points:
+            fp_scatter = plot_density_chart(fp, df_totals, name=fig_title,
+                                            bins=scatter.bins)
+        else:
+            fp_scatter = plot_scatter_chart(fp, df_totals, name=fig_title,
+                                            gl=points > scatter.gl_points)
+    except Exception as e:
+        log.exception('Issues plotting scatter: file "%s"', fp.name)
+        raise e
+    else:
+        fig = go.Figure(data=fp_scatter)
+        # fig.update_layout(title=fig_title)
+        fig.update_xaxes(title_text='% Spike Reads', ticksuffix='%',
+                         **sub_axes_opts)
+        fig.update_yaxes(title_text='Sample Reads',
+                         **sub_axes_opts)
+
+    log.debug('fig.layout: layout title')
+    fp_pivot = fp.with_suffix('.pivot.csv')
+    layout_title_text = ''.join([
+        f'Project {parse_project_name(fp.stem)!s} Spike Reads',
+        ' <a style="font-size: 0.7em" href="', fp_pivot.name, '" download>',
+        '[download ', fp_pivot.suffix[1:], ' file]',
+        '</a>'
+    ])
+    layout_title = dict(text=layout_title_text, font=plot_figure_title_font)
+    fig.layout.title = layout_title
+    fig.layout.showlegend = False
+    # log.debug(f'fig.layout: {fig.layout}')
+    return fig
+
+
+def spike_bars_frame(df_pivot):
+    """return frame of spike pcts bar chart: pcts of each spike and total, total ascending"""
+    df = df_pivot.drop(columns=['TotalReads', 'TotalSpikeReads'])
+    return df.sort_values(by='TotalPct', ascending=True)
+
+
+def spike_pcts_figures(fp, validate=False, scatter=None):
+    """read one 16S pipeline spike pcts file, return list of (figure, image name):
+       scatter of total reads vs pcts, then grouped bar chart of pcts per spike.
+       validate: bar chart as go.Figure validated by plotly, else lean figure dict
+       scatter: ScatterOptions of scatter plot
+    """
+    figures = []
+    df_pivot = spike_pcts_frame(fp)
+    fig = spike_scatter_figure(fp, df_pivot, scatter=scatter)
+    figures.append((fig, fp.with_suffix('.scatter').name))
+
+    try: # create grouped bar chart od spike %reads
+        df_bars = spike_bars_frame(df_pivot)
+        if validate:
+            fig_bar = spikes_grouped_bar_figure(fp, df_bars)
+        else:
+            fig_bar = spikes_grouped_bar_dict(fp, df_bars)
+    except Exception:
+        log.exception('Issues plotting bar: file "%s"', fp.name)
+    else:
+        figures.append((fig_bar, fp.with_suffix('.bar').name))
+
+    return figures
+
+
+def plot_spike_pcts_file(fp, scatter=None, profile=None, validate=False):
+    """read one 16S pipeline spike pcts file, return list of its plotly outputs:
+       scatter of total reads vs pcts, then grouped bar chart of pcts per spike.
+    """
+    return plot_figures(spike_pcts_figures(fp, validate=validate, scatter=scatter),
+                        profile=profile)
+
+
+def plot_figures(figures, profile=None):
+    """return list of plotly outputs of [(figure, image name), ...]
+       figure: go.Figure or figure dict
+       profile: PlotProfile of figures, default full
+    """
+    plots = []
+    for fig, image_name in figures:
+        try:
+            log.debug('pipe spikes: gonna make plot')
+            fig, config = profiled(fig, figure_config(image_name), profile)
+            if isinstance(fig, dict):
+                plot = plot_div(fig, config)
+            else:
+                plot = ply.plot(fig, config=config, **plot_opts)
+            log.debug('pipe spikes: made plot!')
+        except Exception as e:
+            log.exception('pipe spikes: plot not working')
+            raise e
+        else:
+            plots.append(plot)
+    return plots
+
+
+def spike_pcts_json(fp, scatter=None, profile=None):
+    """read one 16S pipeline spike pcts file, return json of its figures"""
+    return figures_json([(fig, figure_config(image_name))
+                         for fig, image_name in spike_pcts_figures(fp, scatter=scatter)],
+                        profile=profile)
+
+
+def spike_pcts_combined_figures(fpaths, scatter=None):
+    """read 16S pipeline spike pcts files, return list of (figure, image name):
+       scatter of all files' samples, a trace per file (or binned together),
+       then grouped bar chart of pcts per spike, a row per file.
+    """
+    frames = OrderedDict()
+    for fp in fpaths:
+        try:
+            frames[fp] = spike_pcts_frame(fp)
+        except Exception:
+            log.exception('Issues reading spike pcts: file "%s"', fp.name)
+    if not frames:
+        raise ValueError(f'spike pcts not read from {len(fpaths)} files')
+    first = next(iter(frames))
+
+    scatter = scatter or ScatterOptions()
+    points = sum(len(df.index) for df in frames.values())
+    if scatter.density_points and points > scatter.density_points:
+        fig = spike_scatter_figure(first, pd.concat(list(frames.values())), scatter=scatter)
+    else:
+        # WebGL for all files, if for all their samples together
+        file_scatter = scatter._replace(density_points=0,
+                                        gl_points=-1 if points > scatter.gl_points else points)
+        fig = None
+        for fp, df_pivot in frames.items():
+            fp_fig = spike_scatter_figure(fp, df_pivot, scatter=file_scatter)
+            fp_fig.update_traces(name=f'Project {parse_project_name(fp.stem)!s}')
+            if fig is None:
+                fig = fp_fig
+            else:
+                fig.add_traces(fp_fig.data)
+        fig.layout.showlegend = True
+    fig.layout.title.text = f'Spike Reads of {len(frames)} Projects'
+
+    fig_bar = figure_dict(*facet_specs(
+        [spikes_grouped_bar_spec(fp, spike_bars_frame(df)) for fp, df in frames.items()],
+        title=f'Percent Spike Reads per Sample of {len(frames)} Projects'))
+    image_name = f'pipe_16S_spike_pcts-{COMBINED_STEM}'
+    return [(fig, image_name + '.scatter'), (fig_bar, image_name + '.bar')]
+
+
+def plot_spike_pcts_combined(fpaths, scatter=None, profile=None):
+    """read 16S pipeline spike pcts files, return list of plotly outputs of all together"""
+    return plot_figures(spike_pcts_combined_figures(fpaths, scatter=scatter),
+                        profile=profile)
+
+
+def spike_pcts_combined_json(fpaths, scatter=None, profile=None):
+    """read 16S pipeline spike pcts files, return json of their figures together"""
+    return figures_json([(fig, figure_config(image_name)) for fig, image_name
+                         in spike_pcts_combined_figures(fpaths, scatter=scatter)],
+                        profile=profile)
+
+
+def spike_pcts_file_svg(fp):
+    """read one 16S pipeline spike pcts file, return list of html of its static svg
+       chart: grouped bars of pcts per spike, for pages without plotly
+    """
+    df = spike_bars_frame(spike_pcts_frame(fp))
+    fp_pivot = fp.with_suffix('.pivot.csv')
+    title = ''.join([
+        f'Project {parse_project_name(fp.stem)!s} Percent Spike Reads per Sample',
+        ' <a style="font-size: 0.7em" href="', fp_pivot.name, '" download>',
+        '[download ', fp_pivot.suffix[1:], ' file]',
+        '</a>'
+    ])
+    svg = bar_chart_svg(df.drop(columns='TotalPct'), totals=to_list(df['TotalPct']),
+                        stacked=False, suffix='%', total_suffix='%')
+    return [chart_html(title, svg)]
+
+
+def svg_spike_pcts(run_path, inventory=None):
+    """return OrderedDict {file stem: [html of static svg chart]} of 16S pipeline's
+       spike pcts files, as plot_spike_pcts but without plotly
+    """
+    log.info('Charting 16S pipeline pct reads of spikes as svg')
+    inventory = inventory or get_run_inventory(run_path)
+    fpaths = find_pipeline_qc_files(run_path, fileglob=PIPELINE_PCTS_GLOB, inventory=inventory)
+    # skip unreadable or empty files
+    fpaths = [fp for fp in fpaths if (inventory.fingerprint(fp) or (None, 0))[1]]
+    charts = render_pipeline_files(spike_pcts_file_svg, fpaths, '16S_spike_pcts.svg',
+                                   inventory=inventory)
+    return OrderedDict((fp.stem, list(chart)) for fp, chart in charts.items())
+
+
+def plot_spike_pcts(run_path, bar_chart=True, inventory=None, processes=0, scatter=None,
+                    combined=False, profile=None):
     """if 16S pipeline's file with percent of spike reads exists:
        then create scatter plots from the tsv data within.
        Return the plotly-specific interactive output, or only the svg data.
+       Plots are cached on each file's fingerprint (in memory and the artifact store).
        params:
          run_path: Path of sequencer run
+         processes: number of processes rendering plots of several files
+         scatter: ScatterOptions of scatter plots, e.g. WebGL or binned for many samples
+         combined: plot several files in the same figures, {COMBINED_STEM: plots}
+         profile: PlotProfile of plots, default full
     """
     log.info('Plotting 16S pipeline pct reads of spikes')
     # pre-create dict of file paths:
@@ -459,7 +1427,9 @@ def plot_spike_pcts(run_path, bar_chart=True):
     try:
         # check file(s) exist / find files by glob suffix .csv
         try:
-            fpaths = find_pipeline_qc_files(run_path, fileglob=PIPELINE_PCTS_GLOB)
+            inventory = inventory or get_run_inventory(run_path)
+            fpaths = find_pipeline_qc_files(run_path, fileglob=PIPELINE_PCTS_GLOB,
+                                            inventory=inventory)
         except Exception as e:
             log.exception('Issues finding files in "%s"', run_path)
             raise e
@@ -471,111 +1441,25 @@ def plot_spike_pcts(run_path, bar_chart=True):
                 log.debug('spike pcts: no files found')
                 return plot_map
 
-            for fp in fpaths:
-                try: # is it empty?
-                    s = fp.stat().st_size
-                    if s==0:
-                        continue
-                except: # is it unreadable?
-                    continue
-
-                # pipe tsv's have no header line e.g. data:
-                # AZMA_J00T4S_1_XC...	OTU_Allobacillus	.13651877133105802000%	21	21340
-                colnames = ['SampleName', 'SpikeName', 'PctReads', 'SpikeReads', 'TotalReads']
-                # log.debug('plot_spikes: colnames=%s', str(colnames))
-
-                """Gen DataFrame from tsv file"""
-                log.debug('Reading spike tsv file.')
-                df = pd.read_csv(fp, names=colnames, sep='\t')
-
-                # remove % signs from PctReads column, convert to float
-                df['PctReads'] = df['PctReads'].str.replace('%$', '', regex=True).astype(float)
-
-                # pivot the data to calc % and total spike reads
-                df_pivot = df.pivot_table(index=['SampleName','TotalReads'],
-                                          columns='SpikeName', values='PctReads',
-                                          fill_value=0)
-                df_pivot['TotalPct'] = df_pivot.agg(np.sum, axis=1) # sum % all spikes
-
-                df_reads = df.pivot_table(index=['SampleName','TotalReads'],
-                                          columns='SpikeName',
-                                          values='SpikeReads', fill_value=0)
-
-                df_pivot['TotalSpikeReads'] = df_reads.agg(sum, axis=1) # sum all spikes' reads
-                df_pivot.reset_index(level='TotalReads', inplace=True) # move index to col
-
-                log.debug('pipe spikes: gonna write pivoted data file')
-                fp_pivot = fp.with_suffix('.pivot.csv')
-                if not fp_pivot.exists():
-                    df_pivot.to_csv(fp_pivot, header=True, index=True,
-                                    chunksize=df_pivot.shape[1]/5)
-
-                try: # create total reads/pcts scatter charts
-                    fig_title = 'Sample Reads vs % Spike Reads'
-                    sub_axes_opts = dict(
-                        type = 'linear',
-                        rangemode = 'tozero',
-                        linecolor = 'black',
-                        linewidth = 1,
-                        zeroline = True,
-                        showline = True,
-                        mirror = True,
-                        showticklabels = True,
-                        ticks = 'outside',
-                        tickmode = 'auto',
-                        tickangle = 45,
-                        ticklen = 5,
-                        tickwidth = 2,
-                        nticks = 11,
-                    )
-
-                    df_totals = df_pivot.filter(['TotalReads','TotalPct'])
-                    df_totals.set_index('TotalPct', inplace=True)
-                    fp_scatter = plot_scatter_chart(fp, df_totals, name=fig_title)
-                except Exception:
-                    log.exception('Issues plotting scatter: file "%s" in "%s"', fp.name, run_path)
-                else:
-                    fig = go.Figure(data=fp_scatter)
-                    # fig.update_layout(title=fig_title)
-                    fig.update_xaxes(title_text='% Spike Reads', ticksuffix='%',
-                                     **sub_axes_opts)
-                    fig.update_yaxes(title_text='Sample Reads',
-                                     **sub_axes_opts)
-
-                log.debug('fig.layout: layout title')
-                layout_title_text = ''.join([
-                    f'Project {parse_project_name(fp.stem)!s} Spike Reads',
-                    ' <a style="font-size: 0.7em" href="', fp_pivot.name, '" download>',
-                    '[download ', fp_pivot.suffix[1:], ' file]',
-                    '</a>'
-                ])
-                layout_title = dict(text=layout_title_text, font=plot_figure_title_font)
-                fig.layout.title = layout_title
-                fig.layout.showlegend = False
-                # log.debug(f'fig.layout: {fig.layout}')
-
-                try:
-                    log.debug('pipe spikes: gonna make plot')
-                    img_path = fp.with_suffix('.scatter')
-                    plot_opts['config']['toImageButtonOptions']['filename'] = img_path.name
-                    plot = ply.plot(fig, **plot_opts)
-                    log.debug('pipe spikes: made scatter plot!')
-                except Exception as e:
-                    log.exception('pipe spikes: plot not working')
-                    raise e
-                else:
-                    plot_map[fp.stem] = [plot]
-
-
-                try: # create grouped bar chart od spike %reads
-                    del df_pivot['TotalReads']
-                    del df_pivot['TotalSpikeReads']
-                    df_pivot.sort_values(by='TotalPct', ascending=True, inplace=True)
-                    plot = plot_spikes_grouped_bar_chart(fp, df_pivot)
-                except Exception:
-                    log.exception('Issues plotting bar: file "%s" in "%s"', fp.name, run_path)
-                else:
-                    plot_map[fp.stem].append(plot)
+            fingerprints = [inventory.fingerprint(fp) for fp in fpaths]
+            # skip unreadable or empty files
+            fpaths = [fp for fp, fpr in zip(fpaths, fingerprints) if fpr and fpr[1]]
+
+            if combined and len(fpaths) > 1:
+                plots = render_combined(plot_spike_pcts_combined, fpaths,
+                                        '16S_spike_pcts.combined',
+                                        params=(scatter, profile), inventory=inventory)
+                if plots is not None:
+                    plot_map[COMBINED_STEM] = list(plots)
+                    return plot_map
+                log.warning('Plotting files of "%s" one by one', run_path)
+
+            # pivot csv is written alongside, for download (see write_spike_pivot_csv)
+            plots = render_pipeline_files(plot_spike_pcts_file, fpaths, '16S_spike_pcts',
+                                          params=(scatter, profile),
+                                          processes=processes, inventory=inventory)
+            for fp, fp_plots in plots.items():
+                plot_map[fp.stem] = list(fp_plots)
 
         except Exception as e:
             log.exception('Issues plotting qc files in "%s"', run_path)
@@ -589,8 +1473,8 @@ def plot_spike_pcts(run_path, bar_chart=True):
         return plot_map
 
 
-def plot_spikes_grouped_bar_chart(fp, df):
-    """create bar chart from passed dataframe, then save result in fp.parent
+def spikes_grouped_bar_spec(fp, df):
+    """return (traces, layout) dicts of grouped bar chart of spike pcts in dataframe
     params:
         fp: Path of data file
         df: pandas dataframe
@@ -607,20 +1491,20 @@ def plot_spikes_grouped_bar_chart(fp, df):
 
         try:
             log.debug('bar_chart: gonna make layout')
-            layout = make_layout()
+            layout = layout_dict(title=fig_title)
 
             log.debug('bar_chart: gonna modify layout specs')
-            layout.barmode = 'group'
+            layout['barmode'] = 'group'
 
             # height = number of records plus top and bottom margins
             plot_height = df.index.size * 25 \
-                          + layout.margin['t'] \
-                          + layout.margin['b']
-            layout.height = plot_height
+                          + QC_LAYOUT_MARGIN['t'] \
+                          + QC_LAYOUT_MARGIN['b']
+            layout['height'] = plot_height
             log.debug(f'bar_chart: plot height: {plot_height}')
 
             log.debug('bar_chart: gonna modify layout spec: xaxis')
-            layout.xaxis.update(dict(
+            layout['xaxis'].update(dict(
                 showspikes = False,
                 ticksuffix = '%',
                 tickangle = 15,
@@ -629,18 +1513,19 @@ def plot_spikes_grouped_bar_chart(fp, df):
 
             log.debug('bar_chart: gonna modify layout spec: yaxis')
             text_max_len = 40
+            y_names = to_list(df.index)
             y_ticktexts = []
-            for n in df.index:
+            for n in y_names:
                 y_ticktexts.append(
                     n if len(n)<text_max_len
                     else n[0:text_max_len]+u'\u2026' # ellipsis
                 )
-            layout.yaxis.update(dict(
+            layout['yaxis'].update(dict(
                 showspikes = False,
                 mirror = True,
                 tickangle = 0,
                 tickmode = 'array',
-                tickvals = df.index,
+                tickvals = y_names,
                 ticktext = y_ticktexts,
             ))
 
@@ -651,28 +1536,13 @@ def plot_spikes_grouped_bar_chart(fp, df):
             raise e
 
         try:
-            log.debug('bar_chart: gonna create annotations right side column "total" percents')
-            annotations = []
-            annot_defaults = dict(
-                font = {'size': 11, 'color': 'Black'},
-                align = 'right',
-                bgcolor = 'WhiteSmoke',
-                borderwidth = 0,
-                borderpad = 1,
-                showarrow = False,
-                xanchor = 'right',
-                xref = 'paper',
-                x = 1,
-                yref = 'y',
-            )
-            # pop column 'total' values for annotation display
-            for row_num, total in enumerate(df.pop('TotalPct')):
-                annotations.append(dict(
-                    **annot_defaults,
-                    text = f'<b>{total:4.2f}%</b>', # float: 00.00%
-                    y = row_num,
-                ))
+            log.debug('bar_chart: gonna create right side column "total" percents')
+            # pop column 'total' values for text trace display
+            totals = totals_trace(y_names, [f'<b>{total:4.2f}%</b>' # float: 00.00%
+                                            for total in to_list(df.pop('TotalPct'))])
+            add_totals_column(layout)
             log.debug('bar_chart: gonna create total column label annotation')
+            annotations = []
             annotations.append(dict(
                 text = '<b>Total Pcts</b>',
                 textangle = 0,
@@ -695,7 +1565,7 @@ def plot_spikes_grouped_bar_chart(fp, df):
             log.debug('bar_chart: gonna assign layout annotations')
             layout['annotations'] = annotations
         except Exception as e:
-            log.exception('bar_chart: layout annotations NOT made')
+            log.exception('bar_chart: totals column NOT made')
             raise e
 
         try:
@@ -704,42 +1574,82 @@ def plot_spikes_grouped_bar_chart(fp, df):
             for i in range(df.columns.size):
                 colname = df.columns[i]
                 # log.debug('bar_chart: column: %s', colname)
-                bar = go.Bar(
+                values = to_list(df[colname])
+                bar = dict(
+                    type = 'bar',
                     orientation = 'h',
                     name = colname,
                     hoverinfo = "x+name",
                     hoverlabel = {'namelength':-1},
                     marker = {'color': plot_colors[i],
                               'line': marker_line},
-                    x = df[colname],
-                    y = df.index,
-                    text = df[colname],
+                    x = values,
+                    y = y_names,
+                    text = [str(v) for v in values],
                     textposition = 'inside',
                     textfont = {'size': 10,
                                 'color': 'Black'},
                 )
                 data.append(bar)
+            data.append(totals) # over the bars
         except Exception as e:
             log.exception('bar_chart: data traces NOT made')
             raise e
 
-        try:
-            fig_bar = go.Figure(data=data, layout=layout)
-            fig_bar.update_layout(title=fig_title)
-
-            log.debug('pipe spikes: gonna make bar plot')
-            img_path = fp.with_suffix('.bar')
-            plot_opts['config']['toImageButtonOptions']['filename'] = img_path.name
-            plot = ply.plot(fig_bar, **plot_opts)
-            log.debug('pipe spikes: made bar plot!')
-        except Exception as e:
-            log.exception('pipe spikes: bar plot not working')
-            raise e
     except Exception as e:
         log.exception('bar_chart: plotting for file "%s"', fp.name)
         raise e
     else:
-       return plot
+       return data, layout
+
+
+def spikes_grouped_bar_figure(fp, df):
+    """create grouped bar chart Figure of spike pcts, validated by plotly"""
+    data, layout = spikes_grouped_bar_spec(fp, df)
+    try:
+        fig_bar = qc_figure(data, layout)
+    except Exception as e:
+        log.exception('pipe spikes: bar figure not working')
+        raise e
+    else:
+        return fig_bar
+
+
+def spikes_grouped_bar_dict(fp, df):
+    """create grouped bar chart figure dict of spike pcts, not validated"""
+    return figure_dict(*spikes_grouped_bar_spec(fp, df))
+
+
+# per-file figures json, for plots loaded by the browser after the page:
+#   kind: (file glob, render, artifact namespace)
+PLOT_JSON_KINDS = {
+    'read_counts': (PIPELINE_FILE_GLOB, read_counts_json, '16S_read_counts.json'),
+    'spikes':      (PIPELINE_PCTS_GLOB, spike_pcts_json, '16S_spike_pcts.json'),
+}
+
+# figures json of all files of a run together, as COMBINED_STEM:
+#   kind: (render, artifact namespace)
+PLOT_COMBINED_KINDS = {
+    'read_counts': (read_counts_combined_json, '16S_read_counts.combined.json'),
+    'spikes':      (spike_pcts_combined_json, '16S_spike_pcts.combined.json'),
+}
+
+def pipeline_plot_json(kind, fp, inventory=None, params=()):
+    """return json of figures of one pipeline file of kind, or None if not rendered
+       params: of kind's render, e.g. (PlotWindow, PlotProfile) of read counts
+    """
+    fileglob, render, namespace = PLOT_JSON_KINDS[kind]
+    rendered = render_pipeline_files(render, [fp], namespace, params=params,
+                                     inventory=inventory)
+    return rendered.get(fp)
+
+
+def pipeline_combined_json(kind, fpaths, inventory=None, params=()):
+    """return json of figures of all pipeline files of kind together, or None if not rendered
+       params: of kind's render, as of pipeline_plot_json
+    """
+    render, namespace = PLOT_COMBINED_KINDS[kind]
+    return render_combined(render, fpaths, namespace, params=params, inventory=inventory)
 
 
 if __name__ == '__main__':
@@ -747,12 +1657,6 @@ if __name__ == '__main__':
         from flask import Flask
         app = Flask(__name__)
         with app.app_context():
-            plot_opts = dict(
-                output_type = 'div',
-                include_plotlyjs = False,
-                config = plotly_config,
-            )
-
             run_abspath = Path('/var/www/apps/run_qc_devel/runs/20180605_18-microbe-027_BNYKP_qc')
             flowcell = 'BNYL2'
             # pipeline_16S_qc_plots = plot_16S_read_counts(run_abspath, flowcell)
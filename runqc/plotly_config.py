@@ -1,4 +1,5 @@
 import logging
+from types import MappingProxyType
 
 log = logging.getLogger('plotly_config')
 log_format = '%(levelname)s in "%(name)s" on %(lineno)d: %(message)s'
@@ -6,6 +7,25 @@ logging.basicConfig(format=log_format, level=logging.DEBUG)
 
 default_image_format = 'svg'
 
+
+def freeze(value):
+    """return read-only copy of config value: dicts as mappingproxy, lists as tuples"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """return new mutable copy of frozen config value, as plotly (and json) take it"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
 plotly_config = {}
 try:
     # log.info('defining plotly.js config')
@@ -58,6 +78,8 @@ try:
         'locale': 'en-US',
         'locales': {}
     }
+    # shared by all threads: never changed, copied per figure (see thaw)
+    plotly_config = freeze(plotly_config)
     # log.debug('plotly config defined')
 except Exception as e:
     log.exception('plotly config dict NOT defined')
@@ -0,0 +1,27 @@
+///// run_qc deferred plots /////
+// fills each <div class="plotly-deferred" data-src="..."> with the plotly
+// figures of the json at its data-src, once the page has loaded; qcLayout,
+// of the page's head, resolves the plotly template each figure names
+
+
+function load_deferred_plot(container) {
+	var $container = $(container);
+	$.getJSON($container.data('src'))
+		.done(function(resp) {
+			$container.empty();
+			$.each(resp.figures, function(i, fig) {
+				var div = $('<div class="plotly-graph-div"></div>').appendTo($container)[0];
+				Plotly.newPlot(div, fig.data, qcLayout(fig.layout), fig.config);
+			});
+		})
+		.fail(function(xhr) {
+			$container.html('<p class="indented_note">Plots not available ('
+				+ xhr.status + ')</p>');
+		});
+}
+
+$(function() {
+	$('.plotly-deferred').each(function() {
+		load_deferred_plot(this);
+	});
+});
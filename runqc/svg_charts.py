@@ -0,0 +1,146 @@
+"""Static SVG bar charts, rendered server-side without plotly.
+
+For the 'lite' run page: charts are plain SVG markup, drawn from the same
+data frames as the plotly figures (e.g. of calc_read_diffs), with a
+tooltip (<title>) per bar instead of javascript. Output only depends on
+the frame, so it may be cached and served as static bytes.
+"""
+from html import escape
+from math import floor, log10
+
+import numpy as np
+
+import logging
+log = logging.getLogger('svg_charts')
+
+
+# as pipe_qc_plots.plot_colors, of plotly figures
+BAR_COLORS = [
+    'YellowGreen', 'Chocolate',
+    'LightSteelBlue', 'LightCoral', 'OliveDrab',
+    'DarkSlateBlue', 'Plum', 'Teal', 'Silver',
+]
+
+# sizes in pixels
+LABEL_WIDTH = 240
+TOTALS_WIDTH = 90
+PLOT_WIDTH = 600
+ROW_HEIGHT = 20
+HEADER_HEIGHT = 50 # legend, then tick labels
+FONT_SIZE = 11
+LABEL_MAX_LEN = 40
+
+
+def nice_ticks(vmax, count=5):
+    """return list of round tick values from 0 to about vmax"""
+    if not vmax > 0:
+        return [0]
+    step = vmax / count
+    magnitude = 10 ** floor(log10(step))
+    for factor in (1, 2, 2.5, 5, 10):
+        if step <= factor * magnitude:
+            step = factor * magnitude
+            break
+    return [step * i for i in range(int(vmax // step) + 1)]
+
+
+def _number(value, suffix=''):
+    """return short text of number: thousands separated, no needless decimals"""
+    if float(value).is_integer():
+        return f'{int(value):,}{suffix}'
+    return f'{value:,.2f}{suffix}'
+
+
+def _label(name):
+    name = str(name)
+    return name if len(name) < LABEL_MAX_LEN else name[:LABEL_MAX_LEN] + u'…'
+
+
+def bar_chart_svg(df, totals=None, stacked=True, suffix='', total_suffix='',
+                  colors=BAR_COLORS):
+    """return svg markup of horizontal bar chart of dataframe: a row per index value,
+       first at bottom (as plotly's), bars of each column stacked or grouped.
+    params:
+        df: pandas dataframe of numbers
+        totals: values shown right of each row (e.g. column 'total'), or None
+        stacked: columns' bars end to end, else side by side in the row
+        suffix: of bar values, e.g. ' reads' or '%'
+        total_suffix: of totals
+    """
+    values = np.nan_to_num(df.to_numpy(dtype=np.float64))
+    rows, columns = values.shape
+    extent = values.sum(axis=1).max() if stacked else values.max()
+    ticks = nice_ticks(extent if rows and columns else 0)
+    scale = PLOT_WIDTH / max(ticks[-1], extent, 1)
+
+    width = LABEL_WIDTH + PLOT_WIDTH + (TOTALS_WIDTH if totals is not None else 10)
+    height = HEADER_HEIGHT + rows * ROW_HEIGHT + 10
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" class="svg-chart" '
+        f'viewBox="0 0 {width} {height}" width="100%" style="max-width:{width}px" '
+        f'font-family="sans-serif" font-size="{FONT_SIZE}">'
+    ]
+
+    # legend of columns
+    x = LABEL_WIDTH
+    for i, col in enumerate(df.columns):
+        color = colors[i % len(colors)]
+        parts.append(f'<rect x="{x}" y="4" width="10" height="10" fill="{color}" stroke="black"/>'
+                     f'<text x="{x + 14}" y="13">{escape(str(col))}</text>')
+        x += 24 + 7 * len(str(col))
+
+    # x axis: grid lines and tick labels at top
+    top = HEADER_HEIGHT
+    bottom = top + rows * ROW_HEIGHT
+    for tick in ticks:
+        tx = LABEL_WIDTH + tick * scale
+        parts.append(f'<line x1="{tx:.1f}" y1="{top}" x2="{tx:.1f}" y2="{bottom}" stroke="#ddd"/>'
+                     f'<text x="{tx:.1f}" y="{top - 6}" text-anchor="middle">'
+                     f'{_number(tick, suffix)}</text>')
+    parts.append(f'<rect x="{LABEL_WIDTH}" y="{top}" width="{PLOT_WIDTH}" '
+                 f'height="{rows * ROW_HEIGHT}" fill="none" stroke="#444"/>')
+
+    # bars of each column in a group, of its color
+    bar_height = (ROW_HEIGHT - 4) / (1 if stacked else max(columns, 1))
+    row_y = bottom - (np.arange(rows) + 1) * ROW_HEIGHT # first row at bottom
+    starts = np.zeros(rows)
+    for col in range(columns):
+        col_name = escape(str(df.columns[col]))
+        widths = values[:, col] * scale
+        parts.append(f'<g fill="{colors[col % len(colors)]}" stroke="black" stroke-width="0.5">')
+        for row in np.flatnonzero(widths > 0):
+            bar_y = row_y[row] + 2 + (0 if stacked else col * bar_height)
+            parts.append(
+                f'<rect x="{LABEL_WIDTH + starts[row]:.1f}" y="{bar_y:.1f}" '
+                f'width="{widths[row]:.1f}" height="{bar_height:.1f}">'
+                f'<title>{col_name}: {_number(values[row, col], suffix)}</title></rect>')
+        parts.append('</g>')
+        if stacked:
+            starts += widths
+
+    # sample names left, totals right of rows
+    names = list(df.index)
+    parts.append('<g text-anchor="end">')
+    for row in range(rows):
+        text_y = row_y[row] + ROW_HEIGHT - 6
+        name, label = str(names[row]), _label(names[row])
+        full_name = f'<title>{escape(name)}</title>' if label != name else ''
+        parts.append(f'<text x="{LABEL_WIDTH - 4}" y="{text_y}">{full_name}{escape(label)}</text>')
+        if totals is not None:
+            parts.append(f'<text x="{width - 4}" y="{text_y}" font-weight="bold">'
+                         f'{_number(totals[row], total_suffix)}</text>')
+    parts.append('</g>')
+
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def chart_html(title, svg, notes=''):
+    """return html of svg chart under its title (html), and notes (html) if any"""
+    return ''.join([
+        '<div class="svg-plot">',
+        f'<h4 class="plot-title">{title}</h4>',
+        f'<p class="indented_note">{notes}</p>' if notes else '',
+        svg,
+        '</div>',
+    ])
@@ -1,9 +1,120 @@
 import os
+import re
+import csv
 import json
+import threading
+from fnmatch import fnmatchcase
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import PosixPath as Path
-from decorator import decorator
 
-from flask import current_app
+from flask import current_app, g, has_request_context
+
+from runqc.cache import cached_artifact, file_fingerprint, atomic_write
+
+
+# kinds of files in a run folder: file name globs
+RUN_ARTIFACT_GLOBS = OrderedDict([
+    ('run_info_json',     ['run_info.json']),
+    ('run_metric_csv',    ['Run_Metric_*.csv']),
+    ('qcreport_csv',      ['*_QCreport*.csv']),
+    ('read_count_sheets', ['[Ss]amples_[Rr]ead_[Cc]ount*.*']),
+    ('read_dist_images',  ['*_Read_Distributions.png',
+                           'raw_read_distribution_plot*.png']),
+    ('fastqc_stats',      ['fastqc_stats.tsv']),
+    ('flash_stats',       ['flash_stats.tsv']),
+    ('flash_plot',        ['flash_assembly_accuracy_plot.png']),
+    ('pear_stats',        ['pear_stats.tsv']),
+    ('pear_plot',         ['pear_assembly_accuracy_plot.png']),
+])
+
+# files written next to a run's files, derived from them: e.g. by parse_qcreport
+RUN_DERIVED_GLOBS = ['*.data.csv', '*.pivot.csv']
+
+
+class RunInventory(object):
+    """Files of a run folder, from a single os.scandir pass.
+    Files are classified into the kinds of RUN_ARTIFACT_GLOBS, and any
+    other glob is matched against the names in memory, not the filesystem.
+    """
+    def __init__(self, run_dir):
+        self.path = Path(run_dir)
+        self._entries = {}
+        self.dirs = []
+        try:
+            with os.scandir(str(self.path)) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self._entries[entry.name] = entry
+                    elif entry.is_dir():
+                        self.dirs.append(entry.name)
+        except OSError as ose:
+            current_app.logger.error('run inventory of %s: %s', run_dir, ose)
+        self.names = sorted(self._entries)
+        self.artifacts = {kind: self._match(globs)
+                          for kind, globs in RUN_ARTIFACT_GLOBS.items()}
+        current_app.logger.debug('run inventory of %s: %s files', run_dir, len(self.names))
+
+    def _match(self, fileglobs):
+        return [n for n in self.names
+                if any(fnmatchcase(n, fg) for fg in fileglobs)]
+
+    def files(self, *fileglobs, name_only=False):
+        """return list of Paths (or names only) of files matching any glob"""
+        names = self._match(fileglobs)
+        if name_only:
+            return names
+        return [self.path / n for n in names]
+
+    def artifact(self, kind, name_only=True):
+        """return list of names (or Paths) of files of kind in RUN_ARTIFACT_GLOBS"""
+        names = self.artifacts.get(kind, [])
+        if name_only:
+            return list(names)
+        return [self.path / n for n in names]
+
+    def fingerprint(self, path):
+        """return (path, size, mtime_ns) of file, using the scandir entry's stat"""
+        path = Path(path)
+        if path.parent != self.path:
+            return file_fingerprint(path)
+        entry = self._entries.get(path.name)
+        if entry is None:
+            return None
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        return (str(path), st.st_size, st.st_mtime_ns)
+
+    def fingerprints(self, *fileglobs, exclude=RUN_DERIVED_GLOBS):
+        """return sorted list of (name, size, mtime_ns) of files matching any glob
+        (default all), but those matching exclude (default derived files)
+        """
+        names = self._match(fileglobs) if fileglobs else self.names
+        excluded = set(self._match(exclude)) if exclude else set()
+        fingerprints = []
+        for name in names:
+            if name in excluded:
+                continue
+            fpr = self.fingerprint(self.path / name)
+            if fpr is not None:
+                fingerprints.append((name,) + fpr[1:])
+        return fingerprints
+
+    def __contains__(self, name):
+        return name in self._entries
+
+
+def get_run_inventory(run_dir):
+    """return RunInventory of run_dir, scanned only once per request"""
+    run_dir = os.path.abspath(str(run_dir))
+    if not has_request_context():
+        return RunInventory(run_dir)
+    inventories = g.setdefault('run_inventories', {})
+    if run_dir not in inventories:
+        inventories[run_dir] = RunInventory(run_dir)
+    return inventories[run_dir]
 
 
 # modified from: https://stackoverflow.com/a/10961991/1600630
@@ -33,27 +144,47 @@ def make_tree(path, recursive=False):
     return tree
 
 
-@decorator
-def check_run_info_json(func, run_path, *args, **kwargs):
-    """view decorator to check for existing file 'run_info.json'
-    and create it if not.
-    N.B. Expects view first arg = 'run_path'
+_section_executors = {}
+_section_executors_lock = threading.Lock()
+
+def section_executor(max_workers):
+    """return the worker's shared thread pool of max_workers, for page sections"""
+    with _section_executors_lock:
+        executor = _section_executors.get(max_workers)
+        if executor is None:
+            executor = _section_executors[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='runqc-section')
+        return executor
+
+
+def gather_sections(sections, max_workers=0):
+    """build independent sections of a page, return dict of their merged context.
+    sections: OrderedDict of name: (callable returning dict, dict of defaults)
+    With max_workers, sections are run concurrently in a thread pool, each in
+    the app context; else one after another. A failing section is logged and
+    contributes only its defaults, without failing the others.
     """
-    json_filename = kwargs.pop(json_filename, 'run_info.json')
+    if max_workers and len(sections) > 1:
+        app = current_app._get_current_object()
+        def in_app_context(build):
+            with app.app_context():
+                return build()
+        executor = section_executor(max_workers)
+        pending = OrderedDict(
+            (name, executor.submit(in_app_context, build))
+            for name, (build, defaults) in sections.items())
+        results = {name: future.result for name, future in pending.items()}
+    else:
+        results = {name: build for name, (build, defaults) in sections.items()}
 
-    run = Path(run_path)
-    info = run / json_filename
-    try:
-        if info.exists():
-            txt = info.read_text()
-            if '{' in txt:
-                run_info = json.loads(txt)
-        else:
-            run_info = make_run_json_from_qc_files(run_dir, json_filename)
-    except Exception as e:
-        raise e
-    finally:
-        return func(*args, **kwargs)
+    context = {}
+    for name, (build, defaults) in sections.items():
+        context.update(defaults)
+        try:
+            context.update(results[name]())
+        except Exception:
+            current_app.logger.exception('issues building page section: %s', name)
+    return context
 
 
 def read_file_text(filename: Path):
@@ -72,136 +203,184 @@ def read_file_text(filename: Path):
         return None
 
 
-def get_run_qcreport_data(project_name, run_dir,
-                          qcreport_glob='*_QCreport*.csv',
-                          qcreport_data_suffix='.data.csv',
-                          data_header = 'GT_QC_Sample_ID,'):
-    """Return run Qcreport data file if exists,
-    else parse the actual data lines after row starting 'GT_QC_Sample_ID'
+# header fields of GT's QCreport, of lines e.g. "Project: 18-weinstock-005,,,,,"
+QC_REPORT_FIELDNAMES = (
+    'Project',
+    # 'Application',
+    'Sequence Protocol',
+    'Sample Size',
+    'Fastq Files',
+    'Date Report',
+)
+QC_REPORT_GLOB = '*_QCreport*.csv'
+QC_REPORT_DATA_SUFFIX = '.data.csv'
+QC_REPORT_DATA_HEADER = 'GT_QC_Sample_ID,'
+
+# QCreport's header fields, then columns and number of rows of its sample data
+# table, as written into its data file
+QCReport = namedtuple('QCReport', ['info', 'columns', 'samples', 'data_file'])
+
+
+def parse_qcreport(qcreport_csv, data_suffix=QC_REPORT_DATA_SUFFIX,
+                   data_header=QC_REPORT_DATA_HEADER, fieldnames=QC_REPORT_FIELDNAMES):
+    """read QCreport csv in one pass, return its QCReport: header fields until the
+    line of data_header, then the sample data table, streamed into the data file
+    next to it (atomically, unless that is newer than the QCreport already)
     """
-    current_app.logger.info('Getting QCreport data: %s', run_dir)
-    qcr_lines = []
-    qcr_rows = []
-    qcr_data_file = ""
-    qcr_data_path = ""
-    try:
-        run_path = Path(run_dir)
-        for f in run_path.glob(qcreport_glob):
-            # current_app.logger.debug('.....QCreport file: %s', f.name)
-            if f.match('*'+qcreport_data_suffix):
-                current_app.logger.info('QCreport data file found: %s', f.name)
-                return f.name
-            elif f.is_file():
-                qcr_lines = read_file_text(f)
-                qcr_data_file = f.name[:-4]+qcreport_data_suffix
-                qcr_data_path = os.path.join(run_dir, qcr_data_file)
+    qcreport_csv = Path(qcreport_csv)
+    data_path = qcreport_csv.with_name(qcreport_csv.name[:-4] + data_suffix)
+    info = OrderedDict()
+    with qcreport_csv.open() as qcr:
+        for line in qcr:
+            if data_header in line:
+                break
+            # label as in file, of any fieldname: e.g. 'Date Report (UTC)'
+            key, _, value = line.split(',', 1)[0].strip().partition(': ')
+            if value and any(field in key for field in fieldnames):
+                info[key] = value
+        else: # no sample data
+            return QCReport(info, [], 0, '')
+
+        columns = next(csv.reader([line]))
+        samples = 0
+        def write(tmp):
+            nonlocal samples
+            with open(tmp, 'w') as qcd:
+                qcd.write(line)
+                for row in qcr:
+                    qcd.write(row)
+                    samples += bool(row.strip())
+
+        data_fpr = file_fingerprint(data_path)
+        if data_fpr and data_fpr[2] >= qcreport_csv.stat().st_mtime_ns:
+            samples = sum(1 for row in qcr if row.strip())
+        else:
+            current_app.logger.info('QCreport data will be written to file: %s', data_path)
+            atomic_write(data_path, write)
+    return QCReport(info, columns, samples, data_path.name)
 
-        try:
-            for index, row in enumerate(qcr_lines):
-                # current_app.logger.debug('qc_report row: %s', str(row[0:30)])
-                if data_header in row:
-                    qcr_rows = os.linesep.join(qcr_lines[index:])
-                    break
-            if qcr_rows:
-                current_app.logger.info('QCreport data will be written to file: %s', qcr_data_path)
-                with open(qcr_data_path, 'w') as qcd:
-                    qcd.writelines(qcr_rows)
-                # current_app.logger.info('QCreport data will be read from file: %s', qcr_data_path)
-                with open(qcr_data_path, 'r') as qcd:
-                    qcd = qcd.readlines()
-                    if len(qcd) == len(qcr_rows):
-                        current_app.logger.info('QCreport data successfully read-checked.')
-                    else:
-                        current_app.logger.error('QCreport data not read successfully??')
-        except Exception as e:
-            current_app.logger.exception('QCreport data row reading issues: %s', run_dir)
-            raise e
-        finally:
-            current_app.logger.debug('QCreport data file: %s', qcr_data_file)
-            return qcr_data_file
-    except Exception as e:
-        current_app.logger.exception('QCreport data file issues: %s', run_dir)
-        raise e
 
+def get_run_qcreport(run_dir, qcreport_glob=QC_REPORT_GLOB,
+                     qcreport_data_suffix=QC_REPORT_DATA_SUFFIX,
+                     data_header=QC_REPORT_DATA_HEADER, inventory=None):
+    """return QCReport of run's QCreport csv file, or None if there is none.
+    Cached on the fingerprints of the QCreport and its data file.
+    """
+    inventory = inventory or get_run_inventory(run_dir)
+    qcreports = [fp for fp in inventory.files(qcreport_glob)
+                 if not fp.name.endswith(qcreport_data_suffix)]
+    if not qcreports:
+        return None
+    qcreport_csv = qcreports[0]
+    data_path = qcreport_csv.with_name(qcreport_csv.name[:-4] + qcreport_data_suffix)
 
-def get_run_info_json(run_dir, json_filename):
-    """Parse run info json file if exists, else make one from the QC csv files in the run_path"""
-    run_info = {'info details': 'not found'}
-    try:
-        run_path = Path(run_dir)
-        run_json = run_path / json_filename
+    def parse():
+        current_app.logger.info('Parsing QCreport file: %s', qcreport_csv.name)
         try:
-            run_json.open()
-            json_text = run_json.read_text()
-            run_info = json.loads(json_text)
-        except:
-            run_info = make_run_json_from_qc_files(run_dir, json_filename)
-        current_app.logger.info('run_json: %s', run_info)
-    except Exception as e:
-        raise e
-    finally:
-        return run_info
+            return parse_qcreport(qcreport_csv, qcreport_data_suffix, data_header)
+        except Exception:
+            current_app.logger.exception('QCreport file issues: %s', run_dir)
+            return QCReport({}, [], 0, '')
 
+    qcreport = cached_artifact('qcreport', [qcreport_csv, data_path], parse,
+                               params=(qcreport_data_suffix, data_header),
+                               fingerprint=inventory.fingerprint)
+    return QCReport(*qcreport)
 
-def make_run_json_from_qc_files(dirname: str, json_filename: str):
-    """read QC csv files and create run summary info, in json format"""
+
+def get_run_qcreport_data(project_name, run_dir,
+                          qcreport_glob=QC_REPORT_GLOB,
+                          qcreport_data_suffix=QC_REPORT_DATA_SUFFIX,
+                          data_header=QC_REPORT_DATA_HEADER,
+                          inventory=None):
+    """Return name of run Qcreport data file: the actual data lines after row
+    starting 'GT_QC_Sample_ID', written by parse_qcreport; '' if none.
+    """
+    qcreport = get_run_qcreport(run_dir, qcreport_glob, qcreport_data_suffix,
+                                data_header, inventory=inventory)
+    return qcreport.data_file if qcreport else ''
+
+
+def get_run_info_json(run_dir, json_filename, inventory=None):
+    """Parse run info json file if exists, else make one from the QC csv files in the run_path
+    Cached on the fingerprints of the json file and the QC csv files, see get_run_info.
+    """
+    return get_run_info(run_dir, json_filename, inventory).info
+
+
+# run info and the file each field came from; missing: of RUN_INFO_REQUIRED, in no file
+RunInfo = namedtuple('RunInfo', ['info', 'sources', 'missing'])
+
+# fields of run info the run page needs: looked up in the QC files if not in the json
+RUN_INFO_REQUIRED = ('GT Project', 'FlowCell ID')
+
+def get_run_info(run_dir, json_filename='run_info.json', inventory=None):
+    """return RunInfo of run: fields of its json file, else parsed from its QC csv files.
+    Cached on the fingerprints of the json file and the QC csv files. QC files are
+    parsed only if a required field is missing, each once per its fingerprint (found
+    fields or not, in the ArtifactStore): a field a run lacks is not looked for
+    again until its files change. A missing json is written of the fields found.
+    """
+    inventory = inventory or get_run_inventory(run_dir)
+    sources = [Path(run_dir) / json_filename]
+    for kind in RUN_INFO_SOURCES:
+        sources.extend(inventory.artifact(kind, name_only=False)[:1])
+    run_info = cached_artifact('run_info', sources,
+                               lambda: _get_run_info(run_dir, json_filename, inventory),
+                               fingerprint=inventory.fingerprint)
+    # callers modify info
+    return RunInfo(OrderedDict(run_info['info']), dict(run_info['sources']),
+                   list(run_info['missing']))
+
+
+def _read_run_info_json(run_json):
+    """return dict of run info json file, or None if not there (or not json)"""
     try:
-        run_path = Path(dirname).resolve()
-        run_json = run_path / json_filename
+        info = json.loads(run_json.read_text(), object_pairs_hook=OrderedDict)
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) else None
 
-        info_dict = {}
 
-        try:
-            info_dict.update(qc_report_run_info(run_path))
-            info_dict.update(run_metrics_run_info(run_path))
+def _get_run_info(run_dir, json_filename, inventory):
+    run_json = Path(run_dir) / json_filename
+    json_info = _read_run_info_json(run_json)
+    info = json_info if json_info is not None else OrderedDict()
+    # written by the seq core (or by hand), else parsed from QC files
+    sources = {field: json_filename for field in info}
 
-            current_app.logger.info('Writing info out to json file.')
-            run_json.open(mode='w')
-            run_json.write_text(json.dumps(info_dict))
-        except OSError as e:
+    if json_info is None or any(field not in info for field in RUN_INFO_REQUIRED):
+        for kind, parse in RUN_INFO_SOURCES.items():
+            fpath = (inventory.artifact(kind, name_only=False) or [None])[0]
+            if fpath is None:
+                continue
+            fields = cached_artifact(f'run_info.{kind}', [fpath],
+                                     lambda: parse(Path(run_dir), inventory=inventory),
+                                     fingerprint=inventory.fingerprint)
+            for field, value in fields.items(): # nor replacing fields of the json
+                if value is not None and sources.get(field) != json_filename:
+                    info[field] = value
+                    sources[field] = fpath.name
+
+    if json_info is None and info:
+        current_app.logger.info('Writing run info out to json file: %s', run_json)
+        try:
+            atomic_write(run_json, lambda tmp: Path(tmp).write_text(json.dumps(info)))
+        except OSError:
             current_app.logger.exception('json file %s is not writable!', run_json)
-            raise e
 
-    except Exception as e:
-        current_app.logger.exception('Error parsing run info from qc files.')
-        raise e
-    finally:
-        return info_dict
+    missing = [field for field in RUN_INFO_REQUIRED if field not in info]
+    return {'info': info, 'sources': sources, 'missing': missing}
 
 
-def qc_report_run_info(run_path: Path, qc_report_glob='*_QCreport*.csv'):
+def qc_report_run_info(run_path: Path, qc_report_glob=QC_REPORT_GLOB, inventory=None):
     """get general run info from GT's QCreport file"""
+    qc_info = {}
     try:
-        current_app.logger.info('Parsing QCreport file')
-        qc_info = {}
-        qc_report_fieldnames = [
-            'Project',
-            # 'Application',
-            'Sequence Protocol',
-            'Sample Size',
-            'Fastq Files',
-            'Date Report',
-        ]
-        # N.B. line formats of this report are: "Project: 18-weinstock-005,,,,,"
-
-        qc_report_list = list(run_path.glob(qc_report_glob))
-        # current_app.logger.debug('qc_report_list: %s', qc_report_list)
-        qc_report_csv = qc_report_list[0]
-        qcr_lines = read_file_text(qc_report_csv)
+        qcreport = get_run_qcreport(run_path, qc_report_glob, inventory=inventory)
         qc_info = {'GT Project': None} # first item in display
-
-        qcr_rows = [r.split(',') for r in qcr_lines]
-        # current_app.logger.debug('length qcr_rows: %s', len(qcr_rows))
-
-        for row in qcr_rows:
-            # current_app.logger.debug('qcr_row: %s', str(row))
-            for fld in qc_report_fieldnames:
-                if fld in row[0]:
-                    # current_app.logger.debug('fld: %s', fld)
-                    [f1, f2] = row[0].replace(',', '').split(': ')
-                    # current_app.logger.debug('f1,f2: %s, %s', f1, f2)
-                    qc_info.update({f1: f2})
-
+        if qcreport:
+            qc_info.update(qcreport.info)
         qc_info['GT Project'] = qc_info.pop('Project', None)
         current_app.logger.debug('qc_info: %s', qc_info)
 
@@ -211,80 +390,102 @@ def qc_report_run_info(run_path: Path, qc_report_glob='*_QCreport*.csv'):
         return qc_info
 
 
-def run_metrics_run_info(run_path: Path, run_metrics_glob='Run_Metric_*.csv'):
+# leading number of metric text, e.g. of '217 +/- 5'
+METRIC_NUMBER = re.compile(r'\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+def metric_number(text):
+    """return int or float of metric text, e.g. '1,234', '93.5%' or '217 +/- 5' (its
+    leading number); None if there is none
+    """
+    match = METRIC_NUMBER.match(text.replace(',', ''))
+    if match is None:
+        return None
+    number = match.group()
+    return float(number) if '.' in number or 'e' in number.lower() else int(number)
+
+
+# Run_Metric csv: a header line and a line of run values, then a table of metrics
+# per read, of header row 'Level', ending at row 'Total'.
+#   field shown on page: (names in file, alternatives; type, if parsed typed)
+# N.B. per read metrics are named '<column>: <read>', of RUN_METRICS_READS
+RUN_METRICS_FIELDS = OrderedDict([
+    ('GT Project',         (('LIMSProjectID',), str)),
+    ('FlowCell ID',        (('FlowCellID',), str)),
+    ('Run Date',           (('RunDate',), str)),
+    # ('Run Request Date', (('ProjectSeqRequestDate',), str)),
+    ('Machine ID',         (('MachineID',), str)),
+    ('Reads (M)',          (('Reads(M)',), metric_number)),
+    ('Reads PF (M)',       (('ReadsPF (M)',), metric_number)),
+    ('Total Yield (Gb)',   (('TotalYield(Gb)',), metric_number)),
+    ('Loading Conc. (pM)', (('LoadingConc.(pM)',), metric_number)),
+    ('Cluster Density',    (('Density',), metric_number)),
+    ('PhiX % Aligned',     (('PhiXAligned%',), metric_number)),
+    ('Overall % Q30',      (('Q30',), metric_number)),
+    ('%>=Q30: Read 1',     (('% >= Q30: Read 1', '%>=Q30: Read 1'), metric_number)),
+    ('%>=Q30: Read 2',     (('% >= Q30: Read 2', '%>=Q30: Read 2'), metric_number)),
+    ('Error Rate: Read 1', (('Error Rate (%): Read 1', 'Error Rate: Read 1'), metric_number)),
+    ('Error Rate: Read 2', (('Error Rate (%): Read 2', 'Error Rate: Read 2'), metric_number)),
+])
+
+# rows of the per read table: read named in fields (index reads, e.g. 'Read 2 (I)', not)
+RUN_METRICS_READS = {
+    'Read 1': 'Read 1',
+    'Read 2': 'Read 2', # of runs without index reads
+    'Read 4': 'Read 2',
+}
+
+
+def read_run_metrics(run_metrics_csv):
+    """return dict of all values of Run_Metric csv file, as strings: of its run line,
+    then of the per read table as '<column>: <read>', read until its 'Total' row
+    """
+    with open(str(run_metrics_csv), newline='') as qrm:
+        rows = csv.reader(qrm)
+        header = [f.strip() for f in next(rows, [])]
+        values = [f.strip() for f in next(rows, [])]
+        metrics = dict(zip(header, values))
+        columns = []
+        for row in rows:
+            label = row[0].strip() if row else ''
+            if label == 'Total':
+                break # ignore remainder of file lines
+            if label == 'Level':
+                columns = [f.strip() for f in row]
+            elif label in RUN_METRICS_READS:
+                read = RUN_METRICS_READS[label]
+                metrics.update((f'{col}: {read}', value.strip())
+                               for col, value in zip(columns, row) if col)
+    return metrics
+
+
+def parse_run_metrics(run_metrics_csv, fields=RUN_METRICS_FIELDS, typed=False):
+    """return OrderedDict of fields of Run_Metric csv file, as the text shown on the
+    run page, e.g. '217 +/- 5'; fields not in file are left out
+    typed: values of their types instead, e.g. numbers of yield, density, Q30 and
+        error rates per read (for metrics of many runs, e.g. indexing or trends)
+    """
+    metrics = read_run_metrics(run_metrics_csv)
+    parsed = OrderedDict()
+    for field, (names, to_type) in fields.items():
+        for name in names:
+            if metrics.get(name):
+                parsed[field] = to_type(metrics[name]) if typed else metrics[name]
+                break
+    return parsed
+
+
+def run_metrics_run_info(run_path: Path, run_metrics_glob='Run_Metric_*.csv', inventory=None):
     """get general run info from GT's Run_Metrics file"""
+    metric_info = {}
     try:
         current_app.logger.info('Parsing RunMetrics file')
-        metric_info = {}
-        metrics_fields = {
-            # header string in file:  display_on_page,
-            'LIMSProjectID':         'GT Project',
-            'FlowCellID':            'FlowCell ID',
-            'RunDate':               'Run Date',
-            # 'ProjectSeqRequestDate': 'Run Request Date', 
-            'MachineID':             'Machine ID',
-            'Reads(M)':              'Reads (M)',
-            'ReadsPF (M)':           'Reads PF (M)',
-            'TotalYield(Gb)':        'Total Yield (Gb)',
-            'LoadingConc.(pM)':      'Loading Conc. (pM)',
-            'Density':               'Cluster Density',
-            'PhiXAligned%':          'PhiX % Aligned',
-            'Q30':                   'Overall % Q30',
-            '% >= Q30: Read 1':      '%>=Q30: Read 1',
-            '% >= Q30: Read 2':      '%>=Q30: Read 2',
-            'Error Rate (%): Read 1':'Error Rate: Read 1',
-            'Error Rate (%): Read 2':'Error Rate: Read 2',
-            '%>=Q30: Read 1':        '%>=Q30: Read 1',
-            '%>=Q30: Read 2':        '%>=Q30: Read 2',
-            'Error Rate: Read 1':    'Error Rate: Read 1',
-            'Error Rate: Read 2':    'Error Rate: Read 2',
-            }
-
-        run_metrics_list = list(run_path.glob(run_metrics_glob))
-        # current_app.logger.debug('run_metrics_list: %s', run_metrics_list)
-        run_metrics_dict = {}
-
-        run_metrics_csv = run_metrics_list[0]
-        import pprint
-        pp = pprint.PrettyPrinter(indent=12, width=80)
-        pf = pp.pformat
-        with open(run_metrics_csv) as qrm:
-            qrm_head = qrm.readline().split(',')
-            qrm_data = qrm.readline().split(',')
-            run_metrics_dict = dict(zip(qrm_head, qrm_data))
-            for line in qrm.readlines():
-                metricline = [ f.strip() for f in line.split(',') ]
-                # current_app.logger.debug('.... run metricline: %s', metricline)
-                if metricline[0] == 'Level':
-                    qrm_head_1 = [ d+': Read 1' for d in metricline if d ]
-                    qrm_head_4 = [ d+': Read 2' for d in metricline if d ]
-
-                if metricline[0] == 'Read 1':
-                    run_metrics_dict.update(dict(zip(qrm_head_1, metricline)))
-
-                if metricline[0] == 'Read 2 (I)':
-                    continue
-                if metricline[0] == 'Read 3 (I)':
-                    continue
-
-                if metricline[0] == 'Read 4':
-                    run_metrics_dict.update(dict(zip(qrm_head_4, metricline)))
-
-                if metricline[0] == 'Total':
-                    break # ignore remainder of file lines
-
-        # metric_info = { v:run_metrics_dict[k]
-        #                for k,v in metrics_fields.items()
-        #                if metrics_fields.get(k, None)}
-        for k,v in metrics_fields.items():
-            try:
-                if metrics_fields.get(k, ''):
-                    metric_info[v] = run_metrics_dict[k]
-            except KeyError as e:
-                msg = f'!! KeyError file "{k}" not found!'
-                current_app.logger.error(msg)
-                continue
-        # current_app.logger.debug('metric_info: %s', metric_info)
+        inventory = inventory or get_run_inventory(run_path)
+        run_metrics_csv = inventory.files(run_metrics_glob)[0]
+        metric_info = parse_run_metrics(run_metrics_csv)
+        missing = [field for field in RUN_METRICS_FIELDS if field not in metric_info]
+        if missing:
+            current_app.logger.error('!! fields %s not found in file "%s"!',
+                                     missing, run_metrics_csv.name)
 
     except Exception as e:
         current_app.logger.exception('reading from run''s Run Metrics csv file!')
@@ -292,19 +493,22 @@ def run_metrics_run_info(run_path: Path, run_metrics_glob='Run_Metric_*.csv'):
         return metric_info
 
 
-def get_file_paths(folder, fileglob="*", name_only=False):
-    """pre-check if file(s) exist(s) and return list of Path objects or filenames only"""
-    fldr = Path(folder)
-    files = []
+# QC files of run info fields, of kinds of RUN_ARTIFACT_GLOBS: parser of the first file
+# of kind, in order (later files' values replace earlier ones')
+RUN_INFO_SOURCES = OrderedDict([
+    ('qcreport_csv',   qc_report_run_info),
+    ('run_metric_csv', run_metrics_run_info),
+])
+
+
+def get_file_paths(folder, fileglob="*", name_only=False, inventory=None):
+    """pre-check if file(s) exist(s) and return list of Path objects or filenames only
+    Matched against the folder's RunInventory, not globbed on the filesystem.
+    """
     try:
-        for f in fldr.glob(fileglob):
-            current_app.logger.info('get_file_paths dir glob name: %s', f)
-            if f.is_file():
-                if name_only:
-                    files.append(f.name)
-                else:
-                    files.append(f)
-        # current_app.logger.debug('get_file_paths files: %s', str(files))
+        inventory = inventory or get_run_inventory(folder)
+        files = inventory.files(fileglob, name_only=name_only)
+        current_app.logger.debug('get_file_paths %s: %s', fileglob, len(files))
         return files
     except:
         msg = f'!! Error file "{fileglob}" not found!'
@@ -312,14 +516,11 @@ def get_file_paths(folder, fileglob="*", name_only=False):
         return False
 
 
-def check_file_exists(folder, fileglob="*"):
+def check_file_exists(folder, fileglob="*", inventory=None):
     """pre-check if file(s) exist(s) for links in view templates"""
-    fldr = Path(folder)
     try:
-        for f in fldr.glob(fileglob):
-            current_app.logger.info('checking found fname: %s', f)
-            if f.is_file():
-                return True
+        inventory = inventory or get_run_inventory(folder)
+        return bool(inventory.files(fileglob))
     except:
         return False
 
@@ -1,56 +1,86 @@
 import os
-
-from flask import Blueprint, current_app
-from flask import make_response, render_template, redirect, send_from_directory
-
+import json
+import hashlib
+import mimetypes
+from urllib.parse import quote, urlencode
+from functools import partial
+from collections import OrderedDict
+
+from flask import Blueprint, current_app, request, abort
+from flask import make_response, render_template, redirect, send_from_directory, url_for
+from werkzeug.http import is_resource_modified
+try:
+    from werkzeug.utils import safe_join # Werkzeug >= 2.0
+except ImportError:
+    from werkzeug.security import safe_join # Werkzeug 1.x
+
+from runqc.catalog import get_run_catalog
 from runqc.pipe_qc_plots import (
     plot_16S_read_counts,
     plot_spike_pcts,
+    svg_16S_read_counts,
+    svg_spike_pcts,
+    pipeline_plot_json,
+    pipeline_combined_json,
+    PLOT_JSON_KINDS,
+    COMBINED_STEM,
+    PLOT_PAGE_SIZE,
+    PlotWindow,
+    ScatterOptions,
+    PLOT_PROFILES,
+    QC_TEMPLATE,
+    write_spike_pivot_csv,
 )
+from runqc.lean_figures import templates_js
 from runqc.utils import \
     make_tree, \
-    get_run_info_json, \
-    make_run_json_from_qc_files, \
+    get_run_info, \
     get_run_qcreport_data, \
-    get_file_paths, \
+    get_run_inventory, \
+    gather_sections, \
     parse_run_name_qc, \
     delimited_to_dict
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Routes and Views ~~~~~
 run_info = Blueprint('run_info', __name__) #, url_prefix='/runs')
 
+
+@run_info.app_context_processor
+def plotly_templates():
+    """js defining the QC template once per page, for figures naming it"""
+    return {'plotly_templates_js': partial(templates_js, [QC_TEMPLATE])}
+
+
 @run_info.route('/', methods=['GET']) #, defaults={'page': 'index'})
 def run_list():
-    """show list of run names."""
+    """show list of run names, from the run catalog index."""
     datasets = current_app.config['RUN_DATASETS']
     url_root = current_app.config['APPLICATION_ROOT']
 
-    run_dirs = {}
-    run_dir_list = make_tree(datasets)
-    for folder in run_dir_list['contents']:
-        # current_app.logger.debug('run_list folder: %s', folder)
-        (name, path) = folder.popitem()
-        name = path.replace(datasets, '').rstrip('_qc')
-        if '/' in name:
-            name = name.replace('/', '')
-        href = path.replace(datasets, url_root)
-        run_dirs.update({name: href})
+    runs = get_run_catalog().runs()
+    # of run info json edited in place too, its folder mtime unchanged
+    etag = _etag([(run['folder'], run['info_fingerprint'], run['mtime_ns']) for run in runs],
+                 url_root)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    for run in runs:
+        run['href'] = '/'.join([url_root.rstrip('/'), run['folder']])
 
     vars = {
         'datasets': datasets,
-        'run_dirs': run_dirs
+        'runs': runs,
     }
     # current_app.logger.debug('context: %s', vars)
     response = make_response(render_template('run_list.html', **vars))
     response.headers['X-Datasets'] = datasets
     response.headers['X-Glorious'] = 'Welcome to Mbiome Core Sequencer Runs!'
-    return response
+    return _cacheable(response, etag)
 
 
 # @run_info.route('/<path:run_path>/(<subitem>.+)?', defaults={'subitem': ''})
 @run_info.route('/<path:run_path>/', strict_slashes=True, defaults={'subitem': ''})
 @run_info.route('/<path:run_path>/<path:subitem>')
-# @check_run_info_json(run_path)
 def run_details(run_path, subitem=''):
     current_app.logger.info('Getting details for %s', run_path)
     run_json = 'run_info.json'
@@ -78,129 +108,417 @@ def run_details(run_path, subitem=''):
                 attach = False
                 if subitem.endswith(suffixes_as_attachment):
                     attach = True
-                return send_from_directory(run_abspath, subitem,
-                                           as_attachment=attach)
+                if subitem.endswith('.pivot.csv'): # not written by plots from cache
+                    pivot_path = safe_join(run_abspath, subitem)
+                    if pivot_path:
+                        write_spike_pivot_csv(pivot_path)
+                return _send_run_file(run_abspath, subitem, as_attachment=attach)
 
     except Exception as e:
         current_app.logger.exception('testing subitem types %s %s', run_path, subitem)
 
+    run_name = parse_run_name_qc(run_path)
+    if '_' in run_name:
+        path_parts = run_name.split('_')
+        try:    gt_project = path_parts[1]
+        except: gt_project = ''
+        try:    flowcell = path_parts[2]
+        except: flowcell = ''
+    else: # unexpected folder name structure
+        gt_project = run_name
+        flowcell = ''
+
     try:
-        run_name = parse_run_name_qc(run_path)
-        if '_' in run_name:
-            path_parts = run_name.split('_')
-            try:    gt_project = path_parts[1]
-            except: gt_project = ''
-            try:    flowcell = path_parts[2]
-            except: flowcell = ''
-        else: # unexpected folder name structure
-            gt_project = run_name
-            flowcell = ''
-
-        # load sequencer core's run info from json or make it
-        try:
-            current_app.logger.info('Getting run_info from: %s / %s', run_abspath, run_json)
-            info_json = get_run_info_json(run_abspath, run_json)
-
-            # check if pre-existing before reading both QC files...
-            if 'FlowCell ID' not in info_json \
-            or 'GT Project' not in info_json:
-                info_json = make_run_json_from_qc_files(run_abspath, run_json)
-            # update values:
-            if 'FlowCellID' in info_json:
-                current_app.logger.info('Getting flowcell from run_info')
-                flowcell = info_json['FlowCellID']
-            if 'LIMSProjectID' in info_json:
-                info_json['GT Project'] = info_json.pop('LIMSProjectID')
-            if 'GT Project' in info_json:
-                current_app.logger.info('Getting gt_project from run_info')
-                gt_project = info_json['GT Project']
-
-        except Exception as e:
-            current_app.logger.exception('JSON issues...')
-
-        try:
-            qcreport_data = get_run_qcreport_data(gt_project, run_abspath)
-        except Exception as e:
-            qcreport_data = None
-            current_app.logger.exception('issues reading QCreport data for run: %s', run_path) #TODO: is 'run_path var type 'Path' ??
+        # one directory scan, for all files of the run
+        inventory = get_run_inventory(run_abspath)
+
+        # page of unchanged run files (and same args) not made again
+        etag = _etag(inventory.fingerprints(), request.query_string)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
 
         # check if files being linked to exist (yet)
-        run_metric_csv = get_file_paths(run_abspath, 'Run_Metric_*.csv', name_only=True)
+        run_metric_csv = inventory.artifact('run_metric_csv')
         if run_metric_csv: run_metric_csv = run_metric_csv[0]
 
-        read_count_sheets = get_file_paths(run_abspath,
-                                '[Ss]amples_[Rr]ead_[Cc]ount*.*', name_only=True)
-        read_dist_images = get_file_paths(run_abspath,
-                                '*_Read_Distributions.png', name_only=True)
-        read_dist_images.extend(get_file_paths(run_abspath,
-                                'raw_read_distribution_plot*.png', name_only=True))
-
-        fastqc_stats = get_file_paths(run_abspath, 'fastqc_stats.tsv')
-        if fastqc_stats:
-            fastqc_stats = delimited_to_dict(fastqc_stats[0])
+        read_count_sheets = inventory.artifact('read_count_sheets')
+        read_dist_images = inventory.artifact('read_dist_images')
+
+        # plots fetched by the browser after the page, or rendered within it;
+        # or static svg charts, of a lite page without plotly
+        plots_lite = request.args.get('mode', '') == 'lite'
+        plots = request.args.get('plots', '')
+        plots_deferred = not plots_lite and (plots == 'deferred'
+            or (plots != 'inline' and current_app.config.get('RUN_PLOTS_DEFERRED', True)))
+        combined = _plots_combined()
+        profile = _plot_profile()
+
+        # independent sections of page: (builder, context if it fails)
+        sections = OrderedDict([
+            ('run info', (partial(_run_info_section, run_abspath, run_json,
+                                  inventory, gt_project),
+                          {'run_spec': {}, 'gt_project': gt_project})),
+            ('qcreport', (partial(_qcreport_section, run_abspath, inventory, gt_project),
+                          {'qcreport_data': None})),
+            ('run stats', (partial(_run_stats_section, inventory),
+                           {'fastqc_stats': None, 'control_assems': {}})),
+        ])
+        window = _plot_window()
+        if plots_lite:
+            sections.update([
+                ('16S read counts', (partial(_read_counts_svg_section, run_abspath,
+                                             inventory, window),
+                                     {'pipe_16S_qc_plots': {}})),
+                ('16S spike pcts', (partial(_spike_pcts_svg_section, run_abspath, inventory),
+                                    {'pipe_16S_spikes': {}})),
+            ])
+            sections_vars = {}
+        elif plots_deferred:
+            sections_vars = _deferred_plots(run_path, inventory, window, combined, profile)
         else:
-            fastqc_stats = None
-        # current_app.logger.debug(f'fastq_stats: {fastqc_stats}')
-
-        # check for control assemblies accuracies
-        control_assems = {}
-
-        flash_stats = get_file_paths(run_abspath, 'flash_stats.tsv')
-        if flash_stats:
-            flash_stats = delimited_to_dict(flash_stats[0])
-            control_assems['flash_stats'] = flash_stats
-
-        flash_accuracy_img = get_file_paths(run_abspath,
-                             'flash_assembly_accuracy_plot.png', name_only=True)
-        if flash_accuracy_img:
-            flash_accuracy_img = flash_accuracy_img[0]
-            control_assems['flash_plot'] = flash_accuracy_img
-
-        pear_stats = get_file_paths(run_abspath, 'pear_stats.tsv')
-        if pear_stats:
-            pear_stats = delimited_to_dict(pear_stats[0])
-            control_assems['pear_stats'] = pear_stats
-
-        pear_accuracy_img = get_file_paths(run_abspath,
-                            'pear_assembly_accuracy_plot.png', name_only=True)
-        if pear_accuracy_img:
-            pear_accuracy_img = pear_accuracy_img[0]
-            control_assems['pear_plot'] = pear_accuracy_img
-
-        # check for 16S QC read counts
-        try:
-            pipe_16S_qc_plots = plot_16S_read_counts(run_abspath, flowcell)
-        except Exception as e:
-            current_app.logger.exception('issues plotting bar charts for run: %s', run_path)
-
-        # check for 16S samples' percent spike reads
-        try:
-            pipe_16S_spike_pcts = plot_spike_pcts(run_abspath)
-        except Exception as e:
-            current_app.logger.exception('issues plotting charts for run spike reads: %s', run_path)
+            sections.update([
+                ('16S read counts', (partial(_read_counts_section, run_abspath,
+                                             inventory, flowcell, window, combined,
+                                             profile),
+                                     {'pipe_16S_qc_plots': {}})),
+                ('16S spike pcts', (partial(_spike_pcts_section, run_abspath, inventory,
+                                            _scatter_options(), combined, profile),
+                                    {'pipe_16S_spikes': {}})),
+            ])
+            sections_vars = {}
+        sections_vars.update(gather_sections(
+            sections, max_workers=current_app.config.get('RUN_DETAILS_WORKERS', 0)))
 
     except Exception as e:
         current_app.logger.exception('issues generating run_details: %s', run_path)
         raise e
 
     vars = {
-        'run_spec': info_json,
         'run_path': run_path,
         'run_abspath': run_abspath,
         'run_name': run_name,
-        'gt_project': gt_project,
-        'fastqc_stats': fastqc_stats,
-        'qcreport_data': qcreport_data,
         'run_metric_csv': run_metric_csv,
         'read_count_sheets': read_count_sheets,
         'read_dist_images': read_dist_images,
-        'control_assems': control_assems,
-        'pipe_16S_qc_plots': pipe_16S_qc_plots,
-        'pipe_16S_spikes': pipe_16S_spike_pcts,
+        'plots_deferred': plots_deferred,
+        'plots_lite': plots_lite,
     }
+    vars.update(sections_vars)
     # current_app.logger.debug('context: %s', vars)
     response = make_response(render_template('run_details.html', **vars))
     # response.headers['X-Parachutes'] = 'parachutes are cool'
+    return _cacheable(response, etag)
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Run Details Sections ~~~~~
+def _run_info_section(run_abspath, run_json, inventory, gt_project):
+    """load sequencer core's run info from json or make it"""
+    current_app.logger.info('Getting run_info from: %s / %s', run_abspath, run_json)
+    # QC files parsed only if the json lacks fields, once per their fingerprints
+    info = get_run_info(run_abspath, run_json, inventory=inventory)
+    if info.missing:
+        current_app.logger.debug('run info: no %s in %s', info.missing, run_abspath)
+    info_json = info.info
+    # update values:
+    if 'LIMSProjectID' in info_json:
+        info_json['GT Project'] = info_json.pop('LIMSProjectID')
+    if 'GT Project' in info_json:
+        current_app.logger.info('Getting gt_project from run_info')
+        gt_project = info_json['GT Project']
+    return {'run_spec': info_json, 'gt_project': gt_project}
+
+
+def _qcreport_section(run_abspath, inventory, gt_project):
+    """QCreport data file, for its csv table"""
+    qcreport_data = get_run_qcreport_data(gt_project, run_abspath,
+                                          inventory=inventory)
+    return {'qcreport_data': qcreport_data}
+
+
+def _run_stats_section(inventory):
+    """fastqc stats, and check for control assemblies accuracies"""
+    fastqc_stats = inventory.artifact('fastqc_stats', name_only=False)
+    if fastqc_stats:
+        fastqc_stats = delimited_to_dict(fastqc_stats[0])
+    else:
+        fastqc_stats = None
+    # current_app.logger.debug(f'fastq_stats: {fastqc_stats}')
+
+    control_assems = {}
+
+    flash_stats = inventory.artifact('flash_stats', name_only=False)
+    if flash_stats:
+        flash_stats = delimited_to_dict(flash_stats[0])
+        control_assems['flash_stats'] = flash_stats
+
+    flash_accuracy_img = inventory.artifact('flash_plot')
+    if flash_accuracy_img:
+        flash_accuracy_img = flash_accuracy_img[0]
+        control_assems['flash_plot'] = flash_accuracy_img
+
+    pear_stats = inventory.artifact('pear_stats', name_only=False)
+    if pear_stats:
+        pear_stats = delimited_to_dict(pear_stats[0])
+        control_assems['pear_stats'] = pear_stats
+
+    pear_accuracy_img = inventory.artifact('pear_plot')
+    if pear_accuracy_img:
+        pear_accuracy_img = pear_accuracy_img[0]
+        control_assems['pear_plot'] = pear_accuracy_img
+
+    return {'fastqc_stats': fastqc_stats, 'control_assems': control_assems}
+
+
+def _read_counts_section(run_abspath, inventory, flowcell, window=None, combined=False,
+                         profile=None):
+    """check for 16S QC read counts"""
+    processes = current_app.config.get('RUN_PLOT_PROCESSES', 0)
+    return {'pipe_16S_qc_plots':
+            plot_16S_read_counts(run_abspath, flowcell, inventory=inventory,
+                                 processes=processes, window=window, combined=combined,
+                                 profile=profile)}
+
+
+def _spike_pcts_section(run_abspath, inventory, scatter=None, combined=False, profile=None):
+    """check for 16S samples' percent spike reads"""
+    processes = current_app.config.get('RUN_PLOT_PROCESSES', 0)
+    return {'pipe_16S_spikes': plot_spike_pcts(run_abspath, inventory=inventory,
+                                               processes=processes, scatter=scatter,
+                                               combined=combined, profile=profile)}
+
+
+def _read_counts_svg_section(run_abspath, inventory, window=None):
+    """16S QC read counts, as static svg charts"""
+    return {'pipe_16S_qc_plots': svg_16S_read_counts(run_abspath, inventory=inventory,
+                                                     window=window)}
+
+
+def _spike_pcts_svg_section(run_abspath, inventory):
+    """16S samples' percent spike reads, as static svg charts"""
+    return {'pipe_16S_spikes': svg_spike_pcts(run_abspath, inventory=inventory)}
+
+
+def _plots_combined():
+    """return whether to plot all pipeline files of a kind in one figure:
+       request arg 'combined' (1 or 0), else RUN_PLOTS_COMBINED
+    """
+    combined = request.args.get('combined', '')
+    if combined:
+        return combined not in ('0', 'false', 'False')
+    return current_app.config.get('RUN_PLOTS_COMBINED', False)
+
+
+def _plot_profile():
+    """return PlotProfile of plots: request arg 'profile' (full or lite),
+       else RUN_PLOT_PROFILE
+    """
+    name = request.args.get('profile', '')
+    if name not in PLOT_PROFILES:
+        name = current_app.config.get('RUN_PLOT_PROFILE', 'full')
+    return PLOT_PROFILES.get(name, PLOT_PROFILES['full'])
+
+
+WINDOW_ARGS = ('page', 'page_size', 'top')
+
+def _plot_window():
+    """return PlotWindow of samples in read counts plots, from request args:
+       'page' and 'page_size', or 'top'; by default the RUN_PLOT_MAX_SAMPLES of
+       least final reads. Never more samples than RUN_PLOT_MAX_SAMPLES (if set).
+       The other request args are kept in its links to pages.
+    """
+    max_samples = current_app.config.get('RUN_PLOT_MAX_SAMPLES', 0)
+    def bounded(n):
+        return min(n, max_samples) if max_samples else n
+    args = urlencode(_page_args())
+
+    page = request.args.get('page', type=int)
+    if page:
+        page_size = request.args.get('page_size', PLOT_PAGE_SIZE, type=int)
+        return PlotWindow(page=max(page, 1), page_size=bounded(max(page_size, 1)),
+                          args=args)
+    top = bounded(request.args.get('top', max_samples, type=int))
+    return PlotWindow(top=top, args=args) if top > 0 else None
+
+
+def _page_args():
+    """return [(arg, value), ...] of request args but those of the PlotWindow"""
+    return [(arg, value) for arg, value in request.args.items(multi=True)
+            if arg not in WINDOW_ARGS]
+
+
+def _scatter_options():
+    """return ScatterOptions of spike pcts scatter plots, from config"""
+    config = current_app.config
+    defaults = ScatterOptions()
+    return ScatterOptions(
+        gl_points=config.get('RUN_PLOT_GL_POINTS', defaults.gl_points),
+        density_points=config.get('RUN_PLOT_DENSITY_POINTS', defaults.density_points),
+        bins=config.get('RUN_PLOT_DENSITY_BINS', defaults.bins))
+
+
+def _window_args(window):
+    """return request args of PlotWindow, for urls of deferred plots"""
+    if window is None:
+        return {}
+    if window.page:
+        return {'page': window.page, 'page_size': window.page_size}
+    return {'top': window.top}
+
+
+def _pipeline_files(inventory, kind):
+    """return run's pipeline files of plot kind, but empty ones"""
+    fileglob = PLOT_JSON_KINDS[kind][0]
+    return [fp for fp in inventory.files(fileglob)
+            if (inventory.fingerprint(fp) or (None, 0))[1]]
+
+
+def _deferred_plots(run_path, inventory, window=None, combined=False, profile=None):
+    """urls of plots json of each pipeline file (or of all combined),
+       for the browser to fetch
+    """
+    plot_urls = {}
+    for kind in PLOT_JSON_KINDS:
+        # only read counts are windowed, their links to pages of the page's args
+        args = dict(_page_args(), **_window_args(window)) if kind == 'read_counts' else {}
+        if profile is not None and profile.name != 'full':
+            args['profile'] = profile.name
+        stems = [fp.stem for fp in _pipeline_files(inventory, kind)]
+        if combined and len(stems) > 1:
+            stems = [COMBINED_STEM]
+        plot_urls[kind] = OrderedDict(
+            (stem, url_for('.run_plot_json', run_path=run_path,
+                           kind=kind, file_stem=stem, **args))
+            for stem in stems)
+    return {'pipe_16S_qc_plots': plot_urls['read_counts'],
+            'pipe_16S_spikes': plot_urls['spikes']}
+
+
+@run_info.route('/<path:run_path>/plots/<kind>/<file_stem>.json')
+def run_plot_json(run_path, kind, file_stem):
+    """return json of plotly figures of one of run's pipeline files,
+       or of all of them together as COMBINED_STEM
+    """
+    if kind not in PLOT_JSON_KINDS:
+        abort(404)
+    run_abspath = os.path.join(current_app.config['RUN_DATASETS'], run_path)
+    inventory = get_run_inventory(run_abspath)
+    fpaths = _pipeline_files(inventory, kind)
+    if file_stem != COMBINED_STEM:
+        fpaths = [fp for fp in fpaths if fp.stem == file_stem]
+    if not fpaths:
+        abort(404)
+
+    fingerprints = inventory.fingerprints(*[fp.name for fp in fpaths])
+    max_age = current_app.config.get('RUN_PLOTS_MAX_AGE', 0)
+    etag = _etag(fingerprints, request.query_string)
+    not_modified = _not_modified(etag, max_age=max_age)
+    if not_modified is not None:
+        return not_modified
+
+    params = ((_plot_window() if kind == 'read_counts' else _scatter_options()),
+              _plot_profile())
+    if file_stem == COMBINED_STEM:
+        figures = pipeline_combined_json(kind, fpaths, inventory, params=params)
+    else:
+        figures = pipeline_plot_json(kind, fpaths[0], inventory, params=params)
+    if figures is None:
+        current_app.logger.error('issues plotting %s json: %s %s', kind, run_path, file_stem)
+        abort(500)
+    response = current_app.response_class(figures, mimetype='application/json')
+    return _cacheable(response, etag, max_age=max_age)
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Conditional Requests ~~~~~
+def _etag(fingerprints, *parts):
+    """return ETag of response made of files of fingerprints, [(name, ...), ...],
+       and of parts (e.g. request args); it changes with the app's version.
+       N.B. no Last-Modified: the newest file's mtime misses files removed or
+       replaced by older ones, other args and app versions
+    """
+    from runqc import __version__
+    blob = json.dumps([__version__, fingerprints, parts], default=str)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag, max_age=0):
+    """return 304 response if request's If-None-Match matches, else None:
+       checked before the response is made
+    """
+    if is_resource_modified(request.environ, etag=etag):
+        return None
+    return _cacheable(current_app.response_class(status=304), etag, max_age)
+
+
+def _cacheable(response, etag, max_age=0):
+    """return response of its ETag: kept by browsers max_age seconds, or
+       revalidated every time if 0
+    """
+    response.set_etag(etag)
+    if max_age:
+        response.cache_control.private = True
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _cacheable_file(response):
+    """return response of run's file (validators set by send_from_directory):
+       kept by browsers RUN_FILES_MAX_AGE seconds
+    """
+    max_age = current_app.config.get('RUN_FILES_MAX_AGE', 0)
+    if max_age:
+        response.cache_control.private = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ Run Files ~~~~~
+def _send_run_file(directory, filename, as_attachment=False):
+    """return response of run's file: delivered by the front web server if
+       RUN_FILES_OFFLOAD, else by python, of byte ranges and conditional GETs
+       (so interrupted downloads resume)
+    """
+    offload = current_app.config.get('RUN_FILES_OFFLOAD', '')
+    if offload:
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = _offloaded_file(path, offload, as_attachment)
+        if response is not None:
+            return _cacheable_file(response)
+
+    # N.B. conditional: not the default of Flask 1.x
+    return _cacheable_file(send_from_directory(directory, filename,
+                                               as_attachment=as_attachment,
+                                               conditional=True))
+
+
+def _offloaded_file(path, offload, as_attachment=False):
+    """return empty response, of header telling the front web server to send file:
+       X-Sendfile of its path, or X-Accel-Redirect of its url in nginx's internal
+       location RUN_FILES_ACCEL_PREFIX of RUN_DATASETS; None if it can not
+    """
+    config = current_app.config
+    response = current_app.response_class()
+    if offload == 'x-sendfile':
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    elif offload == 'x-accel-redirect':
+        datasets = os.path.abspath(config['RUN_DATASETS'])
+        rel_path = os.path.relpath(os.path.abspath(path), datasets)
+        if rel_path.startswith(os.pardir):
+            return None
+        prefix = config.get('RUN_FILES_ACCEL_PREFIX', '/_run_files/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(rel_path)
+    else:
+        current_app.logger.error('unknown RUN_FILES_OFFLOAD: %s', offload)
+        return None
+
+    response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if as_attachment:
+        response.headers['Content-Disposition'] = \
+            'attachment; filename="{}"'.format(os.path.basename(path).replace('"', ''))
     return response
 
 
@@ -216,9 +534,9 @@ def fastqc_list(run_path, subitem='files'):
     fqc_abspath = os.path.join(datasets, str(run_path), fastqc_path)
 
     if subitem.endswith('.html'):
-        return send_from_directory(fqc_abspath, subitem, as_attachment=False)
+        return _send_run_file(fqc_abspath, subitem, as_attachment=False)
     if subitem.endswith('.zip'):
-        return send_from_directory(fqc_abspath, subitem, as_attachment=True)
+        return _send_run_file(fqc_abspath, subitem, as_attachment=True)
 
     fastqc_files = {}
     try:
@@ -1,7 +1,6 @@
 """Test all units and fun-bits in app!
 This file holds fixture configurations and definitions.
 """
-import os
 from pathlib import Path
 
 import pytest
@@ -25,11 +24,27 @@ FASTQC_HTML_CONTENTS = """
 </html>
 """
 
+PIPE_16S_QC_CSV = """Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost
+SampleA,12000,11800,11000,10500,10400
+SampleB,9000,8900,8000,7000,6900
+SampleC,15000,14000,Missing,Missing,Missing
+"""
+
+PIPE_16S_SPIKE_TSV = """SampleA\tOTU_Allobacillus\t.50000000000000000000%\t60\t12000
+SampleA\tOTU_Imtechella\t.25000000000000000000%\t30\t12000
+SampleB\tOTU_Allobacillus\t1.0000000000000000000%\t90\t9000
+SampleB\tOTU_Imtechella\t0%\t0\t9000
+"""
+
 @pytest.fixture
-def app():
-    """create and configure a new app instance; fixture for tests"""
+def app(tmp_path):
+    """create and configure a new app instance; fixture for tests
+    Its artifact store and run catalog are in the test's own tmp_path.
+    """
     app = create_app()
     configure_app(app, env='testing')
+    app.config['RUN_ARTIFACTS'] = str(tmp_path / 'artifacts')
+    app.config['RUN_CATALOG'] = str(tmp_path / 'run_catalog.sqlite')
     yield app
 
 
@@ -54,6 +69,16 @@ def run_path(app):
     yield run_path.name
 
 
+@pytest.fixture
+def pipe_run_path(tmp_path):
+    """run folder holding 16S pipeline QC files; fixture for plot tests"""
+    run_path = tmp_path / RUN_NAME_TEST
+    run_path.mkdir()
+    (run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv').write_text(PIPE_16S_QC_CSV)
+    (run_path / 'pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv').write_text(PIPE_16S_SPIKE_TSV)
+    yield run_path
+
+
 def create_files(run_path):
     """create all files in run_path if not pre-existing"""
     run_path.mkdir(parents=True, exist_ok=True)
@@ -65,6 +90,8 @@ def create_files(run_path):
         'Run_Metric_Summary_'+gt_run_id+'.csv',
         gt_run_id+'_QCreport.csv',
         'run_info.json',
+        'pipe_16S_QC-'+gt_run_id+'-TESTY.csv',
+        'pipe_16S_spike_pcts-'+gt_run_id+'-TESTY.tsv',
     ]
     for subp in subpaths:
         try:
@@ -72,6 +99,10 @@ def create_files(run_path):
             sub_contents = str(sub.resolve())
             if 'Undetermined_S0_R1_001_fastqc.html' == sub.name:
                 sub_contents = FASTQC_HTML_CONTENTS
+            elif sub.name.startswith('pipe_16S_QC'):
+                sub_contents = PIPE_16S_QC_CSV
+            elif sub.name.startswith('pipe_16S_spike_pcts'):
+                sub_contents = PIPE_16S_SPIKE_TSV
             if not sub.exists():
                 try:
                     sub.touch(exist_ok=True)
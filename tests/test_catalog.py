@@ -0,0 +1,51 @@
+"""Test run catalog index"""
+import os
+import json
+
+from runqc.catalog import RunCatalog
+
+
+def test_run_catalog_refresh(app, tmp_path, monkeypatch):
+    """test catalog is indexed incrementally from folder mtimes"""
+    datasets = tmp_path / 'runs'
+    run = datasets / '20180101_18-microbe-999_TESTY_qc'
+    run.mkdir(parents=True)
+    (run / 'run_info.json').write_text(json.dumps(
+        {'GT Project': '18-microbe-999', 'FlowCell ID': 'TESTY2', 'Sample Size': '96'}))
+
+    with app.app_context():
+        catalog = RunCatalog(str(tmp_path / 'catalog.sqlite'), str(datasets))
+        assert catalog.refresh()
+        [summary] = catalog.runs()
+        assert summary['name'] == '20180101_18-microbe-999_TESTY'
+        assert summary['flowcell'] == 'TESTY2'
+        assert summary['run_date'] == '2018-01-01'
+        assert summary['sample_count'] == 96
+
+        # unchanged datasets folder is not re-scanned
+        scans = []
+        scandir = os.scandir
+        monkeypatch.setattr(os, 'scandir', lambda p: scans.append(p) or scandir(p))
+        assert not catalog.refresh()
+        assert not scans
+
+        (datasets / '20190202_19-microbe-001_ABCDE_qc').mkdir()
+        run.rename(datasets / 'old_run')
+        assert catalog.refresh()
+        assert [r['name'] for r in catalog.runs()] == \
+            ['old_run', '20190202_19-microbe-001_ABCDE']
+
+        # a run's info json rewritten in place (folder mtime unchanged) is re-read
+        info = datasets / 'old_run' / 'run_info.json'
+        st = info.stat()
+        info.write_text(json.dumps({'FlowCell ID': 'TESTY3'}))
+        os.utime(info, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert catalog.refresh(force=True)
+        assert catalog.runs()[0]['flowcell'] == 'TESTY3'
+
+        # datasets not scannable: the last index is served
+        def unreadable(path):
+            raise PermissionError(13, 'Permission denied', path)
+        monkeypatch.setattr(os, 'scandir', unreadable)
+        assert not catalog.refresh(force=True)
+        assert [r['flowcell'] for r in catalog.runs()] == ['TESTY3', 'ABCDE']
@@ -0,0 +1,441 @@
+"""Test pipeline QC plots"""
+import os
+import re
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from runqc import pipe_qc_plots
+from runqc import cache
+from runqc.lean_figures import template_dict, templates_js
+from runqc.cache import LRUCache, ArtifactStore, cached_artifact, cached_frame, file_fingerprint
+
+
+def test_lru_cache_evicts_oldest():
+    """test least recently used entry is evicted first"""
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_file_fingerprint_changes(tmp_path):
+    """test fingerprint follows file size and mtime"""
+    fp = tmp_path / 'data.csv'
+    assert file_fingerprint(fp) is None
+    fp.write_text('a,b\n')
+    first = file_fingerprint(fp)
+    fp.write_text('a,b\n1,2\n')
+    assert file_fingerprint(fp) != first
+
+
+def test_artifact_store_shared(app, tmp_path):
+    """test artifacts stored by one worker are read by another"""
+    src = tmp_path / 'source.csv'
+    src.write_text('a,b\n')
+    computed = []
+    def compute():
+        computed.append(1)
+        return {'plot': '<div></div>'}
+
+    with app.app_context():
+        assert cached_artifact('test', [src], compute, memory=LRUCache()) == {'plot': '<div></div>'}
+        # fresh in-memory cache, as in another worker process
+        assert cached_artifact('test', [src], compute, memory=LRUCache()) == {'plot': '<div></div>'}
+    assert len(computed) == 1
+
+    store = ArtifactStore(app.config['RUN_ARTIFACTS'])
+    key = store.key('test', [file_fingerprint(src)])
+    assert store.get('test', key) == {'plot': '<div></div>'}
+    assert not list(store.path('test', key).parent.glob('.tmp-*'))
+
+
+def test_artifact_store_pruned(app, tmp_path):
+    """test artifacts pruned by age of last use, then by total size, least used first"""
+    store = ArtifactStore(app.config['RUN_ARTIFACTS'])
+    paths = [store.put('test', f'{n:02d}' * 20, {'n': n * 100}) for n in range(3)]
+    sizes = [path.stat().st_size for path in paths]
+    now = 100 * 86400
+    for days, path in zip([20, 5, 1], paths):
+        os.utime(path, (now - days * 86400, now - days * 86400))
+    catalog = store.root / 'run_catalog.sqlite'
+    catalog.write_text('catalog')
+    os.utime(catalog, (0, 0))
+
+    assert store.prune(max_age=10 * 86400, now=now) == (1, sizes[0])
+    assert not paths[0].exists() and not paths[0].parent.exists()
+    assert store.prune(max_bytes=sizes[2], now=now) == (1, sizes[1])
+    assert not paths[1].exists() and paths[2].exists() and catalog.exists()
+
+    result = app.test_cli_runner().invoke(args=['prune-artifacts', '--days', '30'])
+    assert 'Pruned 1 artifacts' in result.output
+    assert not paths[2].exists() and catalog.exists()
+
+
+def test_read_count_plots_cached(app, pipe_run_path, monkeypatch):
+    """test unchanged pipeline files are plotted once"""
+    calls = []
+    read_frames = pipe_qc_plots.read_counts_frames
+    def counting_read_frames(fpaths, *args, **kwargs):
+        calls.extend(fp.name for fp in fpaths)
+        return read_frames(fpaths, *args, **kwargs)
+    monkeypatch.setattr(pipe_qc_plots, 'read_counts_frames', counting_read_frames)
+    pipe_qc_plots.plot_cache.clear()
+
+    with app.app_context():
+        first = pipe_qc_plots.plot_16S_read_counts(pipe_run_path)
+        second = pipe_qc_plots.plot_16S_read_counts(pipe_run_path)
+        assert first == second
+        assert len(calls) == 1
+
+        fp = pipe_run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv'
+        st = fp.stat()
+        os.utime(fp, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        pipe_qc_plots.plot_16S_read_counts(pipe_run_path)
+        assert len(calls) == 2
+
+
+def test_plots_rendered_in_processes(app, pipe_run_path):
+    """test several pipeline files are rendered in a process pool"""
+    second = pipe_run_path / 'pipe_16S_QC-18-microbe-998-TESTY.csv'
+    second.write_text((pipe_run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv').read_text())
+    pipe_qc_plots.plot_cache.clear()
+
+    with app.app_context():
+        app.config['RUN_ARTIFACTS'] = ''
+        plots = pipe_qc_plots.plot_16S_read_counts(pipe_run_path, processes=2)
+    assert list(plots) == ['pipe_16S_QC-18-microbe-998-TESTY',
+                           'pipe_16S_QC-18-microbe-999-TESTY']
+    assert all('Plotly.newPlot' in plot for plot in plots.values())
+    # one pool per process, of processes not forked from this one (of threads)
+    pool = pipe_qc_plots.plot_process_pool(4)
+    assert pool is pipe_qc_plots.plot_process_pool(2)
+    assert pool._mp_context.get_start_method() != 'fork'
+
+
+def _plot_div_args(div):
+    """return [data, layout, config] passed to Plotly.newPlot in plot div,
+    of the layout's template resolved as qcLayout does
+    """
+    args = re.search(r'Plotly\.newPlot\(\s*"[^"]+",\s*(.*)\)\s*\};', div, re.S).group(1)
+    decoder = json.JSONDecoder()
+    values, pos = [], 0
+    while len(values) < 3:
+        if args.startswith('qcLayout(', pos):
+            pos += len('qcLayout(')
+        value, pos = decoder.raw_decode(args, pos)
+        values.append(value)
+        pos = len(args) - len(args[pos:].lstrip('), '))
+    layout = values[1]
+    if isinstance(layout.get('template'), str):
+        layout['template'] = template_dict(layout['template'])
+    return values
+
+
+def test_lean_figures_match_plotly(pipe_run_path):
+    """test lean figure dicts plot as plotly's validated figures do"""
+    def plot_read_counts_file(fp, validate=False):
+        df = pipe_qc_plots.read_counts_frame(fp)
+        return pipe_qc_plots.plot_bar_chart(fp, df, validate=validate)
+
+    for plot_file, fileglob in [
+            (plot_read_counts_file, pipe_qc_plots.PIPELINE_FILE_GLOB),
+            (pipe_qc_plots.plot_spike_pcts_file, pipe_qc_plots.PIPELINE_PCTS_GLOB)]:
+        fp = next(pipe_run_path.glob(fileglob))
+        lean = plot_file(fp)
+        validated = plot_file(fp, validate=True)
+        if isinstance(lean, str):
+            lean, validated = [lean], [validated]
+        assert len(lean) == len(validated)
+        for lean_div, validated_div in zip(lean, validated):
+            assert _plot_div_args(lean_div) == _plot_div_args(validated_div)
+
+
+def test_figures_share_template(pipe_run_path):
+    """test QC figures carry the QC template, of the layout defaults"""
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+    fig = pipe_qc_plots.bar_chart_dict(fp, pipe_qc_plots.read_counts_frame(fp))
+    # by name, of the template defined once per page
+    assert fig['layout']['template'] == pipe_qc_plots.QC_TEMPLATE
+    template = template_dict(pipe_qc_plots.QC_TEMPLATE)
+    js = templates_js([pipe_qc_plots.QC_TEMPLATE])
+    defined, _ = json.JSONDecoder().raw_decode(js, len('window.PLOTLYTEMPLATES='))
+    assert defined == {pipe_qc_plots.QC_TEMPLATE: template}
+    assert 'margin' not in fig['layout'] and 'legend' not in fig['layout']
+    assert template['layout']['plot_bgcolor'] == 'aliceblue'
+    assert template['layout']['xaxis']['hoverformat'] == '.0f'
+
+
+def test_bar_chart_totals_trace(pipe_run_path):
+    """test totals column of bar charts drawn as one text trace, not annotations"""
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+    df = pipe_qc_plots.read_counts_frame(fp)
+    totals = df['total'].tolist()
+    fig = pipe_qc_plots.bar_chart_dict(fp, df)
+    assert len(fig['layout']['annotations']) == 1 # column label
+    trace = fig['data'][-1]
+    assert trace['mode'] == 'text' and trace['xaxis'] == 'x2'
+    assert trace['y'] == fig['data'][0]['y']
+    assert trace['text'] == [f'<b>{total}</b>' for total in totals]
+    # in its own column, right of the bars, on WhiteSmoke
+    layout = fig['layout']
+    assert layout['xaxis']['domain'][1] <= layout['xaxis2']['domain'][0]
+    assert 'overlaying' not in layout['xaxis2']
+    shape, = layout['shapes']
+    assert shape['xref'] == 'x2' and shape['fillcolor'] == 'WhiteSmoke'
+
+
+def test_plot_config_per_figure(pipe_run_path):
+    """test plots in concurrent threads get their own config, the shared one unchanged"""
+    from concurrent.futures import ThreadPoolExecutor
+    from runqc.plotly_config import plotly_config, thaw
+    shared = thaw(plotly_config)
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+    df = pipe_qc_plots.read_counts_frame(fp)
+    names = [pipe_run_path / f'plot_{i}.csv' for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        plots = list(pool.map(
+            lambda fp: pipe_qc_plots.plot_bar_chart(fp, df.copy(), validate=True), names))
+    for fp, plot in zip(names, plots):
+        config = _plot_div_args(plot)[2]
+        assert config['toImageButtonOptions']['filename'] == fp.stem
+        assert config['modeBarButtonsToRemove'] == ['toggleSpikelines', 'lasso']
+    assert thaw(plotly_config) == shared
+    with pytest.raises(TypeError):
+        plotly_config['toImageButtonOptions']['filename'] = 'changed'
+
+
+def test_read_losses_batched(pipe_run_path):
+    """test reads removed in each step, of several files computed together"""
+    counts = np.array([[100, 90, 70, 60, 55],
+                       [10, 10, 8, 8, 1]], dtype=np.int32)
+    losses = pipe_qc_plots.read_losses(counts)
+    assert losses.dtype == np.int32
+    assert losses.tolist() == [[55, 5, 10, 20, 10, 100],
+                               [1, 7, 0, 2, 0, 10]]
+
+    fp = pipe_run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv'
+    second = pipe_run_path / 'pipe_16S_QC-18-microbe-998-TESTY.csv'
+    second.write_text('Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost\n'
+                      'SampleD,100,90,70,60,55\n')
+    frames = pipe_qc_plots.read_counts_frames([fp, second])
+    assert list(frames) == [fp, second]
+    # sorted by final (nonhost) reads; 'Missing' counts are zeros
+    assert frames[fp].index.tolist() == ['SampleC', 'SampleB', 'SampleA']
+    assert frames[fp].loc['SampleC'].tolist() == [0, 0, 0, 14000, 1000, 15000]
+    assert frames[second].loc['SampleD'].tolist() == [55, 5, 10, 20, 10, 100]
+    assert frames[second].dtypes.unique().tolist() == [np.int32]
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_load_read_counts(tmp_path, engine):
+    """test QC log parsed into int counts, non-numeric counts as zero"""
+    if engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    fp = tmp_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv'
+    fp.write_text('Sample_name,QC_raw,QC_trim,QC_combined,QC_nonchimera,QC_nonhost\n'
+                  'SampleA,12000,11800,11000,10500,10400\n'
+                  'SampleB,9000,8900,Missing,,Missing\n'
+                  ',1,1,1,1,1\n')
+    df = pipe_qc_plots.load_read_counts(fp, engine=engine)
+    assert df.index.tolist() == ['SampleA', 'SampleB']
+    assert df.columns.tolist() == pipe_qc_plots.READ_COUNT_STEPS
+    assert df.to_numpy().tolist() == [[12000, 11800, 11000, 10500, 10400],
+                                      [9000, 8900, 0, 0, 0]]
+    assert df.dtypes.unique().tolist() == [np.int32]
+
+    fp.write_text(fp.read_text() + 'SampleC,500,400,ERR,200,100\n')
+    df = pipe_qc_plots.load_read_counts(fp, engine=engine)
+    assert df.loc['SampleC'].tolist() == [500, 400, 0, 200, 100]
+
+
+def test_read_counts_engines_agree(app, pipe_run_path):
+    """test pyarrow engine, if configured, parses QC log to the same frame as 'c'"""
+    pytest.importorskip('pyarrow')
+    fp = pipe_run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv'
+    assert pipe_qc_plots.read_counts_csv_engine() == 'c'
+    with app.app_context():
+        assert pipe_qc_plots.read_counts_csv_engine() == 'c'
+        app.config['RUN_READ_COUNTS_CSV_ENGINE'] = 'pyarrow'
+        assert pipe_qc_plots.read_counts_csv_engine() == 'pyarrow'
+    pd.testing.assert_frame_equal(pipe_qc_plots.load_read_counts(fp, engine='pyarrow'),
+                                  pipe_qc_plots.load_read_counts(fp, engine='c'))
+
+
+def test_spike_pcts_table(pipe_run_path):
+    """test spike pcts and reads pivoted per sample, with totals"""
+    fp = pipe_run_path / 'pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv'
+    df = pipe_qc_plots.spike_pcts_table(fp)
+    assert df.index.tolist() == ['SampleA', 'SampleB']
+    assert df.columns.tolist() == ['TotalReads', 'OTU_Allobacillus', 'OTU_Imtechella',
+                                   'TotalPct', 'TotalSpikeReads']
+    assert df.loc['SampleA'].tolist() == [12000, 0.5, 0.25, 0.75, 90]
+    assert df.loc['SampleB'].tolist() == [9000, 1.0, 0.0, 1.0, 90]
+
+
+def test_frames_stored_columnar(app, pipe_run_path, tmp_path):
+    """test parsed frames stored (feather or npz) and invalidated by source fingerprint"""
+    fp = pipe_run_path / 'pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv'
+    expected = pipe_qc_plots.spike_pcts_table(fp)
+    tmp_frame = tmp_path / 'frame.npz'
+    cache.write_npz_frame(expected, tmp_frame)
+    pd.testing.assert_frame_equal(cache.read_npz_frame(tmp_frame), expected,
+                                  check_index_type=False, check_column_type=False)
+
+    computed = []
+    def compute():
+        computed.append(1)
+        return pipe_qc_plots.spike_pcts_table(fp)
+
+    with app.app_context():
+        first = cached_frame('test.frame', [fp], compute, memory=LRUCache())
+        # fresh in-memory cache, as in another worker process
+        second = cached_frame('test.frame', [fp], compute, memory=LRUCache())
+        assert len(computed) == 1
+        pd.testing.assert_frame_equal(second, first, check_index_type=False,
+                                      check_column_type=False)
+        assert list((tmp_path / 'artifacts' / 'test.frame').glob('*/*' + cache.FRAME_SUFFIX))
+
+        st = fp.stat()
+        os.utime(fp, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        cached_frame('test.frame', [fp], compute, memory=LRUCache())
+        assert len(computed) == 2
+
+
+def test_spike_pivot_csv_follows_tsv(pipe_run_path):
+    """test pivoted csv of spike pcts rewritten when its tsv is replaced"""
+    fp = pipe_run_path / 'pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv'
+    fp_pivot = fp.with_suffix('.pivot.csv')
+    pipe_qc_plots.spike_pcts_frame(fp)
+    assert 'SampleB' in fp_pivot.read_text()
+
+    st = fp.stat()
+    fp.write_text('SampleZ\tOTU_Allobacillus\t1.5%\t15\t1000\n')
+    os.utime(fp, ns=(st.st_atime_ns, st.st_mtime_ns - 10**9)) # older than before
+    pipe_qc_plots.spike_pcts_frame(fp)
+    pivot = fp_pivot.read_text()
+    assert 'SampleZ' in pivot and 'SampleB' not in pivot
+
+
+def test_read_counts_windowed(pipe_run_path):
+    """test read counts plots of only some samples, plus mean of the others"""
+    fp = pipe_run_path / 'pipe_16S_QC-18-microbe-999-TESTY.csv'
+    top = pipe_qc_plots.read_counts_frame(fp, window=pipe_qc_plots.PlotWindow(top=1))
+    assert top.index.tolist() == ['SampleC', '2 other samples (mean)']
+    assert top.loc['2 other samples (mean)', 'final'] == (10400 + 6900) // 2
+    assert top.attrs['samples'] == 3
+
+    paged = pipe_qc_plots.read_counts_frame(
+        fp, window=pipe_qc_plots.PlotWindow(page=2, page_size=2, others=False))
+    assert paged.index.tolist() == ['SampleA']
+    assert 'samples 3-3 of 3' in pipe_qc_plots.plot_bar_chart(fp, paged)
+
+    past = pipe_qc_plots.read_counts_frame(
+        fp, window=pipe_qc_plots.PlotWindow(page=9, page_size=2, others=False))
+    assert past.index.tolist() == ['SampleA'] and past.attrs['page'] == 2
+
+    whole = pipe_qc_plots.read_counts_frame(fp, window=pipe_qc_plots.PlotWindow(top=10))
+    assert len(whole.index) == 3 and not whole.attrs
+
+
+def test_spike_scatter_many_samples(pipe_run_path):
+    """test spike pcts scatter drawn with WebGL, or binned, above point counts"""
+    fp = pipe_run_path / 'pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv'
+    df_pivot = pipe_qc_plots.spike_pcts_frame(fp)
+    points = len(df_pivot.index)
+
+    fig = pipe_qc_plots.spike_scatter_figure(fp, df_pivot)
+    assert fig.data[0].type == 'scatter'
+    fig = pipe_qc_plots.spike_scatter_figure(
+        fp, df_pivot, scatter=pipe_qc_plots.ScatterOptions(gl_points=points - 1))
+    assert fig.data[0].type == 'scattergl'
+    assert len(fig.data[0].x) == points
+
+    fig = pipe_qc_plots.spike_scatter_figure(
+        fp, df_pivot, scatter=pipe_qc_plots.ScatterOptions(density_points=points - 1, bins=4))
+    heatmap = fig.data[0]
+    assert heatmap.type == 'heatmap'
+    assert np.nansum(np.array(heatmap.z, dtype=float)) == points
+    assert len(heatmap.x) == len(heatmap.y) == 4
+
+
+def test_combined_figures(app, pipe_run_path):
+    """test pipeline files of a run plotted in rows of one figure, sharing axes and legend"""
+    for fileglob in (pipe_qc_plots.PIPELINE_FILE_GLOB, pipe_qc_plots.PIPELINE_PCTS_GLOB):
+        fp = next(pipe_run_path.glob(fileglob))
+        fp.with_name(fp.name.replace('-999-', '-998-')).write_text(fp.read_text())
+    fpaths = sorted(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+
+    fig = pipe_qc_plots.read_counts_combined_dict(fpaths)
+    layout = fig['layout']
+    assert layout['xaxis2']['matches'] == 'x' and layout['yaxis2']['anchor'] == 'x2'
+    assert layout['yaxis']['domain'][0] > layout['yaxis2']['domain'][1]
+    bars = [trace for trace in fig['data'] if trace['type'] == 'bar']
+    assert len(bars) == 2 * len(pipe_qc_plots.READ_LOSS_COLUMNS[:-1])
+    assert sum(trace['showlegend'] for trace in bars) == len(bars) // 2
+    totals = [trace for trace in fig['data'] if trace['type'] == 'scatter']
+    assert [trace['xaxis'] for trace in totals] == ['x3', 'x4']
+    assert layout['xaxis4']['anchor'] == 'y2'
+    assert [shape['xref'] for shape in layout['shapes']] == ['x3', 'x4']
+    assert layout['shapes'][1]['y1'] == layout['yaxis2']['domain'][1]
+
+    with app.app_context():
+        app.config['RUN_ARTIFACTS'] = ''
+        plots = pipe_qc_plots.plot_16S_read_counts(pipe_run_path, combined=True)
+        assert list(plots) == [pipe_qc_plots.COMBINED_STEM]
+        assert plots[pipe_qc_plots.COMBINED_STEM].count('Plotly.newPlot') == 1
+        spikes = pipe_qc_plots.plot_spike_pcts(pipe_run_path, combined=True)
+    scatter, bars = spikes[pipe_qc_plots.COMBINED_STEM]
+    assert len(_plot_div_args(scatter)[0]) == 2 # a trace per file
+    assert _plot_div_args(bars)[1]['yaxis2']['anchor'] == 'x2'
+
+
+def test_svg_charts(pipe_run_path):
+    """test static svg charts of read counts and spike pcts"""
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+    df = pipe_qc_plots.read_counts_frame(fp)
+    chart = pipe_qc_plots.read_counts_svg(fp, df)
+    assert chart.count('<svg') == 1 and 'download' in chart
+    # legend, plot frame, then a bar per non-zero loss; a bold total per sample
+    losses = df.drop(columns='total')
+    assert chart.count('<rect') == len(losses.columns) + 1 + (losses.to_numpy() > 0).sum()
+    assert chart.count('font-weight="bold"') == len(df.index)
+    assert f'{df["total"].iloc[0]:,}' in chart
+
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_PCTS_GLOB))
+    [chart] = pipe_qc_plots.spike_pcts_file_svg(fp)
+    assert 'SampleB' in chart and '%</text>' in chart
+
+
+def test_plot_profile_lite(pipe_run_path):
+    """test lite plot profile: no bar texts, rows by number, rounded floats, no editing"""
+    lite = pipe_qc_plots.PLOT_PROFILES['lite']
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_FILE_GLOB))
+    df = pipe_qc_plots.read_counts_frame(fp)
+    full_div = pipe_qc_plots.plot_bar_chart(fp, df.copy())
+    lite_div = pipe_qc_plots.plot_bar_chart(fp, df.copy(), profile=lite)
+    assert len(lite_div) < len(full_div)
+
+    data, layout, config = _plot_div_args(lite_div)
+    assert all('text' not in trace for trace in data if trace['type'] == 'bar')
+    assert all('y' not in trace and trace['y0'] == 0 for trace in data)
+    assert layout['yaxis']['tickvals'] == list(range(len(df.index)))
+    assert layout['yaxis']['ticktext'] == df.index.tolist()
+    assert layout['hovermode'] == 'closest' and not layout['xaxis']['showspikes']
+    assert config['editable'] is False and 'edits' not in config
+    # totals are still printed
+    assert data[-1]['text'][0] == f'<b>{df["total"].iloc[0]}</b>'
+
+    fp = next(pipe_run_path.glob(pipe_qc_plots.PIPELINE_PCTS_GLOB))
+    figures = json.loads(pipe_qc_plots.spike_pcts_json(fp, profile=lite))['figures']
+    assert all(len(f'{x:g}'.replace('.', '').lstrip('0')) <= 4
+               for x in figures[0]['data'][0]['x'])
+    full = json.loads(pipe_qc_plots.spike_pcts_json(fp))['figures']
+    assert full[0]['config']['editable'] is True
@@ -0,0 +1,185 @@
+"""Test run folder helpers"""
+from runqc.utils import RunInventory, get_run_inventory, get_file_paths
+
+
+def test_run_inventory_kinds(app, run_path):
+    """test run folder files are classified by kind"""
+    with app.app_context():
+        inventory = RunInventory(app.config['RUN_DATASETS'] + '/' + run_path)
+    assert inventory.artifact('run_metric_csv') == ['Run_Metric_Summary_18-microbe-999.csv']
+    assert inventory.artifact('qcreport_csv')[0] == '18-microbe-999_QCreport.csv'
+    assert inventory.artifact('read_dist_images') == []
+    assert 'fastqc' in inventory.dirs
+    assert inventory.fingerprint(inventory.path / 'run_info.json')[1] > 0
+    assert inventory.fingerprint(inventory.path / 'missing.csv') is None
+
+
+def test_run_inventory_once_per_request(app, pipe_run_path, monkeypatch):
+    """test one directory scan serves all file lookups of a request"""
+    import os
+    scans = []
+    scandir = os.scandir
+    def counting_scandir(path):
+        scans.append(path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', counting_scandir)
+
+    with app.test_request_context('/'):
+        assert get_run_inventory(pipe_run_path) is get_run_inventory(pipe_run_path)
+        assert len(get_file_paths(pipe_run_path, 'pipe_16S_QC-*.csv')) == 1
+        assert get_file_paths(pipe_run_path, '*.tsv', name_only=True) == \
+            ['pipe_16S_spike_pcts-18-microbe-999-TESTY.tsv']
+    assert len(scans) == 1
+
+
+def test_gather_sections_concurrent(app):
+    """test sections run in parallel and a failing one only loses its own context"""
+    import threading
+    from collections import OrderedDict
+    from flask import current_app
+    from runqc.utils import gather_sections
+
+    barrier = threading.Barrier(2, timeout=5)
+    def waits_for_other():
+        barrier.wait()
+        return {'a': current_app.name}
+    def fails():
+        barrier.wait()
+        raise ValueError('section failure')
+
+    sections = OrderedDict([
+        ('a', (waits_for_other, {'a': None})),
+        ('b', (fails, {'b': 'default'})),
+    ])
+    with app.app_context():
+        context = gather_sections(sections, max_workers=2)
+    assert context == {'a': app.name, 'b': 'default'}
+
+
+def test_run_info_parsed_once(app, tmp_path, monkeypatch):
+    """test run info fields parsed from QC files only when their files change,
+    and fields a run lacks not looked for again
+    """
+    import json
+    import os
+    from runqc import cache, utils
+    from runqc.utils import get_run_info
+
+    run_dir = tmp_path / '20180101_18-microbe-999_TESTY_qc'
+    run_dir.mkdir()
+    (run_dir / '18-microbe-999_QCreport.csv').write_text('Project: 18-microbe-999,,,,,\n')
+    metrics = run_dir / 'Run_Metric_Summary_18-microbe-999.csv'
+    metrics.write_text('RunDate,MachineID,\n2018-01-01,M1,\n')
+
+    parsed = []
+    for kind, parse in list(utils.RUN_INFO_SOURCES.items()):
+        def counting(run_path, inventory=None, kind=kind, parse=parse):
+            parsed.append(kind)
+            return parse(run_path, inventory=inventory)
+        monkeypatch.setitem(utils.RUN_INFO_SOURCES, kind, counting)
+
+    with app.app_context():
+        info = get_run_info(run_dir, inventory=RunInventory(run_dir))
+        assert info.info['GT Project'] == '18-microbe-999'
+        assert info.info['Run Date'] == '2018-01-01'
+        assert info.sources['Run Date'] == metrics.name
+        assert info.missing == ['FlowCell ID']
+        assert parsed == ['qcreport_csv', 'run_metric_csv']
+        # missing json written of the fields found, as they are
+        written = json.loads((run_dir / 'run_info.json').read_text())
+        assert written == dict(info.info)
+
+        # another worker: fields not found are not looked for again
+        cache.artifact_cache.clear()
+        mtime_ns = (run_dir / 'run_info.json').stat().st_mtime_ns
+        info = get_run_info(run_dir, inventory=RunInventory(run_dir))
+        assert info.missing == ['FlowCell ID'] and len(parsed) == 2
+        assert info.sources['Run Date'] == 'run_info.json'
+        assert (run_dir / 'run_info.json').stat().st_mtime_ns == mtime_ns
+
+        # only the changed file is parsed again, nor replacing fields of the json
+        metrics.write_text('RunDate,FlowCellID,\n2018-01-02,TESTY,\n')
+        st = metrics.stat()
+        os.utime(metrics, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        info = get_run_info(run_dir, inventory=RunInventory(run_dir))
+        assert parsed[2:] == ['run_metric_csv']
+        assert info.info['FlowCell ID'] == 'TESTY' and not info.missing
+        assert info.sources['FlowCell ID'] == metrics.name
+        assert info.info['Run Date'] == '2018-01-01'
+        assert info.info['GT Project'] == '18-microbe-999'
+        assert (run_dir / 'run_info.json').stat().st_mtime_ns == mtime_ns
+
+
+QCREPORT_CSV = """Project: 18-microbe-999,,,,,
+Sequence Protocol: 2x250,,,,,
+Sample Size: 2,,,,,
+Date Report (UTC): 2018-01-02,,,,,
+Notes: Project details inside,,,,,
+
+GT_QC_Sample_ID,Sample_Name,Reads,,,
+GT-1,SampleA,1000,,,
+GT-2,SampleB,2000,,,
+"""
+
+def test_qcreport_parsed_in_one_pass(app, tmp_path):
+    """test QCreport header fields and sample data file, from one read of the file"""
+    from runqc.utils import parse_qcreport, get_run_qcreport_data, qc_report_run_info
+
+    fp = tmp_path / '18-microbe-999_QCreport.csv'
+    fp.write_text(QCREPORT_CSV)
+    data_fp = tmp_path / '18-microbe-999_QCreport.data.csv'
+    with app.app_context():
+        qcreport = parse_qcreport(fp)
+        # fields of labels holding a fieldname, as labelled; not of values holding one
+        assert dict(qcreport.info) == {'Project': '18-microbe-999',
+                                       'Sequence Protocol': '2x250', 'Sample Size': '2',
+                                       'Date Report (UTC)': '2018-01-02'}
+        assert qcreport.columns[:3] == ['GT_QC_Sample_ID', 'Sample_Name', 'Reads']
+        assert qcreport.samples == 2 and qcreport.data_file == data_fp.name
+        assert data_fp.read_text() == QCREPORT_CSV[QCREPORT_CSV.index('GT_QC'):]
+
+        # data file up to date: not written again
+        mtime_ns = data_fp.stat().st_mtime_ns
+        assert parse_qcreport(fp).samples == 2
+        assert data_fp.stat().st_mtime_ns == mtime_ns
+
+        inventory = RunInventory(tmp_path)
+        assert get_run_qcreport_data('', tmp_path, inventory=inventory) == data_fp.name
+        info = qc_report_run_info(tmp_path, inventory=inventory)
+        assert list(info)[0] == 'GT Project' and info['GT Project'] == '18-microbe-999'
+
+    fp.write_text('Project: 18-microbe-999,,,,,\n')
+    with app.app_context():
+        assert parse_qcreport(fp).data_file == ''
+
+
+RUN_METRIC_CSV = """LIMSProjectID,FlowCellID,RunDate,MachineID,Reads(M),TotalYield(Gb),Density,Q30,
+18-microbe-999,TESTY,2018-01-01,M1,"1,234.5",25.3,217 +/- 5,93.5%,
+Level,Yield,Error Rate,%>=Q30,
+Read 1,12.6,0.41,95.2,
+Read 2 (I),0.1,0.00,99.0,
+Read 3 (I),0.1,0.00,98.9,
+Read 4,12.6,0.52,91.8,
+Total,25.3,0.46,93.5,
+Read 1,not,a,metric,
+"""
+
+def test_run_metrics_typed(tmp_path):
+    """test Run_Metric fields as their text, or parsed as numbers, per read rows
+    until 'Total'
+    """
+    from runqc.utils import parse_run_metrics
+
+    fp = tmp_path / 'Run_Metric_Summary_18-microbe-999.csv'
+    fp.write_text(RUN_METRIC_CSV)
+    metrics = parse_run_metrics(fp)
+    assert metrics['Reads (M)'] == '1,234.5' and metrics['Cluster Density'] == '217 +/- 5'
+    assert metrics['%>=Q30: Read 2'] == '91.8'
+
+    metrics = parse_run_metrics(fp, typed=True)
+    assert metrics['FlowCell ID'] == 'TESTY' and metrics['Run Date'] == '2018-01-01'
+    assert metrics['Reads (M)'] == 1234.5 and metrics['Cluster Density'] == 217
+    assert metrics['Overall % Q30'] == 93.5
+    assert metrics['%>=Q30: Read 1'] == 95.2 and metrics['%>=Q30: Read 2'] == 91.8
+    assert metrics['Error Rate: Read 2'] == 0.52
+    assert 'Loading Conc. (pM)' not in metrics
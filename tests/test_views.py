@@ -1,4 +1,7 @@
 """Test views used in app"""
+import os
+import re
+
 import pytest
 
 from tests.conftest import _get_response
@@ -11,6 +14,7 @@ RUN_PAGE = ['(url is passed as run_path)',
             '<title>RunQC: {}</title>',
             'MicrobiomeCore Run QC Info for "{}"',
             ]
+PLOT_JSON = ['/plots/read_counts/pipe_16S_QC-18-microbe-999-TESTY.json', b'"figures"']
 FQC_LIST = ['/fastqc', b'<h2>FastQC Result List</h2>']
 FQC_PAGE = ['/fastqc/Undetermined_S0_R1_001_fastqc.html',
             b'<td>Filename</td><td>Undetermined_S0_R1_001.fastq.gz</td>']
@@ -44,6 +48,91 @@ def test_run_page(client, run_path):
     assert header_check in response.data
 
 
+def test_run_page_concurrent_sections(app, client, run_path):
+    """test run page built with concurrent sections"""
+    app.config['RUN_DETAILS_WORKERS'] = 4
+    url = run_path +'/'
+    header_check = RUN_PAGE[2].format(run_path.replace('_qc','')).encode()
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert response.status_code == 200
+    assert header_check in response.data
+
+
+def test_run_page_deferred_plots(client, run_path):
+    """test run page leaves plots for browser to fetch, or renders them inline"""
+    url = run_path +'/?plots=deferred'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    # read counts of RUN_PLOT_MAX_SAMPLES, their links to pages of the page's args
+    data_check = (run_path + PLOT_JSON[0] + '?plots=deferred&amp;top=200"').encode()
+    assert data_check in response.data
+    assert b'js/run_qc_plots.js' in response.data
+    assert response.data.count(b'window.PLOTLYTEMPLATES=') == 1
+
+    # ids of kind too, unique of a plot name in each section, e.g. combined
+    ids = re.findall(rb'class="plotly-deferred" id="([^"]+)"', response.data)
+    assert [plot_id.split(b'-')[0] for plot_id in ids] == [b'read_counts', b'spikes']
+    assert len(set(ids)) == len(ids)
+
+    url = run_path +'/?plots=deferred&profile=lite'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert b'profile=lite' in response.data
+
+    url = run_path +'/?plots=inline&profile=lite&page=1&page_size=1'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert b'data-src=' not in response.data
+    assert b'?page=2&page_size=1&plots=inline&profile=lite' in response.data
+    assert b'plotly-graph-div' in response.data
+    # QC template defined once, each figure naming it
+    assert response.data.count(b'window.PLOTLYTEMPLATES=') == 1
+    assert b'qcLayout({' in response.data
+    assert re.search(rb'"template":\s*"runqc"', response.data)
+
+
+def test_run_page_lite(client, run_path):
+    """test lite run page charts plots as static svg, without plotly"""
+    url = run_path +'/?mode=lite'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert response.status_code == 200
+    assert response.data.count(b'<svg') == 2
+    assert b'plotly' not in response.data.lower()
+
+    (response2, resphead, respdata, respdict) = _get_response(client, url)
+    assert response2.data == response.data
+
+
+def test_run_plot_json(client, run_path):
+    """test json of plots of pipeline file"""
+    url = run_path + PLOT_JSON[0]
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert PLOT_JSON[1] in response.data
+
+    # links to pages of samples keep the run page's args, passed on by its urls
+    url = run_path + PLOT_JSON[0] + '?plots=deferred&combined=0&page=1&page_size=1'
+    (response_page, resphead, respdata, respdict) = _get_response(client, url)
+    assert b'?page=2&page_size=1&plots=deferred&combined=0' in response_page.data
+
+    url = run_path + PLOT_JSON[0] + '?profile=lite'
+    (response_lite, resphead, respdata, respdict) = _get_response(client, url)
+    assert b'"editable":false' in response_lite.data
+    assert len(response_lite.data) < len(response.data)
+
+    url = run_path + PLOT_JSON[0] + '?page=2&page_size=2'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert b'samples 3-3 of 3' in response.data
+
+    for kind in ('read_counts', 'spikes'):
+        url = run_path + f'/plots/{kind}/combined.json'
+        (response, resphead, respdata, respdict) = _get_response(client, url)
+        assert response.status_code == 200
+        assert b'Projects' in response.data
+
+    url = run_path + '/plots/read_counts/pipe_16S_QC-no-such-file.json'
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert response.status_code == 404
+
+
 def test_fastqc(client, run_path):
     """test fastqc main list"""
     url = run_path + FQC_LIST[0]
@@ -58,6 +147,8 @@ def test_fastqc_page(client, run_path):
     data_check = FQC_PAGE[1]
     (response, resphead, respdata, respdict) = _get_response(client, url)
     assert data_check in response.data
+    assert response.cache_control.max_age == 3600
+    assert response.headers['ETag']
 
 
 #TODO: test_run_qc_csv
@@ -81,3 +172,86 @@ def test_run_stats(client, run_path):
     assert "run_stats" == False
 
 
+def test_conditional_requests(client, run_path):
+    """test pages and plots of unchanged run files answered 304 by their ETag"""
+    for url in ['/', run_path + '/?plots=deferred', run_path + PLOT_JSON[0]]:
+        (response, resphead, respdata, respdict) = _get_response(client, url)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert response.last_modified is None
+        assert response.cache_control.no_cache or response.cache_control.max_age
+
+        (response, resphead, respdata, respdict) = _get_response(
+            client, url, headers={'If-None-Match': etag})
+        assert response.status_code == 304 and not response.data
+        assert response.headers['ETag'] == etag
+
+        # dates do not validate made pages: their files may be older than before
+        (response, resphead, respdata, respdict) = _get_response(
+            client, url, headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        assert response.status_code == 200
+
+    # other args, other page
+    (response, resphead, respdata, respdict) = _get_response(
+        client, run_path + '/?plots=inline', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+
+def test_run_list_etag_of_run_info(app, client, run_path):
+    """test run list made again when a run's info json is edited in place"""
+    import json
+    app.config['RUN_CATALOG_MAX_AGE'] = 0
+    info = os.path.join(app.config['RUN_DATASETS'], run_path, 'run_info.json')
+    with open(info) as fp:
+        contents = fp.read()
+    try:
+        with open(info, 'w') as fp:
+            json.dump({'FlowCell ID': 'TESTY1'}, fp)
+        (response, resphead, respdata, respdict) = _get_response(client, '/')
+        etag = response.headers['ETag']
+
+        st = os.stat(info)
+        with open(info, 'w') as fp:
+            json.dump({'FlowCell ID': 'TESTY22'}, fp)
+        os.utime(info, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        (response, resphead, respdata, respdict) = _get_response(
+            client, '/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    finally:
+        with open(info, 'w') as fp:
+            fp.write(contents)
+
+
+def test_run_files_ranges_and_offload(app, client, run_path, monkeypatch):
+    """test run files sent in byte ranges by python, or by the front web server"""
+    url = run_path + FQC_PAGE[0]
+    (response, resphead, respdata, respdict) = _get_response(
+        client, url, headers={'Range': 'bytes=0-9'})
+    assert response.status_code == 206
+    assert len(response.data) == 10
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+    monkeypatch.setitem(app.config, 'RUN_FILES_OFFLOAD', 'x-accel-redirect')
+    (response, resphead, respdata, respdict) = _get_response(client, url)
+    assert response.headers['X-Accel-Redirect'] == \
+        '/_run_files/' + run_path.strip('/') + '/fastqc/Undetermined_S0_R1_001_fastqc.html'
+    assert response.data == b'' and response.mimetype == 'text/html'
+
+    monkeypatch.setitem(app.config, 'RUN_FILES_OFFLOAD', 'x-sendfile')
+    (response, resphead, respdata, respdict) = _get_response(
+        client, run_path + '/fastqc/Undetermined_S0_R1_001_fastqc.zip')
+    assert response.headers['X-Sendfile'].endswith('/fastqc/Undetermined_S0_R1_001_fastqc.zip')
+    assert 'attachment' in response.headers['Content-Disposition']
+
+
+def test_spike_pivot_csv_download(app, client, run_path):
+    """test pivoted spike pcts csv written for download, if plots were cached"""
+    pivot = 'pipe_16S_spike_pcts-18-microbe-999-TESTY.pivot.csv'
+    pivot_path = app.config['RUN_DATASETS'] + '/' + run_path + '/' + pivot
+    if os.path.exists(pivot_path):
+        os.remove(pivot_path)
+    (response, resphead, respdata, respdict) = _get_response(client, run_path + '/' + pivot)
+    assert response.status_code == 200
+    assert b'SampleB' in response.data
+    assert 'attachment' in response.headers['Content-Disposition']